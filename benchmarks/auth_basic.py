@@ -0,0 +1,76 @@
+"""
+Бенчмарк кэширования базовой аутентификации (BasicAuthentication.cache_timeout).
+
+_authenticate() имитирует типичную проверку: запрос в БД (asyncio.sleep) и проверку пароля pbkdf2_hmac.  Зависимость
+вызывается напрямую, без HTTP, поэтому в результат входит только разбор заголовка и аутентификация.
+
+Запуск из корня репозитория:
+    python -m benchmarks.auth_basic [--requests 20000] [--db-latency 0.0005] [--iterations 100000]
+"""
+import argparse
+import asyncio
+import base64
+import hashlib
+import os
+import time
+
+from fastapi.requests import Request
+from fastapi.security import HTTPBasicCredentials
+
+os.environ.setdefault("FASTAPI_DJANGO_SETTINGS_MODULE", "tests.settings")
+
+from fastapi_django.auth import BasicAuthentication  # noqa: E402
+from fastapi_django.exceptions.http import HTTP401Exception  # noqa: E402
+
+SALT = b"salt"
+
+
+class DatabaseAuthentication(BasicAuthentication):
+    def __init__(self, db_latency: float, iterations: int, **kwargs):
+        super().__init__(**kwargs)
+        self.db_latency = db_latency
+        self.iterations = iterations
+        self.password_hash = hashlib.pbkdf2_hmac("sha256", b"secret", SALT, iterations)
+
+    async def _authenticate(self, credentials: HTTPBasicCredentials | None):
+        await asyncio.sleep(self.db_latency)
+        password_hash = hashlib.pbkdf2_hmac("sha256", credentials.password.encode(), SALT, self.iterations)
+        if credentials.username == "user" and password_hash == self.password_hash:
+            return {"username": credentials.username}
+        return None
+
+
+def make_request(username: str, password: str) -> Request:
+    token = base64.b64encode(f"{username}:{password}".encode())
+    return Request({"type": "http", "headers": [(b"authorization", b"Basic " + token)]})
+
+
+async def measure(auth: BasicAuthentication, password: str, requests: int) -> float:
+    # среднее время одного запроса в секундах
+    request = make_request("user", password)
+    started_at = time.perf_counter()
+    for _ in range(requests):
+        try:
+            await auth(request)
+        except HTTP401Exception:
+            pass
+    return (time.perf_counter() - started_at) / requests
+
+
+async def main(requests: int, db_latency: float, iterations: int) -> None:
+    uncached = DatabaseAuthentication(db_latency, iterations)
+    # без кэша каждый запрос идет в БД, поэтому запросов меньше
+    uncached_requests = max(requests // 1000, 10)
+    print(f"без кэша        {await measure(uncached, 'secret', uncached_requests) * 1000:8.2f} мс/запрос")
+    cached = DatabaseAuthentication(db_latency, iterations, cache_timeout=60)
+    print(f"кэш, успех      {await measure(cached, 'secret', requests) * 1_000_000:8.2f} мкс/запрос")
+    print(f"кэш, неудача    {await measure(cached, 'wrong', requests) * 1_000_000:8.2f} мкс/запрос")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=20000, help="запросов с кэшем")
+    parser.add_argument("--db-latency", type=float, default=0.0005, help="задержка запроса в БД, с")
+    parser.add_argument("--iterations", type=int, default=100_000, help="итераций pbkdf2_hmac")
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.db_latency, args.iterations))
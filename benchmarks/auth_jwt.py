@@ -0,0 +1,99 @@
+"""
+Бенчмарк проверки JWT (JWTAuthentication): число проверок токенов в секунду.
+
+Ключи генерируются локально, JWKS передается словарем, поэтому сеть не нужна.  Сравниваются jwt.decode() с ключом
+в PEM (разбирается при каждой проверке), jwt.decode() с заранее разобранным ключом и JWTAuthentication.verify() для
+новых и уже проверенных токенов.
+
+Запуск из корня репозитория:
+    python -m benchmarks.auth_jwt [--tokens 2000] [--cached 200000]
+"""
+import argparse
+import asyncio
+import os
+import time
+import uuid
+from typing import Callable
+
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, rsa
+from jwt.algorithms import ECAlgorithm, RSAAlgorithm
+
+os.environ.setdefault("FASTAPI_DJANGO_SETTINGS_MODULE", "tests.settings")
+
+from fastapi_django.auth.jwt import JWTAuthentication  # noqa: E402
+
+
+def sign(private_key, algorithm: str, count: int) -> list[str]:
+    # разные jti, чтобы токены не совпадали и не брались из кэша проверенных токенов
+    exp = int(time.time()) + 3600
+    return [
+        jwt.encode(
+            {"sub": "user", "aud": "api", "exp": exp, "jti": uuid.uuid4().hex},
+            private_key,
+            algorithm=algorithm,
+            headers={"kid": algorithm},
+        )
+        for _ in range(count)
+    ]
+
+
+def measure(name: str, func: Callable[[str], object], tokens: list[str]) -> None:
+    started_at = time.perf_counter()
+    for token in tokens:
+        assert func(token) is not None
+    rate = len(tokens) / (time.perf_counter() - started_at)
+    print(f"{name:<45} {rate:>10,.0f} проверок/с")
+
+
+async def measure_async(name: str, func, tokens: list[str]) -> None:
+    started_at = time.perf_counter()
+    for token in tokens:
+        assert await func(token) is not None
+    rate = len(tokens) / (time.perf_counter() - started_at)
+    print(f"{name:<45} {rate:>10,.0f} проверок/с")
+
+
+async def main(count: int, cached_count: int) -> None:
+    rsa_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    rsa_jwk = {**RSAAlgorithm.to_jwk(rsa_key.public_key(), as_dict=True), "kid": "RS256", "use": "sig"}
+    ec_jwk = {**ECAlgorithm.to_jwk(ec_key.public_key(), as_dict=True), "kid": "ES256", "use": "sig"}
+    rsa_pem = rsa_key.public_key().public_bytes(
+        serialization.Encoding.PEM, serialization.PublicFormat.SubjectPublicKeyInfo
+    ).decode()
+    rsa_tokens = sign(rsa_key, "RS256", count)
+    ec_tokens = sign(ec_key, "ES256", count)
+
+    measure(
+        "RS256 jwt.decode(), ключ в PEM",
+        lambda token: jwt.decode(token, rsa_pem, algorithms=["RS256"], audience="api"),
+        rsa_tokens,
+    )
+    rsa_public_key = jwt.PyJWK(rsa_jwk).key
+    measure(
+        "RS256 jwt.decode(), разобранный ключ",
+        lambda token: jwt.decode(token, rsa_public_key, algorithms=["RS256"], audience="api"),
+        rsa_tokens,
+    )
+    ec_public_key = jwt.PyJWK(ec_jwk).key
+    measure(
+        "ES256 jwt.decode(), разобранный ключ",
+        lambda token: jwt.decode(token, ec_public_key, algorithms=["ES256"], audience="api"),
+        ec_tokens,
+    )
+
+    auth = JWTAuthentication(jwks={"keys": [rsa_jwk]}, audience="api", cache_max_entries=count)
+    await measure_async("RS256 JWTAuthentication.verify(), новые токены", auth.verify, rsa_tokens)
+    # все токены уже проверены и лежат в кэше
+    cached_tokens = (rsa_tokens * (cached_count // count + 1))[:cached_count]
+    await measure_async("RS256 JWTAuthentication.verify(), из кэша", auth.verify, cached_tokens)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tokens", type=int, default=2000, help="разных токенов для проверки подписи")
+    parser.add_argument("--cached", type=int, default=200_000, help="проверок токенов из кэша")
+    args = parser.parse_args()
+    asyncio.run(main(args.tokens, args.cached))
@@ -1,5 +1,9 @@
 def setup():
     # последовательность действий, которые должны быть выполнены перед запуском какого-либо
     # процесса.  одним из таких действий является, например, настройка логирования
+    from fastapi_django.conf import settings
     from fastapi_django.logging import configure_logging
+    # настройки загружаются и проверяются сразу, чтобы ошибка в них не всплыла при первом запросе
+    if not settings.configured:
+        settings._setup()
     configure_logging()
@@ -1,12 +1,19 @@
+from contextlib import asynccontextmanager, nullcontext
 from functools import partial
 from pathlib import Path
+from typing import Any, AsyncContextManager, Callable
 
 import pkg_resources
 from fastapi import APIRouter, FastAPI
-from starlette.staticfiles import StaticFiles
+from starlette.responses import Response
 
 from fastapi_django.conf import settings
+from fastapi_django.docs.openapi import setup_openapi
 from fastapi_django.docs.views import router as docs_router
+from fastapi_django.docs.views import static_files
+from fastapi_django.middleware import get_middlewares
+from fastapi_django.utils.module_loading import import_string
+from fastapi_django.warmup import WarmUp, readiness
 
 installed_packages = pkg_resources.working_set
 installed_packages_list = [f"{i.key}" for i in installed_packages]
@@ -16,7 +23,7 @@ APP_ROOT = Path(__file__).parent
 
 def include_docs_router(app: FastAPI, router: APIRouter) -> None:
     if settings.API_DOCS_ENABLED:
-        app.mount(f"{settings.API_PREFIX}/static", StaticFiles(directory=APP_ROOT / "static"), name="static")
+        app.mount(f"{settings.API_PREFIX}/static", static_files, name="static")
         router.include_router(docs_router)
 
 
@@ -37,31 +44,68 @@ def setup_prometheus(app: FastAPI) -> None:
 def include_routers(app: FastAPI) -> None:
     router = APIRouter()
     include_docs_router(app, router)
+    if settings.WARMUP_READINESS_URL is not None:
+        router.add_api_route(settings.WARMUP_READINESS_URL, readiness, include_in_schema=False)
     app.include_router(router)
 
 
 def setup_middlewares(app: FastAPI) -> None:
-    for middleware in settings.MIDDLEWARES:
-        app.add_middleware(middleware)
-    #  TODO: продумать:
-    #  преднастроенные миддлварь, которые задаются в строковом формате и
-    #  имеют настройки ИЛИ не имеют параметров инициализации
-    #  callabe миддвари, с преднастроенными при помощи partial параметрами напр:
-    #   MIDDLEWARES = [
-    #     partial(TrustedHostMiddleware, allowed_hosts=["localhost", "*.example.com"])
-    #   ]
-
-
-def get_default_app() -> FastAPI:
+    # первый в MIDDLEWARES middleware - внешний, а add_middleware() делает внешним последний добавленный
+    for middleware in reversed(get_middlewares(settings.MIDDLEWARES)):
+        app.add_middleware(middleware.cls, *middleware.args, **middleware.kwargs)
+
+
+def get_lifespan(app_lifespan: Callable[[FastAPI], AsyncContextManager[Any]] | None = None):
+    """
+    lifespan приложения: прогрев при запуске, разгрузка очередей писем и закрытие соединений при остановке.
+    app_lifespan - lifespan проекта, выполняется внутри, а его состояние передается в запросы
+    """
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        from fastapi_django.auth.jwt import close_jwks_caches
+        from fastapi_django.mail.backends.queued import drain_queues
+        from fastapi_django.mail.backends.smtp import close_pools
+        from fastapi_django.mail.providers import providers
+
+        # если задан lifespan, то Starlette не вызывает обработчики @app.on_event("startup"/"shutdown"), поэтому
+        # вызываем их сами
+        await app.router.startup()
+        async with app_lifespan(app) if app_lifespan is not None else nullcontext() as state:
+            # прогрев выполняется до того, как сервер начнет принимать запросы.  ошибки в настройках
+            # (напр., EMAIL_PROVIDERS) обнаруживаются при запуске, а не при первом запросе
+            app.state.warmup = WarmUp(settings.WARMUP_STEPS)
+            await app.state.warmup.run(app)
+            yield state
+        await app.router.shutdown()
+        # при остановке дожидаемся отправки писем из очередей, закрываем соединения с SMTP-серверами и
+        # останавливаем фоновое обновление JWKS
+        await drain_queues(settings.EMAIL_QUEUE_DRAIN_TIMEOUT)
+        await providers.close()
+        await close_pools()
+        await close_jwks_caches()
+
+    return lifespan
+
+
+def get_default_app(
+    default_response_class: type[Response] | None = None,
+    lifespan: Callable[[FastAPI], AsyncContextManager[Any]] | None = None,
+) -> FastAPI:
+    if default_response_class is None:
+        default_response_class = import_string(settings.API_DEFAULT_RESPONSE_CLASS)
     app = FastAPI(
+        default_response_class=default_response_class,
         title=settings.API_TITLE,
         summary=settings.API_SUMMARY,
         description=settings.API_DESCRIPTION,
         version=settings.API_VERSION,
         docs_url=None,
         redoc_url=None,
-        openapi_url=f"{settings.API_PREFIX}/docs/openapi.json",
+        openapi_url=None,
+        lifespan=get_lifespan(lifespan),
     )
+    setup_openapi(app, f"{settings.API_PREFIX}/docs/openapi.json")
     # TODO: настроить урлы
     app.include_router = partial(app.include_router, prefix=settings.API_PREFIX)  # type: ignore
     include_routers(app)
@@ -1,3 +1,5 @@
+import hashlib
+import os
 from inspect import Parameter, Signature
 from typing import Any
 
@@ -7,8 +9,12 @@ from fastapi.security import HTTPBasic, HTTPBasicCredentials
 from fastapi.security.base import SecurityBase
 from typing_extensions import Annotated
 
+from fastapi_django.cache.backends.locmem import LocMemCache
 from fastapi_django.exceptions.http import HTTP401Exception
 
+# признак закэшированной неудачной аутентификации
+_FAILED = object()
+
 
 def AuthenicationClasses(*authenticators):
     # позволяет определить несколько классов аутентификации.  классы должны быть наследниками SecurityBase или
@@ -18,7 +24,6 @@ def AuthenicationClasses(*authenticators):
     # это необходимо, тк один класс все же может аутентифицировать, но исключение в другом классе не даст этому
     # случиться, и это может ввести в заблуждение
     def wrapper(request: Request, **kwargs):
-        print(request, kwargs)
         if not any(kwargs.values()):
             raise HTTP401Exception
     if not authenticators:
@@ -49,19 +54,76 @@ def AuthenicationClasses(*authenticators):
 
 class BasicAuthentication(HTTPBasic):
     # Базовый класс для базовой аутентификации
+    #
+    # если задан cache_timeout, то результат _authenticate() кэшируется в памяти процесса на cache_timeout секунд
+    # (не более cache_max_entries кредов, давно не использованные вытесняются), а неудачная аутентификация - на
+    # negative_cache_timeout секунд.  ключ кэша - хэш кредов с ключом, который генерируется при создании
+    # аутентификатора, поэтому пароли в памяти не хранятся.  закэшированный пользователь общий для запросов, поэтому
+    # он не должен изменяться и не должен быть привязан к сессии БД.  после изменения пароля или блокировки
+    # пользователя кэш нужно сбросить методом invalidate()
+
+    def __init__(
+        self,
+        *,
+        scheme_name: str | None = None,
+        realm: str | None = None,
+        description: str | None = None,
+        auto_error: bool = True,
+        cache_timeout: float | None = None,
+        cache_max_entries: int = 1000,
+        negative_cache_timeout: float = 5,
+    ):
+        super().__init__(scheme_name=scheme_name, realm=realm, description=description, auto_error=auto_error)
+        self._cache = None
+        if cache_timeout is not None:
+            self._cache = LocMemCache(max_entries=cache_max_entries, timeout=cache_timeout)
+            self._negative_cache_timeout = negative_cache_timeout
+            self._cache_key = os.urandom(32)
+            # версии кэша по пользователям: увеличение версии делает недействительными закэшированные креды
+            self._cache_versions: dict[str, int] = {}
 
     async def __call__(self, request: Request) -> Any:  # type: ignore
         try:
             credentials = await super().__call__(request)
         except HTTPException:
             raise HTTP401Exception
-        if user := await self._authenticate(credentials) is not None:
-            request.scope["user"] = credentials
+        if credentials is not None and self._cache is not None:
+            user = await self._authenticate_cached(credentials)
+        else:
+            user = await self._authenticate(credentials)
+        if user is not None:
+            request.scope["user"] = user
             return user
         if self.auto_error:
             raise HTTP401Exception
         return None
 
+    async def _authenticate_cached(self, credentials: HTTPBasicCredentials) -> Any:
+        # в имени пользователя базовой аутентификации не может быть двоеточия, поэтому ключ однозначен
+        key = hashlib.blake2b(
+            f"{credentials.username}:{credentials.password}".encode(), key=self._cache_key, digest_size=16
+        ).hexdigest()
+        version = self._cache_versions.get(credentials.username, 1)
+        user = self._cache.get(key, version=version)
+        if user is _FAILED:
+            return None
+        if user is None:
+            user = await self._authenticate(credentials)
+            if user is None:
+                self._cache.set(key, _FAILED, self._negative_cache_timeout, version=version)
+            else:
+                self._cache.set(key, user, version=version)
+        return user
+
+    def invalidate(self, username: str | None = None) -> None:
+        """Сбрасывает закэшированные креды пользователя username, а если он не задан, то всех пользователей"""
+        if self._cache is None:
+            return
+        if username is None:
+            self._cache.clear()
+        else:
+            self._cache_versions[username] = self._cache_versions.get(username, 1) + 1
+
     async def _authenticate(self, credentials: HTTPBasicCredentials | None) -> Any:
         # это может быть например получение сервисного пользователя из бд с последующим
         # сравнением кредов с сохраненными.  метод при этом возвращает экземпляр пользователя
@@ -73,8 +135,8 @@ class BasicAuthentication(HTTPBasic):
 class CredentialsBasicAuthentication(BasicAuthentication):
     # Базовая аутентификация, при которой происходит сравнение полученных кредов с заданными
 
-    def __init__(self, username: str, password: str, *, scheme_name: str | None = None, realm: str | None = None, description: str | None = None, auto_error: bool = True):
-        super().__init__(scheme_name=scheme_name, realm=realm, description=description, auto_error=auto_error)
+    def __init__(self, username: str, password: str, *, scheme_name: str | None = None, realm: str | None = None, description: str | None = None, auto_error: bool = True, **kwargs: Any):
+        super().__init__(scheme_name=scheme_name, realm=realm, description=description, auto_error=auto_error, **kwargs)
         self._username = username
         self._password = password
 
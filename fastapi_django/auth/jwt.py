@@ -0,0 +1,228 @@
+"""
+Аутентификация по JWT, подписанным ключами из JWKS (напр., Keycloak).
+"""
+import asyncio
+import json
+import logging
+import time
+import weakref
+from typing import Any
+
+import httpx
+import jwt
+from jwt.utils import base64url_decode
+from fastapi import HTTPException
+from fastapi.requests import Request
+from fastapi.security import HTTPBearer
+
+from fastapi_django.cache.backends.locmem import LocMemCache
+from fastapi_django.exceptions.http import HTTP401Exception
+
+logger = logging.getLogger(__name__)
+
+# кэши JWKS, загружаемые по url.  их фоновые обновления останавливает close_jwks_caches()
+_caches: weakref.WeakSet["JWKSCache"] = weakref.WeakSet()
+
+
+class JWKSCache:
+    """
+    Публичные ключи из JWKS по kid.  Каждый ключ разбирается один раз при загрузке JWKS
+
+    Если задан url, то JWKS загружается при первом обращении и затем обновляется в фоне каждые refresh_interval
+    секунд.  Ключ с неизвестным kid (напр., после ротации ключей) приводит к внеочередному обновлению, но не чаще,
+    чем раз в min_refresh_interval секунд.  Если обновление не удалось, то используются ранее загруженные ключи
+
+    Вместо url можно передать jwks - словарь {"keys": [...]}, напр., для тестов с локально сгенерированными ключами
+
+    Блокировка и фоновая задача привязаны к циклу событий и создаются заново, если кэш используется в другом цикле
+    (напр., в тестах).  Фоновое обновление останавливается при остановке приложения (см. close_jwks_caches())
+    """
+
+    def __init__(
+        self,
+        url: str | None = None,
+        jwks: dict[str, Any] | None = None,
+        refresh_interval: float = 300,
+        min_refresh_interval: float = 30,
+        timeout: float = 5,
+    ):
+        if (url is None) == (jwks is None):
+            raise ValueError("Необходимо задать либо url, либо jwks")
+        self.url = url
+        self.refresh_interval = refresh_interval
+        self.min_refresh_interval = min_refresh_interval
+        self.timeout = timeout
+        self.keys: dict[str | None, jwt.PyJWK] = {}
+        self._refreshed_at: float | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._lock = asyncio.Lock()
+        self._task: asyncio.Task | None = None
+        if jwks is not None:
+            self.load(jwks)
+        else:
+            _caches.add(self)
+
+    def load(self, jwks: dict[str, Any]) -> None:
+        keys = {}
+        for jwk in jwks.get("keys", []):
+            if jwk.get("use", "sig") != "sig":
+                continue
+            try:
+                key = jwt.PyJWK(jwk)
+            except jwt.PyJWTError as e:
+                logger.warning(f"Пропущен ключ {jwk.get('kid')} из JWKS: {e}")
+                continue
+            keys[key.key_id] = key
+        self.keys = keys
+
+    async def get_key(self, kid: str | None) -> jwt.PyJWK | None:
+        if self.url is None:
+            return self.keys.get(kid)
+        self._bind_loop()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._refresh_periodically())
+        if (key := self.keys.get(kid)) is None:
+            if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.min_refresh_interval:
+                await self.refresh()
+            key = self.keys.get(kid)
+        return key
+
+    async def refresh(self) -> None:
+        self._bind_loop()
+        refreshed_at = self._refreshed_at
+        async with self._lock:
+            # пока ожидали блокировку, JWKS мог обновить другой запрос
+            if self._refreshed_at != refreshed_at:
+                return
+            try:
+                async with httpx.AsyncClient(timeout=self.timeout) as client:
+                    response = await client.get(self.url)
+                    response.raise_for_status()
+                self.load(response.json())
+            except (httpx.HTTPError, ValueError) as e:
+                logger.warning(f"Не удалось загрузить JWKS {self.url}: {e!r}")
+            self._refreshed_at = time.monotonic()
+
+    async def _refresh_periodically(self) -> None:
+        while True:
+            if self._refreshed_at is not None:
+                await asyncio.sleep(max(self._refreshed_at + self.refresh_interval - time.monotonic(), 0))
+            await self.refresh()
+
+    def _bind_loop(self) -> None:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # задача из другого цикла там и останется: отменять ее из этого цикла нельзя
+            self._loop = loop
+            self._lock = asyncio.Lock()
+            self._task = None
+
+    async def close(self) -> None:
+        """Останавливает фоновое обновление JWKS"""
+        task, self._task = self._task, None
+        if task is not None and self._loop is asyncio.get_running_loop():
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+
+
+async def close_jwks_caches() -> None:
+    """Останавливает фоновое обновление всех JWKS.  Следует вызывать при остановке приложения"""
+    for cache in list(_caches):
+        await cache.close()
+
+
+def get_kid(token: str) -> str | None | bool:
+    """
+    kid из заголовка токена или False, если заголовок некорректен.  В отличие от jwt.get_unverified_header()
+    не декодирует полезную нагрузку и подпись - их все равно проверит jwt.decode()
+    """
+    try:
+        header = json.loads(base64url_decode(token.partition(".")[0]))
+    except ValueError:
+        return False
+    if not isinstance(header, dict) or not isinstance(kid := header.get("kid"), str | None):
+        return False
+    return kid
+
+
+class JWTAuthentication(HTTPBearer):
+    """
+    Аутентификация по JWT из заголовка Authorization: Bearer <token>
+
+    Подпись проверяется ключом из JWKS (см. JWKSCache) по kid из заголовка токена.  Проверенные токены хранятся
+    в памяти процесса (не более cache_max_entries, давно не использованные вытесняются) до истечения exp, поэтому
+    повторные запросы с тем же токеном не проверяют подпись.  Токены без exp не кэшируются.  Если ключ, которым
+    был подписан токен, удален из JWKS, то токен перестает приниматься
+
+    Пользователь запроса - результат _get_user(), по умолчанию - полезная нагрузка токена
+    """
+
+    def __init__(
+        self,
+        jwks_url: str | None = None,
+        *,
+        jwks: dict[str, Any] | None = None,
+        algorithms: tuple[str, ...] = ("RS256",),
+        audience: str | list[str] | None = None,
+        issuer: str | None = None,
+        leeway: float = 0,
+        refresh_interval: float = 300,
+        cache_max_entries: int = 1000,
+        scheme_name: str | None = None,
+        description: str | None = None,
+        auto_error: bool = True,
+    ):
+        super().__init__(scheme_name=scheme_name, description=description, auto_error=auto_error)
+        self.jwks = JWKSCache(jwks_url, jwks, refresh_interval=refresh_interval)
+        self.algorithms = list(algorithms)
+        self.audience = audience
+        self.issuer = issuer
+        self.leeway = leeway
+        # токен: (полезная нагрузка, kid)
+        self._cache = LocMemCache(max_entries=cache_max_entries, timeout=None)
+
+    async def __call__(self, request: Request) -> Any:  # type: ignore
+        try:
+            credentials = await super().__call__(request)
+        except HTTPException:
+            raise HTTP401Exception
+        payload = await self.verify(credentials.credentials) if credentials is not None else None
+        if payload is not None:
+            user = await self._get_user(payload)
+            request.scope["user"] = user
+            return user
+        if self.auto_error:
+            raise HTTP401Exception
+        return None
+
+    async def verify(self, token: str) -> dict[str, Any] | None:
+        """Полезная нагрузка токена, если он действителен, иначе None"""
+        if (cached := self._cache.get(token)) is not None:
+            payload, kid = cached
+            if kid in self.jwks.keys:
+                return payload
+            self._cache.delete(token)
+            return None
+        if (kid := get_kid(token)) is False:
+            return None
+        if (key := await self.jwks.get_key(kid)) is None:
+            return None
+        try:
+            payload = jwt.decode(
+                token,
+                key.key,
+                algorithms=self.algorithms,
+                audience=self.audience,
+                issuer=self.issuer,
+                leeway=self.leeway,
+            )
+        except jwt.PyJWTError as e:
+            logger.debug(f"Токен не прошел проверку: {e}")
+            return None
+        if isinstance(exp := payload.get("exp"), int | float):
+            self._cache.set(token, (payload, kid), timeout=exp + self.leeway - time.time())
+        return payload
+
+    async def _get_user(self, payload: dict[str, Any]) -> Any:
+        # напр., получение пользователя из БД по payload["sub"]
+        return payload
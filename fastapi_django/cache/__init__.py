@@ -0,0 +1,60 @@
+"""
+Кэш.  Бэкенды задаются в настройке CACHES, как в Django:
+
+    CACHES = {
+        "default": {
+            "BACKEND": "fastapi_django.cache.backends.locmem.LocMemCache",
+            "TIMEOUT": 300,
+            "OPTIONS": {"max_entries": 1000},
+        },
+    }
+
+    from fastapi_django.cache import caches
+    caches["default"].set("key", "value")
+"""
+from typing import Any
+
+from fastapi_django.conf import on_setting_changed, settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.utils.module_loading import import_string
+
+DEFAULT_CACHE_ALIAS = "default"
+
+
+class CacheHandler:
+    """Экземпляры бэкендов кэша по алиасам из CACHES.  Создаются при первом обращении и общие для процесса"""
+
+    def __init__(self):
+        self._caches: dict[str, Any] = {}
+
+    def __getitem__(self, alias: str):
+        if (cache := self._caches.get(alias)) is not None:
+            return cache
+        try:
+            params = dict(settings.CACHES[alias])
+        except KeyError:
+            raise ImproperlyConfigured(f"`{alias}` отсутствует в CACHES") from None
+        try:
+            backend = import_string(params.pop("BACKEND"))
+        except (KeyError, ImportError) as e:
+            raise ImproperlyConfigured(f"Не удалось загрузить бэкенд CACHES['{alias}']: {e!r}") from e
+        cache = self._caches[alias] = backend(
+            params.pop("LOCATION", None),
+            timeout=params.pop("TIMEOUT", 300),
+            key_prefix=params.pop("KEY_PREFIX", ""),
+            version=params.pop("VERSION", 1),
+            **params.pop("OPTIONS", {}),
+        )
+        return cache
+
+    def reset(self) -> None:
+        self._caches.clear()
+
+
+caches = CacheHandler()
+
+
+@on_setting_changed
+def reset_caches(setting: str, value: Any) -> None:
+    if setting == "CACHES":
+        caches.reset()
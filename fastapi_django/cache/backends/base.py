@@ -0,0 +1,65 @@
+"""Base cache class."""
+import asyncio
+from typing import Any, Callable
+
+# timeout по умолчанию - из настроек бэкенда.  None - без ограничения времени жизни
+DEFAULT_TIMEOUT = object()
+_missing = object()
+
+
+class BaseCache:
+    """
+    Базовый класс бэкенда кэша
+
+    Ключи формируются как <key_prefix>:<version>:<key>, поэтому все значения можно инвалидировать, увеличив
+    VERSION в настройках кэша, а отдельное значение - передав свой version
+    """
+
+    def __init__(
+        self,
+        location: str | None = None,
+        timeout: int | float | None = 300,
+        key_prefix: str = "",
+        version: int = 1,
+        **options: Any,
+    ):
+        self.location = location
+        self.default_timeout = timeout
+        self.key_prefix = key_prefix
+        self.version = version
+
+    def make_key(self, key: str, version: int | None = None) -> str:
+        return f"{self.key_prefix}:{self.version if version is None else version}:{key}"
+
+    def get_timeout(self, timeout: Any = DEFAULT_TIMEOUT) -> int | float | None:
+        return self.default_timeout if timeout is DEFAULT_TIMEOUT else timeout
+
+    def get(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        raise NotImplementedError("subclasses of BaseCache must provide a get() method")
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        raise NotImplementedError("subclasses of BaseCache must provide a set() method")
+
+    def delete(self, key: str, version: int | None = None) -> bool:
+        raise NotImplementedError("subclasses of BaseCache must provide a delete() method")
+
+    def clear(self) -> None:
+        raise NotImplementedError("subclasses of BaseCache must provide a clear() method")
+
+    async def aget(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        """Асинхронный get().  Выполняется в отдельном потоке, т.к. бэкенд может обращаться к диску или сети"""
+        return await asyncio.to_thread(self.get, key, default, version)
+
+    async def aset(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        """Асинхронный set().  Выполняется в отдельном потоке, т.к. бэкенд может обращаться к диску или сети"""
+        await asyncio.to_thread(self.set, key, value, timeout, version)
+
+    def get_or_set(
+        self, key: str, default: Callable[[], Any], timeout: Any = DEFAULT_TIMEOUT, version: int | None = None
+    ) -> Any:
+        """Возвращает значение из кэша, а если его нет, то вычисляет default() и сохраняет в кэш"""
+        value = self.get(key, _missing, version=version)
+        if value is _missing:
+            value = default()
+            self.set(key, value, timeout, version=version)
+        return value
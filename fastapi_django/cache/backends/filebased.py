@@ -0,0 +1,92 @@
+"""File-based cache backend."""
+import hashlib
+import json
+import os
+import stat
+import tempfile
+import time
+from typing import Any
+
+from fastapi_django.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from fastapi_django.exceptions import ImproperlyConfigured
+
+
+class FileBasedCache(BaseCache):
+    """
+    Кэш в файлах в директории LOCATION.  Общий для воркеров и переживает перезапуск приложения, поэтому годится
+    как локальная замена внешнего кэша
+
+    Значения сериализуются в JSON, а не pickle: подложенный в директорию файл не может выполнить код при чтении.
+    Поэтому в кэше можно хранить только строки, числа, списки и словари (кортежи возвращаются списками).  Директория
+    создается с правами 0700 и должна принадлежать пользователю, от которого запущено приложение, и не быть доступной
+    на запись другим - иначе в нее можно подложить значения (напр., фрагменты шаблонов)
+    """
+
+    cache_suffix = ".cache"
+
+    def __init__(self, location: str | None = None, **kwargs: Any):
+        super().__init__(location, **kwargs)
+        if not location:
+            raise ImproperlyConfigured("Для FileBasedCache необходимо задать LOCATION - директорию кэша")
+        self.directory = os.path.abspath(location)
+        try:
+            os.makedirs(self.directory, mode=0o700, exist_ok=True)
+            st = os.stat(self.directory)
+        except OSError as e:
+            raise ImproperlyConfigured(f"Не удалось создать директорию кэша {self.directory}: {e}") from e
+        if not stat.S_ISDIR(st.st_mode):
+            raise ImproperlyConfigured(f"LOCATION кэша {self.directory} не является директорией")
+        if hasattr(os, "getuid") and st.st_uid != os.getuid():
+            raise ImproperlyConfigured(f"Директория кэша {self.directory} принадлежит другому пользователю")
+        if st.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+            raise ImproperlyConfigured(f"Директория кэша {self.directory} доступна на запись другим пользователям")
+
+    def _key_to_file(self, key: str, version: int | None = None) -> str:
+        key = self.make_key(key, version)
+        return os.path.join(self.directory, hashlib.md5(key.encode()).hexdigest() + self.cache_suffix)
+
+    def get(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        fname = self._key_to_file(key, version)
+        try:
+            with open(fname, "rb") as f:
+                expires_at, value = json.load(f)
+        except FileNotFoundError:
+            return default
+        except (ValueError, TypeError):
+            # файл поврежден или записан в другом формате (напр., pickle предыдущей версией)
+            self._delete(fname)
+            return default
+        if expires_at is not None and expires_at <= time.time():
+            self._delete(fname)
+            return default
+        return value
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        timeout = self.get_timeout(timeout)
+        expires_at = None if timeout is None else time.time() + timeout
+        fname = self._key_to_file(key, version)
+        data = json.dumps([expires_at, value], ensure_ascii=False).encode()
+        # пишем во временный файл и переименовываем, чтобы другой воркер не прочитал файл наполовину
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, fname)
+        except BaseException:
+            self._delete(tmp_path)
+            raise
+
+    def delete(self, key: str, version: int | None = None) -> bool:
+        return self._delete(self._key_to_file(key, version))
+
+    def _delete(self, fname: str) -> bool:
+        try:
+            os.remove(fname)
+        except FileNotFoundError:
+            return False
+        return True
+
+    def clear(self) -> None:
+        for fname in os.listdir(self.directory):
+            if fname.endswith(self.cache_suffix):
+                self._delete(os.path.join(self.directory, fname))
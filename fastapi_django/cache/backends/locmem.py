@@ -0,0 +1,60 @@
+"""Thread-safe in-memory cache backend."""
+import threading
+import time
+from collections import OrderedDict
+from typing import Any
+
+from fastapi_django.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+
+class LocMemCache(BaseCache):
+    """
+    Кэш в памяти процесса с вытеснением давно не использованных значений (LRU), если их больше max_entries,
+    и временем жизни значений (TTL)
+    """
+
+    def __init__(self, location: str | None = None, max_entries: int = 1000, **kwargs: Any):
+        super().__init__(location, **kwargs)
+        self.max_entries = max_entries
+        # ключ: (значение, время истечения или None)
+        self._cache: OrderedDict[str, tuple[Any, float | None]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        key = self.make_key(key, version)
+        with self._lock:
+            item = self._cache.get(key)
+            if item is None:
+                return default
+            value, expires_at = item
+            if expires_at is not None and expires_at <= time.monotonic():
+                del self._cache[key]
+                return default
+            self._cache.move_to_end(key)
+            return value
+
+    def set(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        key = self.make_key(key, version)
+        timeout = self.get_timeout(timeout)
+        expires_at = None if timeout is None else time.monotonic() + timeout
+        with self._lock:
+            self._cache[key] = (value, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+
+    # значения в памяти, поэтому get() и set() не блокируют цикл событий и отдельный поток не нужен
+
+    async def aget(self, key: str, default: Any = None, version: int | None = None) -> Any:
+        return self.get(key, default, version)
+
+    async def aset(self, key: str, value: Any, timeout: Any = DEFAULT_TIMEOUT, version: int | None = None) -> None:
+        self.set(key, value, timeout, version)
+
+    def delete(self, key: str, version: int | None = None) -> bool:
+        with self._lock:
+            return self._cache.pop(self.make_key(key, version), None) is not None
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cache.clear()
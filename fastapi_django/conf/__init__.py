@@ -1,47 +1,72 @@
+import copy
+import functools
 import importlib
+import inspect
 import os
+import typing
+from typing import Any, Callable
+
+from pydantic import TypeAdapter, ValidationError
 
 from fastapi_django.conf import global_settings
+from fastapi_django.exceptions import ImproperlyConfigured
 
 ENVIRONMENT_VARIABLE = "FASTAPI_DJANGO_SETTINGS_MODULE"
 empty = object()
 
+# функции, которые вызываются с (setting, value) при изменении настройки в override_settings
+_setting_changed_receivers: list[Callable[[str, Any], None]] = []
+
+
+def on_setting_changed(func: Callable[[str, Any], None]) -> Callable[[str, Any], None]:
+    """
+    Регистрирует функцию, которая вызывается при изменении настройки в override_settings.  Нужна, чтобы сбросить
+    то, что было построено по настройкам (бэкенды, кэши и т.д.)
+    """
+    _setting_changed_receivers.append(func)
+    return func
+
 
 class LazySettings:
+    """
+    Настройки загружаются и проверяются один раз - при первом обращении или в fastapi_django.setup().  Значения
+    хранятся в __dict__ объекта, поэтому обращение к настройке - это обычное чтение атрибута.  Присвоить или удалить
+    настройку нельзя, подменить ее (напр., в тестах) можно через override_settings
+
+    Значения-контейнеры (CACHES, TEMPLATES_ENV_OPTIONS и т.д.) не копируются и не замораживаются: их передают, напр.,
+    в logging.config.dictConfig(), которому нужны обычные dict.  Изменение такого значения (settings.CACHES["default"]
+    ["TIMEOUT"] = 1) изменит его во всех снимках и не сбросит построенные по настройкам объекты - вместо этого
+    подменяйте настройку целиком через override_settings
+    """
+
     def __init__(self):
-        self._wrapped = empty
+        self.__dict__["_wrapped"] = empty
 
-    def _setup(self, name=None):
+    def _setup(self):
         settings_module = os.environ.get(ENVIRONMENT_VARIABLE, "settings")
         if not settings_module:
             raise ValueError("не сконфигурировано")
 
-        self._wrapped = Settings(settings_module)
+        self._configure(Settings(settings_module))
+
+    def _configure(self, wrapped: "Settings") -> None:
+        # снимок подменяется целиком одним присваиванием, поэтому читающий код не увидит смесь старых и новых значений
+        object.__setattr__(self, "__dict__", {"_wrapped": wrapped, **wrapped.as_dict()})
+
+    def _get_wrapped(self) -> "Settings":
+        if self._wrapped is empty:
+            self._setup()
+        return self._wrapped
 
     def __getattr__(self, name):
-        if (_wrapped := self._wrapped) is empty:
-            self._setup(name)
-            _wrapped = self._wrapped
-        val = getattr(_wrapped, name)
-        if name in {"MEDIA_URL", "STATIC_URL"} and val is not None:
-            val = self._add_script_prefix(val)
-        elif name == "SECRET_KEY" and not val:
-            raise ValueError("The SECRET_KEY setting must not be empty.")
-
-        self.__dict__[name] = val
-        return val
+        # вызывается, только если атрибута нет в __dict__: до загрузки настроек или для отсутствующей настройки
+        return getattr(self._get_wrapped(), name)
 
     def __setattr__(self, name, value):
-        if name == "_wrapped":
-            self.__dict__.clear()
-        else:
-            self.__dict__.pop(name, None)
-        super().__setattr__(name, value)
+        raise AttributeError(f"Настройки неизменяемы, для подмены {name} используйте override_settings")
 
     def __delattr__(self, name):
-        """Delete a setting and clear it from cache if needed."""
-        super().__delattr__(name)
-        self.__dict__.pop(name, None)
+        raise AttributeError(f"Настройки неизменяемы, для подмены {name} используйте override_settings")
 
     @property
     def configured(self):
@@ -49,16 +74,10 @@ class LazySettings:
         return self._wrapped is not empty
 
     def __dir__(self):
-        if self._wrapped is empty:
-            self._setup()
-        return dir(self._wrapped)
+        return dir(self._get_wrapped())
 
     def extend(self, settings_module=None):
-        mod = importlib.import_module(settings_module)
-        for setting in dir(mod):
-            if setting.isupper() and not hasattr(self, setting):
-                value = getattr(mod, setting)
-                setattr(self, setting, value)
+        self._configure(self._get_wrapped().extend(settings_module))
         return self
 
 
@@ -90,6 +109,45 @@ class Settings:
                 setattr(self, setting, setting_value)
                 self._explicit_settings.add(setting)
 
+        self._annotations = {**get_annotations(global_settings), **get_annotations(mod)}
+        self._validate(self.as_dict())
+        self._frozen = True
+
+    def _validate(self, values: dict[str, Any]) -> None:
+        """Проверяет значения настроек, для которых в global_settings или в модуле настроек указан тип"""
+        for setting, value in values.items():
+            if (annotation := self._annotations.get(setting)) is None:
+                continue
+            try:
+                TypeAdapter(annotation).validate_python(value, strict=True)
+            except ValidationError as e:
+                raise ImproperlyConfigured(f"Неверное значение настройки {setting}: {e}") from None
+        if "SECRET_KEY" in values and not values["SECRET_KEY"]:
+            raise ImproperlyConfigured("The SECRET_KEY setting must not be empty.")
+
+    def as_dict(self) -> dict[str, Any]:
+        return {setting: value for setting, value in vars(self).items() if setting.isupper()}
+
+    def override(self, **kwargs: Any) -> "Settings":
+        """Копия настроек с подмененными значениями"""
+        self._validate(kwargs)
+        new = copy.copy(self)
+        new.__dict__.update(kwargs)
+        new.__dict__["_explicit_settings"] = self._explicit_settings | kwargs.keys()
+        return new
+
+    def extend(self, settings_module) -> "Settings":
+        """Копия настроек, дополненная настройками модуля settings_module, которых еще нет"""
+        mod = importlib.import_module(settings_module)
+        return self.override(
+            **{setting: getattr(mod, setting) for setting in dir(mod) if setting.isupper() and setting not in vars(self)}
+        )
+
+    def __setattr__(self, name, value):
+        if self.__dict__.get("_frozen"):
+            raise AttributeError(f"Настройки неизменяемы, для подмены {name} используйте override_settings")
+        super().__setattr__(name, value)
+
     def is_overridden(self, setting):
         return setting in self._explicit_settings
 
@@ -97,4 +155,66 @@ class Settings:
         return f'<{self.__class__.__name__} "{self.SETTINGS_MODULE}">'
 
 
+def get_annotations(mod) -> dict[str, Any]:
+    return {name: hint for name, hint in typing.get_type_hints(mod).items() if name.isupper()}
+
+
+class override_settings:
+    """
+    Подменяет настройки на время выполнения блока или функции (в т.ч. асинхронной):
+
+        with override_settings(DEFAULT_EMAIL_PROVIDER_ALIAS="locmem"):
+            ...
+
+        @override_settings(CACHES={...})
+        async def test_cache():
+            ...
+
+    Снимок настроек подменяется целиком, а при выходе восстанавливается предыдущий.  Функции, зарегистрированные
+    через on_setting_changed, вызываются для каждой подмененной настройки при входе и выходе.  Декорированная
+    функция при каждом вызове использует свой экземпляр override_settings, поэтому каждый вызов восстанавливает
+    свой предыдущий снимок.  Настройки общие для процесса, поэтому одновременные (в разных задачах) подмены
+    восстанавливаются правильно, только если выходят в порядке, обратном входу
+    """
+
+    def __init__(self, **kwargs: Any):
+        self.options = kwargs
+        self._previous: list[Settings] = []
+
+    def __enter__(self):
+        previous = settings._get_wrapped()
+        wrapped = previous.override(**self.options)
+        self._previous.append(previous)
+        settings._configure(wrapped)
+        self._notify(wrapped)
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        previous = self._previous.pop()
+        settings._configure(previous)
+        self._notify(previous)
+
+    def _notify(self, wrapped: Settings) -> None:
+        for setting in self.options:
+            value = getattr(wrapped, setting, None)
+            for receiver in _setting_changed_receivers:
+                receiver(setting, value)
+
+    def __call__(self, func):
+        if inspect.iscoroutinefunction(func):
+            @functools.wraps(func)
+            async def async_wrapper(*args, **kwargs):
+                with self.__class__(**self.options):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.__class__(**self.options):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+
 settings = LazySettings()
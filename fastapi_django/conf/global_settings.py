@@ -1,17 +1,44 @@
-from typing import Any
+from typing import Any, Callable, Sequence
 
-UVICORN_APP = "web.app:create_app"
-UVICORN_HOST = "localhost"
-UVICORN_PORT = 8000
-UVICORN_WORKERS = 1
-UVICORN_FACTORY = True
-UVICORN_RELOAD = True
+# для настроек с указанным типом значение проверяется при загрузке настроек (см. conf.Settings).  тип можно
+# указать и для настроек проекта в модуле настроек
 
-API_PREFIX = ""
+UVICORN_APP: str = "web.app:create_app"
+UVICORN_HOST: str = "localhost"
+UVICORN_PORT: int = 8000
+UVICORN_WORKERS: int = 1
+UVICORN_FACTORY: bool = True
+UVICORN_RELOAD: bool = True
 
-MIDDLEWARES = ["default.middleware.example.Middleware"]
+API_PREFIX: str = ""
+# класс ответа по умолчанию для get_default_app()
+API_DEFAULT_RESPONSE_CLASS: str = "fastapi_django.responses.FastJSONResponse"
+# файл со схемой OpenAPI, созданный командой openapi.  если файл существует, то схема загружается из него,
+# а не строится при запуске
+API_OPENAPI_FILE: str | None = None
 
-PROMETHEUS_ENABLED = False
+# middleware в порядке от внешнего к внутреннему (см. fastapi_django.middleware.get_middleware):
+# MIDDLEWARES = [
+#     "fastapi_django.middleware.request_id.RequestIdMiddleware",
+#     ("fastapi_django.middleware.timing.TimingMiddleware", {"slow_threshold": 1}),
+#     ("starlette.middleware.trustedhost.TrustedHostMiddleware", {"allowed_hosts": ["example.com"]}),
+#     ("fastapi_django.middleware.compression.CompressionMiddleware", {"minimum_size": 1000}),
+# ]
+MIDDLEWARES: Sequence[str | tuple | Callable] = []
+
+PROMETHEUS_ENABLED: bool = False
+
+# шаги прогрева, которые выполняются параллельно при запуске приложения (см. fastapi_django.warmup)
+WARMUP_STEPS: Sequence[str] = [
+    "fastapi_django.warmup.setup_email_providers",
+    "fastapi_django.warmup.configure_mappers",
+    "fastapi_django.warmup.connect_database",
+    "fastapi_django.warmup.build_openapi",
+    "fastapi_django.warmup.hash_static_files",
+    "fastapi_django.warmup.compile_templates",
+]
+# урл проверки готовности: 503, пока не завершен прогрев.  None - не добавлять
+WARMUP_READINESS_URL: str | None = "/ready"
 
 DATABASE: dict = {}
 # пример:
@@ -27,23 +54,46 @@ DATABASE: dict = {}
 #         "echo": True,
 #         "pool_recycle": 3600,
 #         # другие параметры, которые будут переданы как kw в функцию create_async_engine()
-#     }
+#     },
+#     "ASYNCPG": {
+#         "STATEMENT_CACHE_SIZE": 100,
+#         "PREPARED_STATEMENT_CACHE_SIZE": 100,
+#         "PREPARED_STATEMENTS": "named",  # named, unique или unnamed
+#         "JIT": False,
+#     },
 # }
 
-MANAGEMENT: list[dict] = []
+MANAGEMENT: Sequence[dict] = []
 
 LOGGING: dict[str, Any] = {}
 
 EMAIL_PROVIDERS: dict[str, Any] = {}
 
-DEFAULT_CHARSET = "utf-8"
+DEFAULT_CHARSET: str = "utf-8"
 
 # Whether to send SMTP 'Date' header in the local time zone or in UTC.
-EMAIL_USE_LOCALTIME = False
+EMAIL_USE_LOCALTIME: bool = False
+
+DEFAULT_EMAIL_PROVIDER_ALIAS: str = "default"
+
+# сколько секунд при остановке приложения ждать отправки писем из очередей (см. mail.backends.queued)
+EMAIL_QUEUE_DRAIN_TIMEOUT: int | float = 30
 
-DEFAULT_EMAIL_PROVIDER_ALIAS = "default"
+# кэш (см. fastapi_django.cache)
+CACHES: dict[str, Any] = {
+    "default": {
+        "BACKEND": "fastapi_django.cache.backends.locmem.LocMemCache",
+    },
+}
 
 # рендеринг шаблонов
 
-TEMPLATES_DIRECTORY = "templates"
+TEMPLATES_DIRECTORY: str = "templates"
 TEMPLATES_ENV_OPTIONS: dict = {}
+# директория кэша байткода шаблонов, если TEMPLATES_ENV_OPTIONS["bytecode_cache"] = "filesystem".
+# None - временная директория
+TEMPLATES_BYTECODE_CACHE_DIRECTORY: str | None = None
+# алиас кэша (CACHES) для тега {% cache %} и render_to_string(cache_key=...)
+TEMPLATES_FRAGMENT_CACHE_ALIAS: str = "default"
+# увеличение версии сбрасывает все закэшированные фрагменты шаблонов
+TEMPLATES_FRAGMENT_CACHE_VERSION: int = 1
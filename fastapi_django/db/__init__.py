@@ -1,7 +1,11 @@
+from typing import Any
+from uuid import uuid4
+
 from sqlalchemy import URL
 from sqlalchemy.ext.asyncio import create_async_engine
 
 from fastapi_django.conf import settings
+from fastapi_django.db.statistics import track_statement_cache
 from fastapi_django.exceptions import ImproperlyConfigured
 
 
@@ -12,31 +16,103 @@ from fastapi_django.exceptions import ImproperlyConfigured
 #  по умолчанию не устанавливать библиотеку SQLAlchemy
 #  проверять факт установки SQLAlchemy
 
+PREPARED_STATEMENT_NAME_FUNCS = {
+    # имена генерирует asyncpg (__asyncpg_stmt_N__)
+    "named": None,
+    # уникальные имена.  необходимо за PgBouncer в режиме transaction, иначе имена
+    # пересекаются на разных серверных соединениях
+    "unique": lambda: f"__asyncpg_{uuid4()}__",
+    # безымянные prepared statements протокола PostgreSQL.  каждый следующий prepare на соединении заменяет
+    # безымянный statement на сервере, поэтому кэш prepared statements диалекта SQLAlchemy при этом отключается
+    "unnamed": lambda: "",
+}
+
+
+def get_asyncpg_options(options: dict[str, Any]) -> dict[str, Any]:
+    """
+    Переводит настройки DATABASE["ASYNCPG"] в параметры create_async_engine():
+
+        DATABASE = {
+            "DRIVERNAME": "postgresql+asyncpg",
+            ...
+            "ASYNCPG": {
+                "STATEMENT_CACHE_SIZE": 100,  # кэш prepared statements самого asyncpg
+                "PREPARED_STATEMENT_CACHE_SIZE": 100,  # кэш prepared statements диалекта SQLAlchemy
+                "PREPARED_STATEMENTS": "named",  # named, unique или unnamed
+                "JIT": False,  # параметр jit сервера PostgreSQL
+            }
+        }
+
+    Заданные явно в OPTIONS["connect_args"] параметры имеют приоритет
+
+    При PREPARED_STATEMENTS="unnamed" кэш prepared statements диалекта отключается (PREPARED_STATEMENT_CACHE_SIZE
+    может быть только 0): закэшированный безымянный statement был бы заменен на сервере следующим prepare
+    """
+    connect_args = {}
+    if (size := options.get("STATEMENT_CACHE_SIZE")) is not None:
+        connect_args["statement_cache_size"] = size
+    if (size := options.get("PREPARED_STATEMENT_CACHE_SIZE")) is not None:
+        connect_args["prepared_statement_cache_size"] = size
+    if (prepared_statements := options.get("PREPARED_STATEMENTS")) is not None:
+        if prepared_statements not in PREPARED_STATEMENT_NAME_FUNCS:
+            raise ImproperlyConfigured(
+                f"Некорректное значение DATABASE['ASYNCPG']['PREPARED_STATEMENTS'] - {prepared_statements}. "
+                f"Допустимые значения: {', '.join(PREPARED_STATEMENT_NAME_FUNCS)}"
+            )
+        if prepared_statements == "unnamed":
+            if connect_args.get("prepared_statement_cache_size", 0) != 0:
+                raise ImproperlyConfigured(
+                    "DATABASE['ASYNCPG']['PREPARED_STATEMENT_CACHE_SIZE'] должен быть равен 0 при "
+                    "PREPARED_STATEMENTS='unnamed'"
+                )
+            connect_args["prepared_statement_cache_size"] = 0
+        if name_func := PREPARED_STATEMENT_NAME_FUNCS[prepared_statements]:
+            connect_args["prepared_statement_name_func"] = name_func
+    if (jit := options.get("JIT")) is not None:
+        connect_args["server_settings"] = {"jit": "on" if jit else "off"}
+    return connect_args
+
 
 class EngineProxy:
-    def __init__(self):
-        if not settings.DATABASE:
-            raise ImproperlyConfigured("База данных не сконфигурирована")
-        # TODO: прочекать параметры для разных диалектов
-        url = URL.create(
-            drivername=settings.DATABASE["DRIVERNAME"],
-            username=settings.DATABASE.get("USERNAME"),
-            password=settings.DATABASE.get("PASSWORD"),
-            host=settings.DATABASE.get("HOST"),
-            port=settings.DATABASE.get("PORT"),
-            database=settings.DATABASE["DATABASE"],
-        )
-        kw = settings.DATABASE.get("OPTIONS", {})
-        self.__dict__["_engine"] = create_async_engine(url, **kw)  # иначе будет RecursionError: maximum recursion depth exceeded
+    # движок создается при первом обращении, поэтому импорт модуля не требует настроенной БД (напр., в тестах)
+
+    def _get_engine(self):
+        if (engine := self.__dict__.get("_engine")) is None:
+            # через __dict__, иначе будет RecursionError: maximum recursion depth exceeded
+            engine = self.__dict__["_engine"] = create_engine()
+        return engine
 
     def __getattr__(self, item):
-        return getattr(self._engine, item)
+        return getattr(self._get_engine(), item)
 
     def __setattr__(self, name, value):
-        return setattr(self._engine, name, value)
+        return setattr(self._get_engine(), name, value)
 
     def __delattr__(self, name):
-        return delattr(self._engine, name)
+        return delattr(self._get_engine(), name)
+
+
+def create_engine():
+    if not settings.DATABASE:
+        raise ImproperlyConfigured("База данных не сконфигурирована")
+    # TODO: прочекать параметры для разных диалектов
+    url = URL.create(
+        drivername=settings.DATABASE["DRIVERNAME"],
+        username=settings.DATABASE.get("USERNAME"),
+        password=settings.DATABASE.get("PASSWORD"),
+        host=settings.DATABASE.get("HOST"),
+        port=settings.DATABASE.get("PORT"),
+        database=settings.DATABASE["DATABASE"],
+    )
+    kw = {**settings.DATABASE.get("OPTIONS", {})}
+    if asyncpg_options := settings.DATABASE.get("ASYNCPG"):
+        if url.get_driver_name() != "asyncpg":
+            raise ImproperlyConfigured("Настройка DATABASE['ASYNCPG'] применима только к драйверу asyncpg")
+        connect_args = get_asyncpg_options(asyncpg_options)
+        kw["connect_args"] = {**connect_args, **kw.get("connect_args", {})}
+    engine = create_async_engine(url, **kw)
+    track_statement_cache(engine.sync_engine)
+    return engine
 
 
 engine = EngineProxy()
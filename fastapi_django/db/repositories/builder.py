@@ -1,11 +1,14 @@
 import logging
-from typing import Any, Type, Self
+from functools import lru_cache
+from operator import itemgetter
+from typing import Any, Callable, NamedTuple, Type, Self
 
 from sqlalchemy import Select, select, func, delete, Delete, update, Update
-from sqlalchemy.orm import contains_eager, aliased
+from sqlalchemy.orm import contains_eager, aliased, defaultload, load_only, defer
+from sqlalchemy.orm.util import AliasedClass
 from sqlalchemy.sql.operators import eq
 
-from fastapi_django.db.repositories.constants import LOOKUP_SEP
+from fastapi_django.db.repositories.constants import LOOKUP_SEP, ALIAS_PREFIX, ROOT_ALIAS
 from fastapi_django.db.repositories.lookups import lookups
 from fastapi_django.db.types import Model
 from fastapi_django.db.utils import get_column, get_pk, get_relationships, get_columns, get_annotations
@@ -41,6 +44,102 @@ class InvalidJoinFieldError(Exception):
         super().__init__(error)
 
 
+class InvalidOnlyFieldError(Exception):
+
+    def __init__(self, only_field: str):
+        error = f"Некорректное поле для only - {only_field}"
+        super().__init__(error)
+
+
+class InvalidDeferFieldError(Exception):
+
+    def __init__(self, defer_field: str):
+        error = f"Некорректное поле для defer - {defer_field}"
+        super().__init__(error)
+
+
+class FilterPath(NamedTuple):
+    # разобранное поле фильтрации, напр., для subsections__status__code__in:
+    #   relations=(("subsections", Subsection), ("status", PublicationStatus)), column_name="code", op=in_op
+    relations: tuple[tuple[str, Type[Model]], ...]
+    column_name: str
+    op: Callable
+
+
+@lru_cache(maxsize=1024)
+def resolve_filter_field(model_cls: Type[Model], filter_field: str) -> FilterPath:
+    """
+    Разбирает поле фильтрации на связи, столбец и операцию
+
+    Результат кэшируется, тк набор полей фильтрации конечен и задается в коде, а разбор
+    требует инспекции моделей на каждом шаге пути
+    """
+    column_name, op = None, eq
+    relations = []
+    expected = get_annotations(model_cls)
+    for attr in filter_field.split(LOOKUP_SEP):
+        relationships = get_relationships(model_cls)
+        columns = get_columns(model_cls)
+        if attr not in expected:
+            raise InvalidFilterFieldError(filter_field)
+        if attr in relationships:
+            model_cls = getattr(model_cls, attr).property.mapper.class_
+            relations.append((attr, model_cls))
+            expected = get_annotations(model_cls)
+        elif attr in columns:
+            column_name = attr
+            expected = lookups
+        elif attr in lookups:
+            op = lookups[attr]
+            expected = {}
+        else:
+            raise InvalidFilterFieldError(filter_field)
+    if not column_name:
+        raise InvalidFilterFieldError(filter_field)
+    return FilterPath(tuple(relations), column_name, op)
+
+
+class OrderBy(NamedTuple):
+    """
+    Поле сортировки с дополнительными параметрами.  Может быть передано в QuerySet.order_by() наравне
+    со строками:
+
+        >>> queryset.order_by("-id", OrderBy("published_at", descending=True, nulls="last"))
+        >>> queryset.order_by(OrderBy("name", collation="C"))
+    """
+
+    field: str
+    descending: bool = False
+    nulls: str | None = None  # first или last
+    collation: str | None = None
+
+    @classmethod
+    def parse(cls, ordering_field: str) -> Self:
+        # "-name" -> OrderBy("name", descending=True)
+        ordering_field = ordering_field.strip("+")
+        return cls(ordering_field.strip("-"), descending=ordering_field.startswith("-"))
+
+
+def get_order_by_clause(column: Any, item: dict) -> Any:
+    if collation := item.get("collation"):
+        column = column.collate(collation)
+    column = column.asc() if item["direction"] == "asc" else column.desc()
+    if nulls := item.get("nulls"):
+        column = column.nulls_first() if nulls == "first" else column.nulls_last()
+    return column
+
+
+def copy_joins(joins: dict) -> dict:
+    # дерево джойнов копируется по уровням, иначе filter()/order_by()/join() копии изменяли бы исходный построитель
+    copy = {**joins}
+    if "children" in joins:
+        copy["children"] = {attr: copy_joins(child) for attr, child in joins["children"].items()}
+    for key in ("where", "order_by"):
+        if key in joins:
+            copy[key] = {**joins[key]}
+    return copy
+
+
 class QueryBuilder:
     """
     Обертка над запросом SQLAlchemy.  Хранит параметры запроса.  Предоставляет методы для
@@ -76,11 +175,16 @@ class QueryBuilder:
 
         {
             "status_id": {
-                "direction": "asc"
+                "direction": "asc",
+                "nulls": None,
+                "collation": None,
+                "position": 0,
             },
         }
 
-        где status_id - наименование поля сортировки, а direction - направление сортировки
+        где status_id - наименование поля сортировки, direction - направление сортировки, nulls - положение
+        NULL-значений (first, last), collation - правило сортировки (COLLATE), а position - порядковый номер
+        сортировки.  По position сортировки по полям модели и связных моделей сводятся в одну последовательность
 
     - JOIN-ы
 
@@ -100,10 +204,12 @@ class QueryBuilder:
                     },
                     "order_by": {
                         'status_id': {
-                            'direction': 'asc'
+                            'direction': 'asc',
+                            'position': 1,
                         },
                         'name': {
-                            'direction': 'desc'
+                            'direction': 'desc',
+                            'position': 2,
                         },
                     },
                     "is_outer": False,
@@ -132,14 +238,35 @@ class QueryBuilder:
 
         ["subsections__status", "status"]
 
+    - АЛИАСЫ
+
+    Связные модели join-ятся через алиасы, имена которых строятся из пути связи (t_subsections__status).
+    Алиасы хранятся в атрибуте _aliases и переиспользуются построителем и его копиями, поэтому одинаковые
+    запросы дают одинаковый SQL, что положительно влияет на кэши скомпилированных запросов SQLAlchemy,
+    prepared statements и планов запросов в БД
+
+    - ONLY, DEFER
+
+    Сохраняются как есть в атрибутах _only и _defer:
+
+        {"id", "name", "subsections__name"}
+
+    При построении запроса поля группируются по связям и превращаются в load_only()/defer().  Для связей,
+    заданных в options, load_only()/defer() добавляются в цепочку contains_eager, для остальных - в
+    defaultload, т.е. будут учтены при последующей загрузке связи
+
     """
 
     def __init__(self, model_cls: Type[Model]):
         self._model_cls = model_cls
         self._where: dict = {}
         self._order_by: dict = {}
+        self._order_by_position = 0
         self._joins: dict = {}
         self._options: set = set()
+        self._only: set = set()
+        self._defer: set = set()
+        self._aliases: dict = {}
         self._limit = None
         self._offset = None
         self._returning: list = []
@@ -151,8 +278,12 @@ class QueryBuilder:
         clone = self.__class__(self._model_cls)
         clone._where = {**self._where}
         clone._order_by = {**self._order_by}
-        clone._joins = {**self._joins}
+        clone._order_by_position = self._order_by_position
+        clone._joins = copy_joins(self._joins)
         clone._options = {*self._options}
+        clone._only = {*self._only}
+        clone._defer = {*self._defer}
+        clone._aliases = self._aliases  # алиасы определяются только путем связи, поэтому могут быть общими
         clone._returning = [*self._returning]
         clone._execution_options = {**self._execution_options}
         clone._select_entities = [*self._select_entities]
@@ -163,52 +294,33 @@ class QueryBuilder:
 
     def filter(self, **kw: dict[str:Any]) -> None:
         for filter_field, filter_value in kw.items():
-            model_cls = self._model_cls
-            column_name, op = None, eq
-            joins = self._joins
-            expected = get_annotations(model_cls)
-            where = self._where
-            column_name = filter_field
-            for attr in filter_field.split(LOOKUP_SEP):
-                relationships = get_relationships(model_cls)
-                columns = get_columns(model_cls)
-                if attr not in expected:
-                    raise InvalidFilterFieldError(filter_field)
-                if attr in relationships:
-                    model_cls = getattr(model_cls, attr).property.mapper.class_
-                    joins = joins.setdefault("children", {}).setdefault(attr, {})
-                    joins["model_cls"] = model_cls
-                    if "where" in joins:
-                        where = joins["where"]
-                    else:
-                        joins["where"] = {}
-                        where = joins["where"]
-                    expected = get_annotations(model_cls)
-                elif attr in columns:
-                    column_name = attr
-                    expected = lookups
-                elif attr in lookups:
-                    op = lookups[attr]
-                    expected = {}
-                else:
-                    raise InvalidFilterFieldError(filter_field)
-            if not column_name:
-                raise InvalidFilterFieldError(filter_field)
-            where[column_name] = {"op": op, "value": filter_value}
+            self.apply_filter(resolve_filter_field(self._model_cls, filter_field), filter_value)
 
-    def order_by(self, *args: str) -> None:
+    def apply_filter(self, filter_path: FilterPath, filter_value: Any) -> None:
+        joins = self._joins
+        where = self._where
+        for attr, model_cls in filter_path.relations:
+            joins = joins.setdefault("children", {}).setdefault(attr, {})
+            joins["model_cls"] = model_cls
+            where = joins.setdefault("where", {})
+        where[filter_path.column_name] = {"op": filter_path.op, "value": filter_value}
+
+    def order_by(self, *args: str | OrderBy) -> None:
         for ordering_field in args:
+            if isinstance(ordering_field, str):
+                ordering_field = OrderBy.parse(ordering_field)
+            if ordering_field.nulls not in (None, "first", "last"):
+                raise ValueError("nulls может принимать значения first или last")
             model_cls = self._model_cls
             joins = self._joins
             column_name = None
             order_by = self._order_by
-            ordering_field = ordering_field.strip("+")
             expected = get_annotations(model_cls)
-            for attr in ordering_field.strip("-").split(LOOKUP_SEP):
+            for attr in ordering_field.field.split(LOOKUP_SEP):
                 relationships = get_relationships(model_cls)
                 columns = get_columns(model_cls)
                 if attr not in expected:
-                    raise InvalidOrderByFieldError(ordering_field)
+                    raise InvalidOrderByFieldError(ordering_field.field)
                 if attr in relationships:
                     model_cls = getattr(model_cls, attr).property.mapper.class_
                     joins = joins.setdefault("children", {}).setdefault(attr, {})
@@ -223,12 +335,16 @@ class QueryBuilder:
                     column_name = attr
                     expected = {}
                 else:
-                    raise InvalidOrderByFieldError(ordering_field)
+                    raise InvalidOrderByFieldError(ordering_field.field)
             if column_name is None:
-                raise InvalidOrderByFieldError(ordering_field)
+                raise InvalidOrderByFieldError(ordering_field.field)
             order_by[column_name] = {
-                "direction": "desc" if ordering_field.startswith("-") else "asc"
+                "direction": "desc" if ordering_field.descending else "asc",
+                "nulls": ordering_field.nulls,
+                "collation": ordering_field.collation,
+                "position": self._order_by_position,
             }
+            self._order_by_position += 1
 
     def options(self, *args: str) -> None:
         for option_field in args:
@@ -245,6 +361,27 @@ class QueryBuilder:
                     raise InvalidOptionFieldError(option_field)
             self._options.add(option_field)
 
+    def only(self, *args: str) -> None:
+        # как и в Django, повторный вызов only() заменяет ранее заданные поля
+        for only_field in args:
+            self._validate_projection_field(only_field, InvalidOnlyFieldError)
+        self._only = set(args)
+
+    def defer(self, *args: str) -> None:
+        for defer_field in args:
+            self._validate_projection_field(defer_field, InvalidDeferFieldError)
+        self._defer.update(args)
+
+    def _validate_projection_field(self, field: str, error_cls: Type[Exception]) -> None:
+        model_cls = self._model_cls
+        *relations, column_name = field.split(LOOKUP_SEP)
+        for attr in relations:
+            if attr not in get_relationships(model_cls):
+                raise error_cls(field)
+            model_cls = getattr(model_cls, attr).property.mapper.class_
+        if column_name not in get_columns(model_cls):
+            raise error_cls(field)
+
     def returning(self, *args: str, return_model: bool = False) -> None:
         # будет учтено только в UPDATE и DELETE запросах
         if args and return_model:
@@ -304,7 +441,8 @@ class QueryBuilder:
             select(func.count(func.distinct(pk)))
             .select_from(self._model_cls)
         )
-        stmt = self._apply_joins(stmt)
+        # only() и defer() к подсчету и подзапросу первичных ключей не применимы
+        stmt = self._apply_joins(stmt, apply_order_by=False, apply_options=False)
         stmt = self._apply_where(stmt)
         return stmt
 
@@ -314,7 +452,8 @@ class QueryBuilder:
         pk = get_pk(self._model_cls)
         stmt = select(func.distinct(pk))
         stmt = self._apply_execution_options(stmt)
-        stmt = self._apply_joins(stmt)
+        # only() и defer() к подсчету и подзапросу первичных ключей не применимы
+        stmt = self._apply_joins(stmt, apply_order_by=False, apply_options=False)
         stmt = self._apply_where(stmt)
         stmt = delete(self._model_cls).where(pk.in_(stmt))
         stmt = self._apply_returning(stmt)
@@ -326,7 +465,8 @@ class QueryBuilder:
         pk = get_pk(self._model_cls)
         stmt = select(func.distinct(pk))
         stmt = self._apply_execution_options(stmt)
-        stmt = self._apply_joins(stmt)
+        # only() и defer() к подсчету и подзапросу первичных ключей не применимы
+        stmt = self._apply_joins(stmt, apply_order_by=False, apply_options=False)
         stmt = self._apply_where(stmt)
         stmt = update(self._model_cls).where(pk.in_(stmt)).values(**values)
         stmt = self._apply_returning(stmt)
@@ -381,17 +521,18 @@ class QueryBuilder:
         """
         if self._options and self._select_entities:
             raise ValueError("Одновременно заданные options и values_list не могут быть обработаны вместе")
+        if (self._only or self._defer) and self._select_entities:
+            raise ValueError("Одновременно заданные only/defer и values_list не могут быть обработаны вместе")
         if self._options and (self._limit or self._offset):
             # надо делать подзапрос
             # жойны в подзапросе и внешнем запросе сохраняются
-            subquery = select(self._model_cls)
+            subquery = select(*self._get_subquery_columns())
             subquery = subquery.distinct()
             subquery = self._apply_limit(subquery)
             subquery = self._apply_offset(subquery)
             subquery = self._apply_where(subquery)
-            subquery = self._apply_order_by(subquery)
             subquery = self._apply_joins(subquery, apply_options=False)
-            AliasedModelCls = aliased(self._model_cls, subquery.subquery())
+            AliasedModelCls = aliased(self._model_cls, subquery.subquery(ROOT_ALIAS))
             stmt = select(AliasedModelCls)
             stmt = self._apply_distinct(stmt)
             stmt = self._apply_joins(stmt, parent_model_cls=AliasedModelCls)
@@ -403,7 +544,6 @@ class QueryBuilder:
             stmt = self._apply_distinct(stmt)
             stmt = self._apply_joins(stmt)
             stmt = self._apply_where(stmt)
-            stmt = self._apply_order_by(stmt)
             stmt = self._apply_limit(stmt)
             stmt = self._apply_offset(stmt)
         return stmt
@@ -429,14 +569,13 @@ class QueryBuilder:
             stmt = stmt.where(op(column, value['value']))
         return stmt
 
-    def _apply_order_by(self, stmt: Select, model_cls=None):
+    def _get_order_by_clauses(self, model_cls=None) -> list[tuple[int, Any]]:
         model_cls = model_cls or self._model_cls
+        order_by = []
         for attr, value in self._order_by.items():
-            direction = value['direction']
             column = getattr(model_cls, attr)  # напр., aliased(Section).name или Section.name
-            column = column.asc() if direction == 'asc' else column.desc()
-            stmt = stmt.order_by(column)
-        return stmt
+            order_by.append((value["position"], get_order_by_clause(column, value)))
+        return order_by
 
     def _apply_joins(
         self,
@@ -507,16 +646,19 @@ class QueryBuilder:
         if apply_where:
             stmt = stmt.where(*where)
         if apply_order_by:
-            stmt = stmt.order_by(*order_by)
+            # сортировки по полям основной модели и связных моделей применяются в порядке их задания
+            order_by.extend(self._get_order_by_clauses(parent_model_cls))
+            stmt = stmt.order_by(*[clause for _, clause in sorted(order_by, key=itemgetter(0))])
         if apply_options:
             stmt = self._apply_options(stmt, tree)
+            stmt = self._apply_projection(stmt, tree, parent_model_cls)
         return stmt
 
     def _apply_joins_recursively(self, stmt, joins, where, order_by, parent_model_cls, tree, root):
         for attr, value in joins.get("children", {}).items():
-            target = aliased(value["model_cls"])
-            onclause = getattr(parent_model_cls, attr)
             attr_root = f"{root}__{attr}".strip("__")
+            target = self._get_alias(value["model_cls"], attr_root)
+            onclause = getattr(parent_model_cls, attr)
             tree[attr_root] = {"attr": onclause, "alias": target}
             isouter = value.get("isouter", False)
             stmt = stmt.join(target, onclause, isouter=isouter)
@@ -525,9 +667,8 @@ class QueryBuilder:
                 column = getattr(target, name)
                 where.append(op(column, item["value"]))
             for name, item in value.get("order_by", {}).items():
-                direction = item["direction"]
                 column = getattr(target, name)
-                order_by.append(column.asc() if direction == 'asc' else column.desc())
+                order_by.append((item["position"], get_order_by_clause(column, item)))
             stmt = self._apply_joins_recursively(
                 stmt,
                 joins=value,
@@ -539,6 +680,11 @@ class QueryBuilder:
             )
         return stmt
 
+    def _get_alias(self, model_cls: Type[Model], path: str) -> AliasedClass:
+        if (alias := self._aliases.get(path)) is None:
+            alias = self._aliases[path] = aliased(model_cls, name=f"{ALIAS_PREFIX}{path}")
+        return alias
+
     def _apply_options(self, stmt: Select, tree: dict) -> Select:
         for option_field in self._options:
             option = None
@@ -554,3 +700,76 @@ class QueryBuilder:
                     option = contains_eager(data["attr"].of_type(data["alias"]))
             stmt = stmt.options(option)
         return stmt
+
+    def _get_subquery_columns(self) -> list:
+        # проекция применяется и к подзапросу, иначе тяжелые столбцы все равно попадут в DISTINCT.
+        # первичный и внешние ключи оставляются всегда, тк по ним join-ятся связи во внешнем запросе, а поля
+        # сортировки - тк внешний запрос сортируется по столбцам подзапроса, а в SELECT DISTINCT столбцы ORDER BY
+        # должны быть в выборке
+        only = {field for field in self._only if LOOKUP_SEP not in field}
+        columns = []
+        for column in get_columns(self._model_cls):
+            if column.primary_key or column.foreign_keys or column.key in self._order_by:
+                columns.append(column)
+            elif (not only or column.key in only) and column.key not in self._defer:
+                columns.append(column)
+        return columns
+
+    def _apply_projection(self, stmt: Select, tree: dict, root_model_cls=None) -> Select:
+        """
+        Применяет only() и defer()
+
+        Поля группируются по связям:
+
+            {"id", "name", "subsections__name"} -> {"": {"id", "name"}, "subsections": {"name"}}
+
+        и для каждой связи строится путь загрузки, к которому добавляются load_only()/defer()
+        """
+        root_model_cls = self._model_cls if root_model_cls is None else root_model_cls
+        loaded = {
+            LOOKUP_SEP.join(option_field.split(LOOKUP_SEP)[:i])
+            for option_field in self._options
+            for i in range(1, option_field.count(LOOKUP_SEP) + 2)
+        }
+        for fields, loader_option in ((self._only, load_only), (self._defer, defer)):
+            grouped: dict[str, list[str]] = {}
+            for field in sorted(fields):
+                relation, _, column_name = field.rpartition(LOOKUP_SEP)
+                grouped.setdefault(relation, []).append(column_name)
+            for relation, column_names in grouped.items():
+                if not relation:
+                    columns = [getattr(root_model_cls, column_name) for column_name in column_names]
+                    stmt = stmt.options(*self._get_loader_options(loader_option, columns))
+                    continue
+                option, entity = self._build_loader_path(relation, tree, loaded, root_model_cls)
+                columns = [getattr(entity, column_name) for column_name in column_names]
+                stmt = stmt.options(option.options(*self._get_loader_options(loader_option, columns)))
+        return stmt
+
+    @staticmethod
+    def _get_loader_options(loader_option, columns: list) -> list:
+        # load_only() принимает несколько столбцов, а defer() - один (остальные аргументы считаются путем к нему)
+        if loader_option is defer:
+            return [defer(column) for column in columns]
+        return [loader_option(*columns)]
+
+    def _build_loader_path(self, relation: str, tree: dict, loaded: set, root_model_cls) -> tuple[Any, Any]:
+        # возвращает цепочку опций загрузки до связи и сущность (модель или алиас), от которой брать столбцы
+        option = None
+        entity = root_model_cls
+        attrs = relation.split(LOOKUP_SEP)
+        for i in range(1, len(attrs) + 1):
+            key = LOOKUP_SEP.join(attrs[:i])
+            if key in loaded and key in tree:
+                data = tree[key]
+                if option:
+                    # of_type(), а не alias=, иначе путь оканчивается моделью, и столбцы алиаса к нему не относятся
+                    option = option.contains_eager(data["attr"].of_type(data["alias"]))
+                else:
+                    option = contains_eager(data["attr"].of_type(data["alias"]))
+                entity = data["alias"]
+            else:
+                attr = getattr(entity, attrs[i - 1])
+                option = option.defaultload(attr) if option else defaultload(attr)
+                entity = attr.property.mapper.class_
+        return option, entity
@@ -1 +1,3 @@
 LOOKUP_SEP = "__"
+ALIAS_PREFIX = "t_"
+ROOT_ALIAS = "t"
@@ -1,10 +1,11 @@
 import logging
+from functools import partial
 from typing import Self, Any, Type
 
 from sqlalchemy import Result, Row
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from fastapi_django.db.repositories.builder import QueryBuilder
+from fastapi_django.db.repositories.builder import FilterPath, QueryBuilder, OrderBy
 from fastapi_django.db.repositories.constants import LOOKUP_SEP
 from fastapi_django.db.types import Model
 from fastapi_django.db.utils import validate_has_columns, get_column
@@ -12,16 +13,25 @@ from fastapi_django.db.utils import validate_has_columns, get_column
 logger = logging.getLogger("repositories")
 
 
+# SQLAlchemy требует вызвать метод unique(), иначе выдает ошибку:
+#   The unique() method must be invoked on this Result, as it contains results
+#   that include joined eager loads against collections
+
 def iterate_scalars(result: Result) -> list[Model]:
-    return list(result.scalars().all())
+    return list(result.unique().scalars().all())
 
 
 def iterate_values_list(result: Result) -> list[tuple]:
-    return list(tuple(item) for item in result.tuples().all())
+    return list(tuple(item) for item in result.unique().tuples().all())
 
 
 def iterate_named_values_list(result: Result) -> list[Row]:
-    return list(result.tuples().all())
+    return list(result.unique().tuples().all())
+
+
+def iterate_values(result: Result, keys: list[str]) -> list[dict[str, Any]]:
+    # без unique(): строки не содержат сущностей, а одинаковые строки не должны схлопываться
+    return [dict(zip(keys, row)) for row in result.tuples().all()]
 
 
 class QuerySet:
@@ -35,8 +45,8 @@ class QuerySet:
         1. промежуточные и
         2. терминальные.
 
-    Промежуточные методы - filter(), order_by(), returning(), innerjoin(), outerjoin(), options(),
-    execution_options(), values_list(), distinct(), flush(), commit()) - не выполняют запросов в БД, а
+    Промежуточные методы - filter(), order_by(), returning(), innerjoin(), outerjoin(), options(), only(),
+    defer(), execution_options(), values_list(), distinct(), flush(), commit()) - не выполняют запросов в БД, а
     предназначены для того, чтобы принимать параметры запроса (параметры фильтрации, сортировки и тд)
     Промежуточные методы возвращают копию QuerySet.
 
@@ -65,6 +75,16 @@ class QuerySet:
 
     И тогда это вернет объект, а не список
 
+    - ОГРАНИЧЕНИЕ ВЫБИРАЕМЫХ СТОЛБЦОВ
+
+    Методы only() и defer() позволяют не выбирать тяжелые столбцы (напр., большие текстовые или JSON поля).
+    В том числе и у связей, заданных в options():
+
+        >>> qs = some_repository.objects.options("status").only("id", "name", "status__code")
+        >>> qs = some_repository.objects.defer("body")
+
+    Первичный ключ выбирается всегда.  Обращение к невыбранному столбцу приведет к дополнительному запросу
+
     - УПРАВЛЕНИЕ ЖИЗНЕННЫМ ЦИКЛОМ СЕССИИ SQLAlchemy
 
     Иногда необходимо выполнить flush или commit после выполнения запроса или, напр., для получения id
@@ -89,6 +109,10 @@ class QuerySet:
         self._scalar = False
         self._sliced = False
 
+    @property
+    def model_cls(self) -> Type[Model]:
+        return self._model_cls
+
     def _clone(self) -> Self:
         clone = self.__class__(self._model_cls, self._session)
         clone._query_builder = self._query_builder.clone()
@@ -96,6 +120,7 @@ class QuerySet:
         clone._commit = self._commit
         clone._scalar = self._scalar
         clone._sliced = self._sliced
+        clone._iterate_result_func = self._iterate_result_func
         return clone
 
     def filter(self, **kw: Any) -> Self:
@@ -104,7 +129,19 @@ class QuerySet:
         clone._query_builder.filter(**kw)
         return clone
 
-    def order_by(self, *args: str) -> Self:
+    def apply_filters(self, conditions: list[tuple[FilterPath, Any]]) -> Self:
+        """
+        Как filter(), но для уже разобранных полей фильтрации (см. resolve_filter_field(), FilterSet):
+
+            >>> queryset.apply_filters([(resolve_filter_field(Section, "name__in"), ["a", "b"])])
+        """
+        self._validate_sliced()
+        clone = self._clone()
+        for filter_path, value in conditions:
+            clone._query_builder.apply_filter(filter_path, value)
+        return clone
+
+    def order_by(self, *args: str | OrderBy) -> Self:
         self._validate_sliced()
         clone = self._clone()
         clone._query_builder.order_by(*args)
@@ -116,6 +153,18 @@ class QuerySet:
         clone._query_builder.options(*args)
         return clone
 
+    def only(self, *args: str) -> Self:
+        self._validate_sliced()
+        clone = self._clone()
+        clone._query_builder.only(*args)
+        return clone
+
+    def defer(self, *args: str) -> Self:
+        self._validate_sliced()
+        clone = self._clone()
+        clone._query_builder.defer(*args)
+        return clone
+
     def innerjoin(self, *args: str) -> Self:
         self._validate_sliced()
         clone = self._clone()
@@ -174,6 +223,16 @@ class QuerySet:
         )
         return clone
 
+    def values(self, *args: str) -> Self:
+        """
+        Как values_list(), но возвращает словари {поле: значение}.  Строки выбираются кортежами, без создания
+        объектов моделей
+        """
+        clone = self._clone()
+        clone._query_builder.values_list(*args)
+        clone._iterate_result_func = partial(iterate_values, keys=list(args))
+        return clone
+
     def distinct(self) -> Self:
         self._validate_sliced()
         clone = self._clone()
@@ -267,10 +326,7 @@ class QuerySet:
             obj = yield from self._session.scalar(stmt).__await__()
             return obj
         result = yield from self._session.execute(stmt).__await__()
-        # SQLAlchemy требует вызвать метод unique(), иначе выдает ошибку:
-        #   The unique() method must be invoked on this Result, as it contains results
-        #   that include joined eager loads against collections
-        return self._iterate_result_func(result.unique())
+        return self._iterate_result_func(result)
 
     def __getitem__(self, k: int | slice) -> Self:
         self._validate_sliced()
@@ -1,16 +1,227 @@
-from typing import Any
+import logging
+import types
+from functools import lru_cache
+from typing import Any, ClassVar, Type, Union, get_args, get_origin
 
 from fastapi import Query, Request
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, TypeAdapter
+from sqlalchemy import PrimaryKeyConstraint, UniqueConstraint, inspect
 
+from fastapi_django.db.repositories.builder import FilterPath, OrderBy, QueryBuilder, resolve_filter_field
+from fastapi_django.db.repositories.constants import LOOKUP_SEP
 from fastapi_django.db.repositories.queryset import QuerySet
+from fastapi_django.db.types import Model
+from fastapi_django.db.utils import get_pk
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.exceptions.http import HTTP400Exception
+from fastapi_django.responses import FastJSONResponse, RawJSONResponse
+from fastapi_django.schema import PaginatedResponse
+
+logger = logging.getLogger(__name__)
+
+
+def get_schema_fields(model_cls: Type[Model], schema: Type[BaseModel], prefix: str = "") -> list[str]:
+    """
+    Возвращает поля модели (в формате для QuerySet.only()), которые используются в схеме
+
+    Поля схемы, которых нет в модели (напр., вычисляемые), пропускаются.  Вложенные схемы
+    (в т.ч. list[Schema], Schema | None) разбираются рекурсивно по связям модели:
+
+        class StatusSchema(BaseModel):
+            code: str
+
+        class SectionSchema(BaseModel):
+            id: int
+            name: str
+            status: StatusSchema
+
+        >>> get_schema_fields(Section, SectionSchema)
+        ['id', 'name', 'status__code']
+    """
+    fields = []
+    columns = inspect(model_cls).columns
+    relationships = inspect(model_cls).relationships
+    for name, field in schema.model_fields.items():
+        attr = field.validation_alias if isinstance(field.validation_alias, str) else name
+        if attr in relationships:
+            if nested_schema := _get_nested_schema(field.annotation):
+                related_model_cls = relationships[attr].mapper.class_
+                fields.extend(get_schema_fields(related_model_cls, nested_schema, f"{prefix}{attr}{LOOKUP_SEP}"))
+        elif attr in columns:
+            fields.append(f"{prefix}{attr}")
+    return fields
+
+
+def _get_nested_schema(annotation) -> Type[BaseModel] | None:
+    if isinstance(annotation, type) and issubclass(annotation, BaseModel):
+        return annotation
+    for arg in get_args(annotation):
+        if nested_schema := _get_nested_schema(arg):
+            return nested_schema
+    return None
+
+
+class CompiledSerializer:
+    """
+    Сериализатор плоской схемы ответа: все поля схемы - столбцы модели (без связей и вычисляемых полей).  Строки
+    выбираются из БД кортежами (QuerySet.values()) и превращаются в словари, без объектов моделей, identity map и
+    инструментирования атрибутов
+
+    Если поля схемы - строки, целые числа или bool того же типа, что и столбцы, а в схеме нет валидаторов,
+    ограничений, исключенных полей и псевдонимов (passthrough), то словари сериализуются в JSON напрямую, без
+    проверки pydantic - результат совпадает с model_dump_json().  Остальные типы (float, datetime, Decimal, UUID
+    и т.д.) orjson сериализует иначе, чем pydantic, поэтому для них словари проверяются схемой, что все равно
+    быстрее проверки объектов моделей (from_attributes)
+    """
+
+    # типы, которые orjson и pydantic сериализуют одинаково
+    passthrough_types = (str, int, bool)
+    # настройки схемы, которые изменяют или отклоняют значения при проверке
+    validating_config = ("str_strip_whitespace", "str_to_lower", "str_to_upper", "str_min_length", "str_max_length")
+
+    def __init__(self, model_cls: Type[Model], schema: Type[BaseModel]):
+        decorators = schema.__pydantic_decorators__
+        if decorators.field_serializers or decorators.model_serializers or schema.model_computed_fields:
+            raise ImproperlyConfigured(
+                f"Схема {schema.__name__} содержит сериализаторы или вычисляемые поля и не может быть скомпилирована"
+            )
+        columns = inspect(model_cls).columns
+        self.fields = []
+        self.passthrough = not (
+            decorators.validators
+            or decorators.field_validators
+            or decorators.root_validators
+            or decorators.model_validators
+            or any(schema.model_config.get(option) for option in self.validating_config)
+        )
+        for name, field in schema.model_fields.items():
+            attr = field.validation_alias if isinstance(field.validation_alias, str) else name
+            if attr not in columns:
+                raise ImproperlyConfigured(
+                    f"Поле {name} схемы {schema.__name__} не является столбцом модели {model_cls.__name__} "
+                    "и не может быть скомпилировано"
+                )
+            self.fields.append(attr)
+            serialization_alias = field.serialization_alias or field.alias or name
+            if (
+                serialization_alias != attr
+                or field.metadata
+                or field.exclude
+                or not _is_same_type(field.annotation, columns[attr], self.passthrough_types)
+            ):
+                self.passthrough = False
+
+    def queryset(self, queryset: QuerySet) -> QuerySet:
+        return queryset.values(*self.fields)
+
+
+def _is_same_type(annotation, column, allowed_types: tuple[type, ...]) -> bool:
+    # значение столбца сериализуется так же, как значение поля схемы, если тип поля - тип столбца (или
+    # тип столбца | None) и входит в allowed_types
+    if get_origin(annotation) in (Union, types.UnionType):
+        args = [arg for arg in get_args(annotation) if arg is not type(None)]
+        if len(args) != 1:
+            return False
+        annotation = args[0]
+    if annotation not in allowed_types:
+        return False
+    try:
+        return annotation is column.type.python_type
+    except NotImplementedError:
+        return False
+
+
+@lru_cache
+def get_compiled_serializer(model_cls: Type[Model], schema: Type[BaseModel]) -> CompiledSerializer:
+    return CompiledSerializer(model_cls, schema)
+
+
+@lru_cache
+def get_response_adapter(response_type: Any) -> TypeAdapter:
+    return TypeAdapter(response_type)
+
+
+def get_unindexed_orderings(model_cls: Type[Model], orderings: dict[str, OrderBy], append_pk: bool = True) -> list[str]:
+    """
+    Возвращает сортировки, для которых в модели нет подходящего индекса
+
+    Подходящим считается индекс (в т.ч. первичный ключ и ограничение уникальности), первые столбцы которого
+    совпадают с полем сортировки, а следующий за ним столбец - первичный ключ (если он добавляется к
+    сортировке).  Если поле сортировки уникально, то первичный ключ не требуется.  Сортировки по полям
+    связных моделей индексом основной таблицы не обеспечиваются
+    """
+    table = inspect(model_cls).local_table
+    pk = get_pk(model_cls)
+    indexes = [[column.key for column in index.columns] for index in table.indexes]
+    indexes.extend(
+        [column.key for column in constraint.columns]
+        for constraint in table.constraints
+        if isinstance(constraint, PrimaryKeyConstraint | UniqueConstraint)
+    )
+    indexes.extend([column.key] for column in table.columns if column.index or column.unique)
+    unindexed = []
+    for name, order_by in orderings.items():
+        if LOOKUP_SEP in order_by.field:
+            unindexed.append(name)
+            continue
+        column = table.columns.get(order_by.field)
+        is_unique = column is not None and (column.primary_key or column.unique)
+        expected = [order_by.field] if is_unique or not append_pk else [order_by.field, pk.key]
+        if not any(index[:len(expected)] == expected for index in indexes):
+            unindexed.append(name)
+    return unindexed
 
 
 class Ordering(BaseModel):
     ordering: list[str] = Field(Query(default_factory=list))  # TODO: а если нужно другое именование поля?
 
+    # модель, по которой выполняется сортировка.  необходима для проверки allowed_orderings при создании класса
+    model_cls: ClassVar[Type[Model] | None] = None
+    # разрешенные сортировки.  если не заданы, то разрешены любые.  задаются либо перечнем полей, либо
+    # соответствием названия сортировки (то, что передает клиент) полю или OrderBy:
+    #   allowed_orderings = ("id", "name")
+    #   allowed_orderings = {"name": "name", "status": "status__code", "published": OrderBy("published_at", nulls="last")}
+    # направление задается клиентом: ?ordering=-published
+    allowed_orderings: ClassVar[tuple[str, ...] | dict[str, str | OrderBy] | None] = None
+    # добавлять ли в конец сортировку по первичному ключу.  без нее порядок строк с одинаковыми значениями
+    # полей сортировки не определен, и при пагинации строки могут дублироваться или теряться
+    append_pk: ClassVar[bool] = True
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kw: Any) -> None:
+        super().__pydantic_init_subclass__(**kw)
+        if cls.allowed_orderings is None:
+            return
+        if not isinstance(cls.allowed_orderings, dict):
+            cls.allowed_orderings = {name: name for name in cls.allowed_orderings}
+        cls.allowed_orderings = {
+            name: OrderBy.parse(order_by) if isinstance(order_by, str) else order_by
+            for name, order_by in cls.allowed_orderings.items()
+        }
+        if cls.model_cls is not None:
+            # некорректные поля приводят к ошибке при импорте, а не при первом запросе
+            QueryBuilder(cls.model_cls).order_by(*cls.allowed_orderings.values())
+            if unindexed := get_unindexed_orderings(cls.model_cls, cls.allowed_orderings, cls.append_pk):
+                logger.warning(
+                    f"Для сортировок {', '.join(unindexed)} из {cls.__name__}.allowed_orderings "
+                    f"нет подходящего индекса в таблице {cls.model_cls.__tablename__}"
+                )
+
     def order_queryset(self, queryset: QuerySet) -> QuerySet:
-        return queryset.order_by(*self.ordering)
+        ordering = [self._get_order_by(ordering_field) for ordering_field in self.ordering]
+        if self.append_pk:
+            pk = get_pk(queryset.model_cls).key
+            if not any(order_by.field == pk for order_by in ordering):
+                ordering.append(OrderBy(pk))
+        return queryset.order_by(*ordering)
+
+    def _get_order_by(self, ordering_field: str) -> OrderBy:
+        order_by = OrderBy.parse(ordering_field)
+        if self.allowed_orderings is None:
+            return order_by
+        if (allowed := self.allowed_orderings.get(order_by.field)) is None:
+            raise HTTP400Exception(f"Сортировка {order_by.field} не поддерживается")
+        return allowed._replace(descending=allowed.descending != order_by.descending)
 
 
 class Pagination(BaseModel):
@@ -18,6 +229,11 @@ class Pagination(BaseModel):
     async def paginate_queryset(self, queryset: QuerySet) -> Any:
         raise NotImplementedError
 
+    @classmethod
+    def get_response_type(cls, item_schema: type[BaseModel]) -> Any:
+        # тип результата paginate_queryset() для элементов item_schema
+        return PaginatedResponse[item_schema]
+
 
 class LimitOffsetPagination(Pagination):
     limit: int = Query(10, gt=0, le=100)
@@ -32,24 +248,90 @@ class LimitOffsetPagination(Pagination):
 
 
 class FilterSet(BaseModel):
+    # модель, по которой выполняется фильтрация.  если задана, то план фильтрации строится при создании класса
+    # (т.е. при импорте), и некорректные поля приводят к ошибке при импорте, а не при первом запросе
+    model_cls: ClassVar[Type[Model] | None] = None
+    # поля фильтрации в порядке объявления.  порядок важен, тк от него зависит текст SQL-запроса
+    filter_fields: ClassVar[tuple[str, ...]] = ()
+    # поля, значения которых перед фильтрацией сериализуются model_dump() (заданы field_serializer или значение -
+    # схема pydantic).  значения остальных полей передаются как есть, что совпадает с результатом model_dump()
+    serialized_fields: ClassVar[frozenset[str]] = frozenset()
+    # планы фильтрации по моделям: поле фильтрации и разобранный путь (см. resolve_filter_field())
+    _filter_plans: ClassVar[dict[Type[Model], tuple[tuple[str, FilterPath], ...]]] = {}
+
+    @classmethod
+    def __pydantic_init_subclass__(cls, **kw: Any) -> None:
+        super().__pydantic_init_subclass__(**kw)
+        cls.filter_fields = tuple(cls.model_fields)
+        cls.serialized_fields = frozenset(cls._get_serialized_fields())
+        cls._filter_plans = {}
+        if cls.model_cls is not None:
+            cls.get_filter_plan(cls.model_cls)
+
+    @classmethod
+    def _get_serialized_fields(cls) -> set[str]:
+        decorators = cls.__pydantic_decorators__
+        if decorators.model_serializers:
+            return set(cls.filter_fields)
+        fields = {
+            field for decorator in decorators.field_serializers.values() for field in decorator.info.fields
+        }
+        if "*" in fields:
+            return set(cls.filter_fields)
+        fields.update(name for name, field in cls.model_fields.items() if _get_nested_schema(field.annotation))
+        return fields
+
+    @classmethod
+    def get_filter_plan(cls, model_cls: Type[Model]) -> tuple[tuple[str, FilterPath], ...]:
+        if (plan := cls._filter_plans.get(model_cls)) is None:
+            plan = cls._filter_plans[model_cls] = tuple(
+                (filter_field, resolve_filter_field(model_cls, filter_field)) for filter_field in cls.filter_fields
+            )
+        return plan
 
     def filter_queryset(self, queryset: QuerySet) -> QuerySet:
-        conditions = self.model_dump(exclude_unset=True, exclude_none=True)
-        return queryset.filter(**conditions)
+        # аналог queryset.filter(**self.model_dump(exclude_unset=True, exclude_none=True)), но поля уже разобраны,
+        # а значения сериализуются только для serialized_fields
+        fields_set = self.model_fields_set
+        if serialized := self.serialized_fields & fields_set:
+            dumped = self.model_dump(include=serialized)
+        conditions = []
+        for filter_field, filter_path in self.get_filter_plan(queryset.model_cls):
+            if filter_field not in fields_set:
+                continue
+            value = dumped[filter_field] if filter_field in serialized else getattr(self, filter_field)
+            if value is not None:
+                conditions.append((filter_path, value))
+        return queryset.apply_filters(conditions)
 
 
 class ListService:
     # базовый класс для сервиса, возвращающего список объектов
     # предоставляет возможности для фильтрации, пагинации, сортировки
 
+    # схема ответа.  если задана, то из БД выбираются только те столбцы, которые есть в схеме
+    # (см. QuerySet.only()).  связи при этом по-прежнему необходимо задавать в options()
+    response_schema: type[BaseModel] | None = None
+    # выбирать ли строки кортежами и сериализовать их без объектов моделей (см. CompiledSerializer).  только для
+    # схем, все поля которых - столбцы модели.  list() при этом возвращает словари, а не объекты моделей
+    compile_serializer: bool = False
+
     def __init__(self, request: Request | None = None, filterset=None, ordering=None, pagination=None):
         self._request = request
         self._filterset = filterset
         self._ordering = ordering
         self._pagination = pagination
+        self._compiled_serializer: CompiledSerializer | None = None
 
     async def list(self, *args, **kwargs) -> Any:
         queryset = self.get_queryset()
+        if self.compile_serializer:
+            if self.response_schema is None:
+                raise ImproperlyConfigured(f"Не задана response_schema в {self.__class__.__name__}")
+            self._compiled_serializer = get_compiled_serializer(queryset.model_cls, self.response_schema)
+            queryset = self._compiled_serializer.queryset(queryset)
+        elif self.response_schema is not None:
+            queryset = queryset.only(*get_schema_fields(queryset.model_cls, self.response_schema))
         if self._filterset is not None:
             queryset = self._filterset.filter_queryset(queryset)
         if self._ordering is not None:
@@ -60,6 +342,26 @@ class ListService:
             data = await queryset
         return data
 
+    async def list_response(self, *args, **kwargs) -> RawJSONResponse | FastJSONResponse:
+        """
+        Результат list(), сериализованный в JSON по response_schema сразу из объектов моделей (pydantic-core, без
+        промежуточных словарей).  FastAPI не проверяет и не сериализует возвращенный обработчиком Response повторно,
+        поэтому для больших списков это значительно быстрее, чем возвращать результат list().  response_model
+        обработчика при этом по-прежнему используется в схеме OpenAPI
+        """
+        if self.response_schema is None:
+            raise ImproperlyConfigured(f"Не задана response_schema в {self.__class__.__name__}")
+        data = await self.list(*args, **kwargs)
+        if self._compiled_serializer is not None and self._compiled_serializer.passthrough:
+            # словари из БД уже соответствуют схеме
+            return FastJSONResponse(data)
+        if self._pagination:
+            response_type = self._pagination.get_response_type(self.response_schema)
+        else:
+            response_type = list[self.response_schema]
+        adapter = get_response_adapter(response_type)
+        return RawJSONResponse(adapter.dump_json(adapter.validate_python(data, from_attributes=True), by_alias=True))
+
     def get_queryset(self, *args: Any, **kwargs: Any) -> QuerySet:
         raise NotImplementedError
 
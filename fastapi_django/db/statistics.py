@@ -0,0 +1,63 @@
+from sqlalchemy import Engine, event
+from sqlalchemy.engine.interfaces import CacheStats
+
+
+class StatementCacheStatistics:
+    """
+    Счетчики попаданий в кэши запросов
+
+    - compiled_cache_* - кэш скомпилированных запросов SQLAlchemy.  Промахи означают, что запрос каждый раз
+      компилируется заново (напр., из-за того, что меняется его структура)
+    - prepared_statement_* - кэш prepared statements диалекта asyncpg (см. настройку
+      DATABASE["ASYNCPG"]["PREPARED_STATEMENT_CACHE_SIZE"]).  Промах означает лишний PREPARE в БД.  Для остальных
+      диалектов счетчики не меняются
+
+    Счетчики общие для процесса.  Пример:
+
+        >>> from fastapi_django.db.statistics import statement_cache_statistics
+        >>> statement_cache_statistics.as_dict()
+        {'compiled_cache_hits': 10, 'compiled_cache_misses': 2, 'prepared_statement_hits': 9, ...}
+    """
+
+    def __init__(self):
+        self.compiled_cache_hits = 0
+        self.compiled_cache_misses = 0
+        self.prepared_statement_hits = 0
+        self.prepared_statement_misses = 0
+
+    def reset(self) -> None:
+        self.__init__()
+
+    def as_dict(self) -> dict[str, int]:
+        return {
+            "compiled_cache_hits": self.compiled_cache_hits,
+            "compiled_cache_misses": self.compiled_cache_misses,
+            "prepared_statement_hits": self.prepared_statement_hits,
+            "prepared_statement_misses": self.prepared_statement_misses,
+        }
+
+
+statement_cache_statistics = StatementCacheStatistics()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany) -> None:
+    if context is not None:
+        if context.cache_hit is CacheStats.CACHE_HIT:
+            statement_cache_statistics.compiled_cache_hits += 1
+        elif context.cache_hit is CacheStats.CACHE_MISS:
+            statement_cache_statistics.compiled_cache_misses += 1
+    if conn.dialect.driver != "asyncpg":
+        return
+    # публичного API у кэша prepared statements нет, поэтому смотрим в LRU-кэш адаптера соединения asyncpg.
+    # если кэш отключен (размер 0), то каждый запрос подготавливается заново
+    cache = getattr(conn.connection.dbapi_connection, "_prepared_statement_cache", None)
+    if cache is not None and statement in cache:
+        statement_cache_statistics.prepared_statement_hits += 1
+    else:
+        statement_cache_statistics.prepared_statement_misses += 1
+
+
+def track_statement_cache(engine: Engine) -> None:
+    # для асинхронного движка необходимо передавать AsyncEngine.sync_engine
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
@@ -0,0 +1,94 @@
+"""
+Схема OpenAPI, которая строится и сериализуется один раз на процесс.
+"""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+from fastapi import FastAPI, Request
+from starlette.responses import Response
+
+from fastapi_django.conf import settings
+from fastapi_django.utils.http import get_preferred_encoding
+
+
+class OpenAPIDocument:
+    """Сериализованная схема OpenAPI: байты, сжатые gzip байты и ETag"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+        self.gzip_content = gzip.compress(content, compresslevel=9, mtime=0)
+        self.etag = f'"{hashlib.blake2b(content, digest_size=16).hexdigest()}"'
+        self.gzip_etag = f'"{self.etag[1:-1]}-gzip"'
+
+    def response(self, request: Request) -> Response:
+        """Ответ с учетом Accept-Encoding и If-None-Match"""
+        headers = {"Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if get_preferred_encoding(request.headers.get("accept-encoding", ""), ["gzip"]):
+            content, etag = self.gzip_content, self.gzip_etag
+            headers["Content-Encoding"] = "gzip"
+        else:
+            content, etag = self.content, self.etag
+        headers["ETag"] = etag
+        if_none_match = request.headers.get("if-none-match")
+        if if_none_match and etag in {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}:
+            headers.pop("Content-Encoding", None)
+            return Response(status_code=304, headers=headers)
+        return Response(content, media_type="application/json", headers=headers)
+
+
+def serialize_openapi(app: FastAPI, root_path: str = "") -> bytes:
+    """
+    Сериализованная схема OpenAPI.  Как в FastAPI, root_path (напр., префикс, с которым приложение доступно через
+    прокси) добавляется в начало servers
+    """
+    schema = app.openapi()
+    # так же, как сериализует схему FastAPI (JSONResponse)
+    return json.dumps(
+        add_root_path(app, schema, root_path), ensure_ascii=False, allow_nan=False, indent=None, separators=(",", ":")
+    ).encode("utf-8")
+
+
+def add_root_path(app: FastAPI, schema: dict, root_path: str) -> dict:
+    servers = schema.get("servers", [])
+    if not root_path or not app.root_path_in_servers or root_path in {server.get("url") for server in servers}:
+        return schema
+    # FastAPI кэширует схему в app.openapi_schema, поэтому не изменяем ее, а копируем
+    return {**schema, "servers": [{"url": root_path}, *servers]}
+
+
+def get_openapi_document(app: FastAPI, root_path: str = "") -> OpenAPIDocument:
+    """
+    Схема OpenAPI приложения.  Строится при первом обращении (или при прогреве) и хранится в app.state.  Если задана
+    настройка API_OPENAPI_FILE и файл существует, то схема загружается из него (см. команду openapi)
+
+    Для каждого root_path хранится свой документ, поэтому схема, построенная при прогреве, до первого запроса,
+    все равно отдается с root_path запроса в servers
+    """
+    documents = getattr(app.state, "openapi_documents", None)
+    if documents is None:
+        documents = app.state.openapi_documents = {}
+    document = documents.get(root_path)
+    if document is None:
+        path = settings.API_OPENAPI_FILE
+        if path is not None and Path(path).is_file():
+            content = Path(path).read_bytes()
+            if root_path:
+                schema = add_root_path(app, json.loads(content), root_path)
+                content = json.dumps(schema, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        else:
+            content = serialize_openapi(app, root_path)
+        document = documents[root_path] = OpenAPIDocument(content)
+    return document
+
+
+def setup_openapi(app: FastAPI, openapi_url: str) -> None:
+    """Добавляет урл схемы OpenAPI вместо стандартного урла FastAPI, который сериализует схему на каждый запрос"""
+
+    async def openapi(request: Request) -> Response:
+        root_path = request.scope.get("root_path", "").rstrip("/")
+        return get_openapi_document(app, root_path).response(request)
+
+    app.openapi_url = openapi_url
+    app.add_route(openapi_url, openapi, include_in_schema=False)
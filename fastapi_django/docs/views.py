@@ -1,10 +1,18 @@
+from pathlib import Path
+
 from fastapi import APIRouter, Request
 from fastapi.openapi.docs import get_redoc_html, get_swagger_ui_html, get_swagger_ui_oauth2_redirect_html
 from fastapi.responses import HTMLResponse
 
 from fastapi_django.conf import settings
+from fastapi_django.staticfiles import CompressedStaticFiles
 
 router = APIRouter()
+static_files = CompressedStaticFiles(directory=Path(__file__).parent.parent / "static")
+
+
+async def static_url(path: str) -> str:
+    return f"{settings.API_PREFIX}/static/{await static_files.ahashed_name(path)}"
 
 
 @router.get("/docs", include_in_schema=False)
@@ -14,8 +22,8 @@ async def swagger_ui_html(request: Request) -> HTMLResponse:
         openapi_url=request.app.openapi_url,
         title=f"{title} - Swagger UI",
         oauth2_redirect_url=str(request.url_for("swagger_ui_redirect")),
-        swagger_js_url=f"{settings.API_PREFIX}/static/docs/swagger-ui-bundle.js",
-        swagger_css_url=f"{settings.API_PREFIX}/static/docs/swagger-ui.css",
+        swagger_js_url=await static_url("docs/swagger-ui-bundle.js"),
+        swagger_css_url=await static_url("docs/swagger-ui.css"),
     )
 
 
@@ -30,5 +38,5 @@ async def redoc_html(request: Request) -> HTMLResponse:
     return get_redoc_html(
         openapi_url=request.app.openapi_url,
         title=f"{title} - ReDoc",
-        redoc_js_url=f"{settings.API_PREFIX}/static/docs/redoc.standalone.js",
+        redoc_js_url=await static_url("docs/redoc.standalone.js"),
     )
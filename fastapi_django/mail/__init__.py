@@ -1,7 +1,8 @@
 """
 Tools for sending email.
 """
-from typing import Any, Iterable, Sequence
+import asyncio
+from typing import Any, AsyncIterable, AsyncIterator, Callable, Iterable, NamedTuple, Sequence
 
 from fastapi_django.conf import settings
 # Imported for backwards compatibility and for the sake
@@ -14,19 +15,28 @@ from fastapi_django.mail.message import (
     EmailAlternative,
     EmailAttachment,
     EmailMessage,
+    EmailMessageSkeleton,
     EmailMultiAlternatives,
     SafeMIMEMultipart,
     SafeMIMEText,
     forbid_multi_line_headers,
     make_msgid,
 )
-from fastapi_django.mail.utils import DNS_NAME, CachedDnsName, get_provider, get_required, get_option
+from fastapi_django.mail.utils import (
+    DNS_NAME,
+    CachedDnsName,
+    get_option,
+    get_provider,
+    get_rate_limiter,
+)
+from fastapi_django.mail.providers import providers
 
 __all__ = [
     "CachedDnsName",
     "DNS_NAME",
     "EmailMessage",
     "EmailMultiAlternatives",
+    "EmailMessageSkeleton",
     "SafeMIMEText",
     "SafeMIMEMultipart",
     "DEFAULT_ATTACHMENT_MIME_TYPE",
@@ -36,19 +46,23 @@ __all__ = [
     "get_connection",
     "send_mail",
     "send_mass_mail",
+    "iter_send_mass_mail",
+    "SendResult",
     "EmailAlternative",
     "EmailAttachment",
     "outbox"
 ]
 
-from fastapi_django.utils.module_loading import import_string
-
 outbox: list = []
 
 
-def get_connection(fail_silently: bool = False, provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS, **kw: Any):
-    backend = get_required(provider, "BACKEND")
-    klass = import_string(backend)
+def get_connection(fail_silently: bool = False, provider: str | None = None, **kw: Any):
+    """
+    Создает новый экземпляр бэкенда провайдера.  Для отправки без явного открытия соединения лучше использовать
+    общий экземпляр providers.get_backend(provider)
+    """
+    provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
+    klass = providers.get_backend_class(provider)
     return klass(fail_silently=fail_silently, provider=provider, **kw)
 
 
@@ -60,12 +74,13 @@ async def send_mail(
     fail_silently: bool = False,
     html_message=None,
     connection=None,
-    provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS,
+    provider: str | None = None,
 ):
     """
     Если передан connection, то using игнорируется
     """
-    connection = connection or get_connection(fail_silently=fail_silently, provider=provider)
+    provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
+    connection = connection or providers.get_backend(provider, fail_silently)
     from_email = from_email or get_option(provider, "from_email")
     mail = EmailMultiAlternatives(
         subject, body, from_email, recipient_list, connection=connection
@@ -77,7 +92,7 @@ async def send_mail(
 
 
 async def send_mass_mail(
-    datatuple, fail_silently=False, connection=None, provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS,
+    datatuple, fail_silently=False, connection=None, provider: str | None = None,
 ):
     """
     Given a datatuple of (subject, message, from_email, recipient_list), send
@@ -91,9 +106,118 @@ async def send_mass_mail(
     Note: The API for this method is frozen. New code wanting to extend the
     functionality should use the EmailMessage class directly.
     """
-    connection = connection or get_connection(fail_silently=fail_silently, provider=provider)
+    provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
+    connection = connection or providers.get_backend(provider, fail_silently)
     messages = [
-        EmailMessage(subject, body, sender, recipient, connection=connection, prodiver=provider)
+        EmailMessage(subject, body, sender, recipient, connection=connection, provider=provider)
         for subject, body, sender, recipient in datatuple
     ]
     return await connection.send_messages(messages)
+
+
+class SendResult(NamedTuple):
+    index: int  # порядковый номер элемента во входной последовательности
+    message: EmailMessage | None  # None, если письмо не удалось построить
+    sent: bool
+    error: Exception | None = None
+
+
+async def iter_send_mass_mail(
+    items: Iterable | AsyncIterable,
+    build_message: Callable | None = None,
+    concurrency: int = 10,
+    connection=None,
+    provider: str | None = None,
+) -> AsyncIterator[SendResult]:
+    """
+    Потоковая массовая рассылка.  Отдает результаты отправки по мере готовности (не в порядке items)
+
+    items - итерируемый (в т.ч. асинхронный) объект с письмами (EmailMessage) или данными для их построения.
+    Данные передаются в build_message (может быть корутиной), который возвращает EmailMessage.  Если build_message
+    не передан, то данные - это кортеж (subject, message, from_email, recipient_list), как в send_mass_mail.
+
+    Письма строятся и отправляются по мере чтения items не более чем concurrency штук одновременно, поэтому в памяти
+    не хранится вся рассылка.  Скорость отправки ограничивается настройками провайдера OPTIONS["rate_limit"]
+    (писем в секунду) и OPTIONS["rate_limit_burst"]; если передан connection без provider, то скорость не
+    ограничивается.  Ошибки построения и отправки письма не прерывают рассылку,
+    а возвращаются в SendResult.error:
+
+        async def build(user):
+            body = render_to_string("mail/news.txt", {"user": user})
+            return EmailMessage("Новости", body, to=[user.email])
+
+        sent = failed = 0
+        async for result in iter_send_mass_mail(users, build, concurrency=20, provider="smtpsrv"):
+            if result.sent:
+                sent += 1
+            else:
+                failed += 1
+                logger.warning(f"Письмо {result.index} не отправлено: {result.error}")
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency не может быть меньше 1")
+    if connection is None:
+        provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
+        connection = providers.get_backend(provider)
+    build_message = build_message or (lambda datatuple: EmailMessage(*datatuple, provider=provider))
+    # при явно переданном соединении провайдер может быть не задан (и отсутствовать в EMAIL_PROVIDERS)
+    limiter = get_rate_limiter(provider) if provider is not None else None
+    pending: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+    results: asyncio.Queue = asyncio.Queue(maxsize=concurrency)
+
+    async def stop_workers():
+        for _ in range(concurrency):
+            await pending.put(None)
+
+    async def produce():
+        # при отмене (генератор закрыт раньше времени) работники тоже отменены, поэтому признаки завершения не
+        # отправляются - ждать свободного места в очереди было бы некому
+        try:
+            if isinstance(items, AsyncIterable):
+                index = 0
+                async for item in items:
+                    await pending.put((index, item))
+                    index += 1
+            else:
+                for index, item in enumerate(items):
+                    await pending.put((index, item))
+        except Exception:
+            await stop_workers()
+            raise
+        await stop_workers()
+
+    async def work():
+        while (entry := await pending.get()) is not None:
+            index, item = entry
+            message = None
+            try:
+                if isinstance(item, EmailMessage):
+                    message = item
+                else:
+                    built = build_message(item)
+                    message = await built if asyncio.iscoroutine(built) else built
+                if limiter is not None:
+                    await limiter.acquire()
+                result = SendResult(index, message, bool(await connection.send_messages([message])))
+            except Exception as e:
+                result = SendResult(index, message, False, e)
+            await results.put(result)
+        await results.put(None)
+
+    producer = asyncio.create_task(produce())
+    workers = [asyncio.create_task(work()) for _ in range(concurrency)]
+    try:
+        finished = 0
+        while finished < concurrency:
+            result = await results.get()
+            if result is None:
+                finished += 1
+                continue
+            yield result
+        # пробрасываем ошибку чтения items
+        await producer
+    finally:
+        tasks = (producer, *workers)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
@@ -5,6 +5,10 @@ from fastapi_django.conf import settings
 from fastapi_django.mail import get_provider
 
 
+class EmailNotSentError(Exception):
+    pass
+
+
 class BaseEmailBackend:
     """
     Base class for email backend implementations.
@@ -19,9 +23,9 @@ class BaseEmailBackend:
            pass
     """
 
-    def __init__(self, fail_silently: bool = False, provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS, **kw: Any) -> None:
+    def __init__(self, fail_silently: bool = False, provider: str | None = None, **kw: Any) -> None:
         self.fail_silently = fail_silently
-        self.provider = provider
+        self.provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
 
     async def open(self):
         """
@@ -65,3 +69,20 @@ class BaseEmailBackend:
         raise NotImplementedError(
             "subclasses of BaseEmailBackend must override send_messages() method"
         )
+
+    async def send_messages_results(self, email_messages) -> list[Exception | None]:
+        """
+        Отправляет письма и возвращает результат отправки каждого: None, если письмо отправлено, иначе исключение.
+        Нужен, чтобы при повторной отправке не отправлять повторно уже отправленные письма
+
+        Реализация по умолчанию отправляет письма по одному через send_messages()
+        """
+        results: list[Exception | None] = []
+        for message in email_messages:
+            try:
+                sent = await self.send_messages([message])
+            except Exception as e:
+                results.append(e)
+                continue
+            results.append(None if sent else EmailNotSentError("Письмо не отправлено"))
+        return results
@@ -2,44 +2,49 @@
 Email backend that writes messages to console instead of sending them.
 """
 
+import asyncio
 import sys
-import threading
 
 from fastapi_django.mail.backends.base import BaseEmailBackend
 
 
 class EmailBackend(BaseEmailBackend):
     """
-    TODO: нужно что то в асинхронное переделывать?
+    Письма сериализуются и записываются в поток одной пачкой в отдельном потоке (asyncio.to_thread), чтобы
+    не блокировать цикл событий.  Конкурирующие отправки через один бэкенд сериализуются asyncio.Lock
     """
     def __init__(self, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.stream = kwargs.pop("stream", sys.stdout)
-        self._lock = threading.RLock()
+        self._lock = None
 
-    def write_message(self, message):
+    def format_message(self, message) -> str:
         msg = message.message()
         msg_data = msg.as_bytes()
         charset = (
             msg.get_charset().get_output_charset() if msg.get_charset() else "utf-8"
         )
         msg_data = msg_data.decode(charset)
-        self.stream.write("%s\n" % msg_data)
-        self.stream.write("-" * 79)
-        self.stream.write("\n")
+        return "%s\n%s\n" % (msg_data, "-" * 79)
+
+    def write_messages(self, email_messages) -> int:
+        """Записывает письма в поток.  Выполняется в отдельном потоке"""
+        data = [self.format_message(message) for message in email_messages]
+        self.stream.write("".join(data))
+        self.stream.flush()
+        return len(data)
 
     async def send_messages(self, email_messages):
-        """Write all messages to the stream in a thread-safe way."""
+        """Write all messages to the stream without blocking the event loop."""
         if not email_messages:
             return
+        if self._lock is None:
+            self._lock = asyncio.Lock()
         msg_count = 0
-        with self._lock:
+        async with self._lock:
             try:
                 stream_created = await self.open()
-                for message in email_messages:
-                    self.write_message(message)
-                    self.stream.flush()  # flush after each message
-                    msg_count += 1
+                msg_count = await asyncio.to_thread(self.write_messages, email_messages)
                 if stream_created:
                     await self.close()
             except Exception:
@@ -0,0 +1,219 @@
+"""
+Email backend that spreads messages across several providers and fails over between them.
+"""
+import logging
+import random
+import time
+from typing import Any
+
+from fastapi_django.conf import on_setting_changed
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.mail.backends.base import BaseEmailBackend
+from fastapi_django.mail.utils import get_option, get_options
+
+logger = logging.getLogger(__name__)
+
+
+class NoAvailableProviderError(Exception):
+    pass
+
+
+class ProviderState:
+    """
+    Состояние провайдера: метрики отправки и автомат circuit breaker
+
+    После failure_threshold ошибок подряд провайдер исключается из отправки на recovery_timeout секунд.  После этого
+    через него пропускается одна пробная отправка: если она успешна, то провайдер возвращается в работу, иначе
+    снова исключается
+    """
+
+    CLOSED, OPEN, HALF_OPEN = "closed", "open", "half_open"
+
+    def __init__(self, provider: str, failure_threshold: int = 5, recovery_timeout: int | float = 30):
+        self.provider = provider
+        self.failure_threshold = failure_threshold
+        self.recovery_timeout = recovery_timeout
+        self.state = self.CLOSED
+        self.opened_at = 0.0
+        self.consecutive_failures = 0
+        self.requests = 0
+        self.errors = 0
+        # экспоненциально сглаженное время отправки, сек.
+        self.latency = 0.0
+        self._trial_started_at = None
+
+    def available(self) -> bool:
+        if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.recovery_timeout:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN:
+            # пока идет пробная отправка, остальные отправки через провайдера не пропускаются.  если пробная отправка
+            # зависла (или была отменена), то через recovery_timeout разрешается следующая
+            return (
+                self._trial_started_at is None
+                or time.monotonic() - self._trial_started_at >= self.recovery_timeout
+            )
+        return self.state == self.CLOSED
+
+    def start(self) -> None:
+        if self.state == self.HALF_OPEN:
+            self._trial_started_at = time.monotonic()
+
+    def record_success(self, latency: float) -> None:
+        self.requests += 1
+        self.latency = latency if self.requests == 1 else self.latency * 0.8 + latency * 0.2
+        self.consecutive_failures = 0
+        self._trial_started_at = None
+        if self.state != self.CLOSED:
+            logger.info(f"Провайдер {self.provider} снова доступен")
+        self.state = self.CLOSED
+
+    def record_failure(self) -> None:
+        self.requests += 1
+        self.errors += 1
+        self.consecutive_failures += 1
+        self._trial_started_at = None
+        if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                logger.warning(f"Провайдер {self.provider} исключен из отправки на {self.recovery_timeout} сек.")
+            self.state = self.OPEN
+            self.opened_at = time.monotonic()
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "state": self.state,
+            "requests": self.requests,
+            "errors": self.errors,
+            "error_rate": self.errors / self.requests if self.requests else 0.0,
+            "latency": self.latency,
+        }
+
+
+# состояния провайдеров.  бэкенд создается на каждую отправку, а метрики и состояние должны быть общими
+_states: dict[str, ProviderState] = {}
+
+
+def get_provider_state(provider: str, failure_threshold: int = 5, recovery_timeout: int | float = 30) -> ProviderState:
+    if provider not in _states:
+        _states[provider] = ProviderState(provider, failure_threshold, recovery_timeout)
+    return _states[provider]
+
+
+def get_provider_stats() -> dict[str, dict[str, Any]]:
+    return {provider: state.stats() for provider, state in _states.items()}
+
+
+@on_setting_changed
+def reset_provider_states(setting: str, value: Any) -> None:
+    if setting == "EMAIL_PROVIDERS":
+        _states.clear()
+
+
+class EmailBackend(BaseEmailBackend):
+    """
+    Бэкенд, который распределяет письма между провайдерами пропорционально весам и при ошибке отправляет
+    письма через следующего провайдера:
+
+        EMAIL_PROVIDERS = {
+            "primary": {...},
+            "reserve": {...},
+            "default": {
+                "BACKEND": "fastapi_django.mail.backends.failover.EmailBackend",
+                "OPTIONS": {
+                    "providers": {"primary": 3, "reserve": 1},  # провайдер: вес
+                    "failure_threshold": 5,  # после стольких ошибок подряд провайдер исключается
+                    "recovery_timeout": 30,  # на столько секунд
+                    "slow_threshold": 2,  # вес провайдеров, отправляющих дольше (сек.), уменьшается
+                },
+            },
+        }
+
+    Метрики провайдеров (время отправки, доля ошибок, состояние) возвращает get_provider_stats()
+    """
+
+    def __init__(self, fail_silently: bool = False, provider: str | None = None, **kw: Any):
+        super().__init__(fail_silently=fail_silently, provider=provider, **kw)
+        provider = self.provider
+        providers = get_option(provider, "providers")
+        if not providers:
+            raise ImproperlyConfigured(f"Не заданы провайдеры в EMAIL_PROVIDERS['{provider}']['OPTIONS']['providers']")
+        if not isinstance(providers, dict):
+            providers = dict.fromkeys(providers, 1)
+        if provider in providers:
+            raise ImproperlyConfigured(f"EMAIL_PROVIDERS['{provider}'] не может отправлять письма через себя")
+        for name, weight in providers.items():
+            if not isinstance(weight, int | float) or weight <= 0:
+                raise ImproperlyConfigured(
+                    f"Вес провайдера {name} в EMAIL_PROVIDERS['{provider}']['OPTIONS']['providers'] "
+                    f"должен быть больше 0"
+                )
+        self.weights: dict[str, int | float] = providers
+        options = get_options(provider)
+        self.slow_threshold = options.get("slow_threshold")
+        if self.slow_threshold is not None and self.slow_threshold <= 0:
+            raise ImproperlyConfigured(
+                f"slow_threshold в EMAIL_PROVIDERS['{provider}']['OPTIONS'] должен быть больше 0"
+            )
+        self.states = {
+            name: get_provider_state(
+                name, options.get("failure_threshold", 5), options.get("recovery_timeout", 30)
+            )
+            for name in providers
+        }
+
+    def get_providers(self) -> list[str]:
+        """
+        Порядок, в котором провайдеры пробуют отправить письма: доступные провайдеры в случайном порядке
+        с учетом весов
+        """
+        candidates = [name for name, state in self.states.items() if state.available()]
+        # взвешенная выборка без возвращения: чем больше вес, тем ближе к началу
+        return sorted(candidates, key=lambda name: random.random() ** (1 / self.get_weight(name)), reverse=True)
+
+    def get_weight(self, name: str) -> int | float:
+        # вес медленного провайдера уменьшается пропорционально квадрату времени отправки, но не до нуля, чтобы
+        # по отправкам через него было видно, что он снова работает быстро
+        latency = self.states[name].latency
+        if self.slow_threshold is not None and latency > self.slow_threshold:
+            return self.weights[name] * (self.slow_threshold / latency) ** 2
+        return self.weights[name]
+
+    async def send_messages(self, email_messages):
+        results = await self.send_messages_results(email_messages)
+        errors = [result for result in results if result is not None]
+        if errors and not self.fail_silently:
+            raise errors[0]
+        return len(results) - len(errors)
+
+    async def send_messages_results(self, email_messages) -> list[Exception | None]:
+        # письма, которые не удалось отправить через провайдера, отправляются через следующего.  отправленные
+        # письма и письма, вложение которых из асинхронного потока уже прочитано, через следующего не отправляются
+        from fastapi_django.mail.providers import providers
+
+        email_messages = list(email_messages)
+        error = NoAvailableProviderError(f"Нет доступных провайдеров для отправки писем через {self.provider}")
+        results: list[Exception | None] = [error] * len(email_messages)
+        pending = list(range(len(email_messages)))
+        for name in self.get_providers():
+            if not pending:
+                break
+            state = self.states[name]
+            state.start()
+            started_at = time.monotonic()
+            try:
+                sent = await providers.get_backend(name).send_messages_results([email_messages[i] for i in pending])
+            except Exception as e:
+                sent = [e] * len(pending)
+            failed = []
+            for index, result in zip(pending, sent):
+                results[index] = result
+                if result is not None:
+                    failed.append(index)
+            if failed:
+                state.record_failure()
+                logger.warning(
+                    f"Не удалось отправить {len(failed)} писем через провайдера {name}: {results[failed[0]]!r}"
+                )
+            else:
+                state.record_success(time.monotonic() - started_at)
+            pending = [index for index in failed if getattr(email_messages[index], "resendable", True)]
+        return results
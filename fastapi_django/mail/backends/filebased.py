@@ -1,18 +1,32 @@
 """Email backend that writes messages to a file."""
 
+import asyncio
 import datetime
 import os
 
-from fastapi_django.conf import settings
 from fastapi_django.exceptions import ImproperlyConfigured
 from fastapi_django.mail.backends.console import EmailBackend as ConsoleEmailBackend
 from fastapi_django.mail.utils import get_option
 
 
 class EmailBackend(ConsoleEmailBackend):
-    def __init__(self, *args, file_path=None, provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS, **kwargs):
-        super().__init__(*args, stream=None, **kwargs)
+    """
+    Если размер файла превысит OPTIONS["max_bytes"], то следующие письма записываются в новый файл
+    """
+
+    def __init__(
+        self,
+        *args,
+        file_path=None,
+        max_bytes: int | None = None,
+        provider: str | None = None,
+        **kwargs,
+    ):
+        super().__init__(*args, stream=None, provider=provider, **kwargs)
+        provider = self.provider
         self._fname = None
+        self._file_index = 0
+        self.max_bytes = max_bytes or get_option(provider, "max_bytes")
         self.file_path = file_path or get_option(provider, "file_path", "mails")
         self.file_path = os.path.abspath(self.file_path)
         try:
@@ -33,28 +47,44 @@ class EmailBackend(ConsoleEmailBackend):
                 "Could not write to directory: %s" % self.file_path
             )
 
-    def write_message(self, message):
-        self.stream.write(message.message().as_bytes() + b"\n")
-        self.stream.write(b"-" * 79)
-        self.stream.write(b"\n")
+    def format_message(self, message) -> bytes:
+        return b"%s\n%s\n" % (message.message().as_bytes(), b"-" * 79)
+
+    def write_messages(self, email_messages) -> int:
+        """Записывает письма в файл.  Выполняется в отдельном потоке"""
+        data = [self.format_message(message) for message in email_messages]
+        size = sum(map(len, data))
+        if self.max_bytes and self.stream.tell() and self.stream.tell() + size > self.max_bytes:
+            self._rotate()
+        self.stream.write(b"".join(data))
+        self.stream.flush()
+        return len(data)
+
+    def _rotate(self):
+        self.stream.close()
+        self._fname = None
+        self._file_index += 1
+        self.stream = open(self._get_filename(), "ab")
 
     def _get_filename(self):
         """Return a unique file name."""
         if self._fname is None:
             timestamp = datetime.datetime.now().strftime("%Y%m%d-%H%M%S")
-            fname = "%s-%s.log" % (timestamp, abs(id(self)))
-            self._fname = os.path.join(self.file_path, fname)
+            fname = "%s-%s" % (timestamp, abs(id(self)))
+            if self._file_index:
+                fname = "%s-%s" % (fname, self._file_index)
+            self._fname = os.path.join(self.file_path, "%s.log" % fname)
         return self._fname
 
     async def open(self):
         if self.stream is None:
-            self.stream = open(self._get_filename(), "ab")
+            self.stream = await asyncio.to_thread(open, self._get_filename(), "ab")
             return True
         return False
 
     async def close(self):
         try:
             if self.stream is not None:
-                self.stream.close()
+                await asyncio.to_thread(self.stream.close)
         finally:
             self.stream = None
@@ -0,0 +1,214 @@
+"""
+Email backend that puts messages into a queue and sends them in the background.
+"""
+import asyncio
+import logging
+import time
+from typing import Any, Callable
+
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.mail.backends.base import BaseEmailBackend
+from fastapi_django.mail.utils import get_option, get_options
+from fastapi_django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+# очереди провайдеров.  бэкенд создается на каждую отправку, а очередь и воркеры должны быть общими
+_queues: dict[str, "MailQueue"] = {}
+
+
+class MailQueue:
+    """
+    Ограниченная очередь писем с воркерами, которые отправляют письма пачками через нижележащий бэкенд
+
+    Письма пачки, которые не удалось отправить, отправляются повторно (уже отправленные - нет) max_retries раз
+    с экспоненциально растущей задержкой (retry_delay, retry_delay * 2, ...).  Если и это не помогло, то они
+    передаются в dead_letter
+    """
+
+    def __init__(
+        self,
+        provider: str,
+        max_size: int = 1000,
+        workers: int = 1,
+        batch_size: int = 50,
+        max_retries: int = 3,
+        retry_delay: int | float = 1,
+        dead_letter: Callable | None = None,
+    ):
+        self.provider = provider
+        self.batch_size = batch_size
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.dead_letter = dead_letter
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=max_size)
+        self.loop = asyncio.get_running_loop()
+        self._workers = [asyncio.create_task(self._work()) for _ in range(workers)]
+        self.sent = 0
+        self.failed = 0
+        self.retries = 0
+        self._latency_sum = 0.0
+        self._latency_max = 0.0
+
+    async def put(self, message) -> None:
+        # если очередь заполнена, то ждем, пока воркеры ее разгрузят
+        await self.queue.put((message, time.monotonic()))
+
+    def stats(self) -> dict[str, Any]:
+        """
+        Метрики очереди:
+
+        - depth - количество писем в очереди
+        - sent, failed - количество отправленных и не отправленных (переданных в dead_letter) писем
+        - retries - количество повторных попыток отправки
+        - latency_avg, latency_max - время от постановки письма в очередь до его отправки, сек.
+        """
+        return {
+            "depth": self.queue.qsize(),
+            "sent": self.sent,
+            "failed": self.failed,
+            "retries": self.retries,
+            "latency_avg": self._latency_sum / self.sent if self.sent else 0.0,
+            "latency_max": self._latency_max,
+        }
+
+    async def drain(self, timeout: int | float | None = None) -> None:
+        """Дожидается отправки писем из очереди и останавливает воркеров"""
+        try:
+            await asyncio.wait_for(self.queue.join(), timeout)
+        except asyncio.TimeoutError:
+            logger.warning(f"Очередь писем провайдера {self.provider} не разгружена: {self.queue.qsize()} писем")
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def _work(self) -> None:
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._send(batch)
+            finally:
+                for _ in batch:
+                    self.queue.task_done()
+
+    async def _send(self, batch: list[tuple[Any, float]]) -> None:
+        from fastapi_django.mail.providers import providers
+
+        for attempt in range(self.max_retries + 1):
+            try:
+                results = await providers.get_backend(self.provider).send_messages_results(
+                    [message for message, _ in batch]
+                )
+            except Exception as e:
+                results = [e] * len(batch)
+            now = time.monotonic()
+            retry, dead = [], []
+            for (message, queued_at), result in zip(batch, results):
+                if result is None:
+                    latency = now - queued_at
+                    self._latency_sum += latency
+                    self._latency_max = max(self._latency_max, latency)
+                    self.sent += 1
+                # повторно отправляются только письма, которые не удалось отправить.  письма, вложение которых
+                # из асинхронного потока уже прочитано, повторно отправить нельзя
+                elif attempt < self.max_retries and getattr(message, "resendable", True):
+                    retry.append((message, queued_at))
+                else:
+                    dead.append((message, result))
+            if dead:
+                self.failed += len(dead)
+                await self._dead_letter([message for message, _ in dead], dead[0][1])
+            if not retry:
+                return
+            batch = retry
+            self.retries += 1
+            await asyncio.sleep(self.retry_delay * 2 ** attempt)
+
+    async def _dead_letter(self, messages: list, error: Exception) -> None:
+        if self.dead_letter is None:
+            logger.error(f"Не удалось отправить {len(messages)} писем через провайдера {self.provider}", exc_info=error)
+            return
+        try:
+            result = self.dead_letter(messages, error)
+            if asyncio.iscoroutine(result):
+                await result
+        except Exception:
+            logger.exception("Ошибка в обработчике dead_letter")
+
+
+def get_queue(provider: str) -> MailQueue:
+    queue = _queues.get(provider)
+    if queue is None or queue.loop is not asyncio.get_running_loop():
+        options = get_options(provider)
+        dead_letter = options.get("dead_letter")
+        queue = _queues[provider] = MailQueue(
+            provider=options["provider"],
+            max_size=options.get("max_size", 1000),
+            workers=options.get("workers", 1),
+            batch_size=options.get("batch_size", 50),
+            max_retries=options.get("max_retries", 3),
+            retry_delay=options.get("retry_delay", 1),
+            dead_letter=import_string(dead_letter) if isinstance(dead_letter, str) else dead_letter,
+        )
+    return queue
+
+
+def get_queue_stats() -> dict[str, dict[str, Any]]:
+    return {provider: queue.stats() for provider, queue in _queues.items()}
+
+
+async def drain_queues(timeout: int | float | None = None) -> None:
+    """Дожидается отправки писем из всех очередей.  Вызывается при остановке приложения"""
+    queues = list(_queues.values())
+    _queues.clear()
+    await asyncio.gather(
+        *(queue.drain(timeout) for queue in queues if queue.loop is asyncio.get_running_loop())
+    )
+
+
+class EmailBackend(BaseEmailBackend):
+    """
+    Бэкенд, который ставит письма в очередь и сразу возвращает управление.  Письма отправляются в фоне
+    через провайдера, заданного в OPTIONS["provider"]:
+
+        EMAIL_PROVIDERS = {
+            "smtp": {
+                "BACKEND": "fastapi_django.mail.backends.smtp.EmailBackend",
+                "HOST": "localhost",
+                "PORT": 25,
+            },
+            "default": {
+                "BACKEND": "fastapi_django.mail.backends.queued.EmailBackend",
+                "OPTIONS": {
+                    "provider": "smtp",
+                    "max_size": 1000,  # размер очереди
+                    "workers": 1,  # количество воркеров
+                    "batch_size": 50,  # максимальное количество писем, отправляемых за раз
+                    "max_retries": 3,
+                    "retry_delay": 1,  # задержка перед первой повторной попыткой, сек.
+                    "dead_letter": "path.to.handler",  # вызывается с (messages, error), если письма не отправлены
+                    "from_email": "noreply@example.com",
+                },
+            },
+        }
+
+    Возвращаемое send_messages() количество - это количество писем, поставленных в очередь
+    """
+
+    def __init__(self, fail_silently: bool = False, provider: str | None = None, **kw: Any):
+        super().__init__(fail_silently=fail_silently, provider=provider, **kw)
+        provider = self.provider
+        if get_option(provider, "provider") in (None, provider):
+            raise ImproperlyConfigured(f"Не задан провайдер для отправки писем в EMAIL_PROVIDERS['{provider}']['OPTIONS']")
+
+    async def send_messages(self, email_messages):
+        if not email_messages:
+            return 0
+        queue = get_queue(self.provider)
+        msg_count = 0
+        for message in email_messages:
+            await queue.put(message)
+            msg_count += 1
+        return msg_count
@@ -1,18 +1,173 @@
+import asyncio
+import re
 import ssl
-import threading
+import time
+from collections import deque
 
-from aiosmtplib import SMTP, SMTPException, SMTPServerDisconnected
+from aiosmtplib import (
+    SMTP,
+    SMTPDataError,
+    SMTPException,
+    SMTPRecipientRefused,
+    SMTPRecipientsRefused,
+    SMTPResponseException,
+    SMTPServerDisconnected,
+    SMTPStatus,
+)
 
 from fastapi_django.conf import settings
 from fastapi_django.mail.backends.base import BaseEmailBackend
-from fastapi_django.mail.message import sanitize_address
+from fastapi_django.mail.message import AttachmentStreamConsumedError, sanitize_address
 from fastapi_django.mail.utils import DNS_NAME, get_required, get_options
 
+# пулы соединений.  ключ - параметры подключения, т.к. бэкенд может быть создан с параметрами,
+# отличными от заданных в EMAIL_PROVIDERS
+_pools: dict[tuple, "SMTPConnectionPool"] = {}
+
+# строки, начинающиеся с точки, при передаче в DATA дублируют точку (RFC 5321, 4.5.2)
+PERIOD_REGEX = re.compile(rb"(?m)^\.")
+
+
+class SMTPConnectionPool:
+    """
+    Пул долгоживущих SMTP-соединений
+
+    Соединения создаются по мере необходимости, но не более max_connections одновременно.  Соединения,
+    простаивающие дольше idle_timeout, закрываются, а перед повторным использованием соединения,
+    простаивавшего дольше health_check_interval, выполняется NOOP.  Это позволяет не тратить время на
+    TCP/TLS-рукопожатие и аутентификацию при каждой отправке
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str | None = None,
+        password: str | None = None,
+        timeout: int | float | None = None,
+        max_connections: int = 1,
+        idle_timeout: int | float = 60,
+        health_check_interval: int | float = 30,
+    ):
+        if max_connections < 1:
+            raise ValueError("max_connections не может быть меньше 1")
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._idle: deque[tuple[SMTP, float]] = deque()
+        self._semaphore = asyncio.Semaphore(max_connections)
+        # соединения привязаны к циклу событий, в котором были созданы
+        self.loop = asyncio.get_running_loop()
+
+    async def acquire(self) -> SMTP:
+        await self._semaphore.acquire()
+        try:
+            while self._idle:
+                connection, released_at = self._idle.pop()
+                idle = time.monotonic() - released_at
+                if idle > self.idle_timeout or not connection.is_connected:
+                    await self._close(connection)
+                    continue
+                if idle > self.health_check_interval:
+                    try:
+                        await connection.noop()
+                    except SMTPException:
+                        await self._close(connection)
+                        continue
+                return connection
+            return await self._connect()
+        except BaseException:
+            self._semaphore.release()
+            raise
+
+    async def release(self, connection: SMTP, discard: bool = False) -> None:
+        try:
+            if discard or not connection.is_connected:
+                await self._close(connection)
+            else:
+                self._idle.append((connection, time.monotonic()))
+        finally:
+            self._semaphore.release()
+
+    async def close(self) -> None:
+        while self._idle:
+            connection, _ = self._idle.pop()
+            await self._close(connection, quit=True)
+
+    async def _connect(self) -> SMTP:
+        # If local_hostname is not specified, socket.getfqdn() gets used.
+        # For performance, we use the cached FQDN for local_hostname.
+        connection_params = {"local_hostname": DNS_NAME.get_fqdn()}
+        if self.timeout is not None:
+            connection_params["timeout"] = self.timeout
+        connection = SMTP(hostname=self.host, port=self.port, **connection_params)
+        await connection.connect()
+        # если я правильно понял, работа с TLS происходит под капотом
+        if self.username and self.password:
+            await connection.login(self.username, self.password)
+        return connection
+
+    async def _close(self, connection: SMTP, quit: bool = False) -> None:
+        try:
+            if quit and connection.is_connected:
+                await connection.quit()
+        except (ssl.SSLError, SMTPException):
+            pass
+        finally:
+            connection.close()
+
+
+def supports_streaming(protocol) -> bool:
+    """
+    Есть ли у протокола aiosmtplib приватные атрибуты, через которые EmailBackend передает письмо в DATA по частям
+    (проверено на aiosmtplib 4.0)
+    """
+    return isinstance(getattr(protocol, "_command_lock", None), asyncio.Lock) and hasattr(protocol, "_drain_helper")
+
+
+def get_pool(**params) -> SMTPConnectionPool:
+    key = tuple(sorted(params.items()))
+    pool = _pools.get(key)
+    if pool is None or pool.loop is not asyncio.get_running_loop():
+        pool = _pools[key] = SMTPConnectionPool(**params)
+    return pool
+
+
+async def close_pools() -> None:
+    """Закрывает простаивающие соединения всех пулов.  Следует вызывать при остановке приложения"""
+    pools = list(_pools.values())
+    _pools.clear()
+    for pool in pools:
+        if pool.loop is asyncio.get_running_loop():
+            await pool.close()
+
 
 class EmailBackend(BaseEmailBackend):
     """
     A wrapper that manages the SMTP network connection.
 
+    Если соединение не было явно открыто методом open() (или через async with), то письма отправляются через
+    пул соединений провайдера, причем распределяются по max_connections соединениям и отправляются
+    параллельно.  Параметры пула задаются в OPTIONS провайдера:
+
+        EMAIL_PROVIDERS = {
+            "default": {
+                "BACKEND": "fastapi_django.mail.backends.smtp.EmailBackend",
+                "HOST": "localhost",
+                "PORT": 25,
+                "OPTIONS": {
+                    "max_connections": 4,
+                    "idle_timeout": 60,
+                    "health_check_interval": 30,
+                },
+            },
+        }
+
     TODO: пока не понял, что делать с ssl, tls
     """
 
@@ -24,17 +179,33 @@ class EmailBackend(BaseEmailBackend):
         password: str | None = None,
         fail_silently: bool = False,
         timeout: int | float | None = None,
-        provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS,
+        provider: str | None = None,
     ):
         super().__init__(fail_silently=fail_silently, provider=provider)
+        provider = self.provider
         self.host = host or get_required(provider, "HOST")
         self.port = port or get_required(provider, "PORT")
         options = get_options(provider)
         self.username = options.get("username") if username is None else username
         self.password = options.get("password") if password is None else password
         self.timeout = options.get("timeout") if timeout is None else timeout
+        self.max_connections = options.get("max_connections", 1)
+        self.idle_timeout = options.get("idle_timeout", 60)
+        self.health_check_interval = options.get("health_check_interval", 30)
         self.connection = None
-        self._lock = threading.RLock()
+        self._lock = None
+
+    def get_pool(self) -> SMTPConnectionPool:
+        return get_pool(
+            host=self.host,
+            port=self.port,
+            username=self.username,
+            password=self.password,
+            timeout=self.timeout,
+            max_connections=self.max_connections,
+            idle_timeout=self.idle_timeout,
+            health_check_interval=self.health_check_interval,
+        )
 
     async def open(self):
         """
@@ -45,39 +216,19 @@ class EmailBackend(BaseEmailBackend):
         if self.connection:
             # Nothing to do if the connection is already open.
             return False
-
-        # If local_hostname is not specified, socket.getfqdn() gets used.
-        # For performance, we use the cached FQDN for local_hostname.
-        connection_params = {"local_hostname": DNS_NAME.get_fqdn()}
-        if self.timeout is not None:
-            connection_params["timeout"] = self.timeout
         try:
-            self.connection = SMTP(hostname=self.host, port=self.port, **connection_params)
-            await self.connection.connect()
-            # если я правильно понял, работа с TLS происходит под капотом
-            if self.username and self.password:
-                await self.connection.login(self.username, self.password)
+            self.connection = await self.get_pool().acquire()
             return True
-        except OSError:
+        except (OSError, SMTPException):
             if not self.fail_silently:
                 raise
 
     async def close(self):
-        """Close the connection to the email server."""
+        """Return the connection to the pool."""
         if self.connection is None:
             return
         try:
-            try:
-                await self.connection.quit()
-            except (ssl.SSLError, SMTPServerDisconnected):
-                # This happens when calling quit() on a TLS connection
-                # sometimes, or when the connection was already disconnected
-                # by the server.
-                await self.connection.close()
-            except SMTPException:
-                if self.fail_silently:
-                    return
-                raise
+            await self.get_pool().release(self.connection)
         finally:
             self.connection = None
 
@@ -86,26 +237,89 @@ class EmailBackend(BaseEmailBackend):
         Send one or more EmailMessage objects and return the number of email
         messages sent.
         """
+        # email_messages может быть генератором, а ниже нужна его длина
+        email_messages = list(email_messages)
         if not email_messages:
             return 0
-        with self._lock:
-            new_conn_created = await self.open()
-            if not self.connection or new_conn_created is None:
-                # We failed silently on open().
-                # Trying to send would be pointless.
-                return 0
-            num_sent = 0
-            try:
+        results = await self._send_all(email_messages)
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors and not self.fail_silently:
+            raise errors[0]
+        return results.count(True)
+
+    async def send_messages_results(self, email_messages) -> list[Exception | None]:
+        # письма без получателей не отправляются, но и повторять их отправку незачем
+        results = await self._send_all(list(email_messages))
+        return [result if isinstance(result, Exception) else None for result in results]
+
+    async def _send_all(self, email_messages: list) -> list[bool | Exception]:
+        """
+        Отправляет письма и возвращает результат отправки каждого: True - отправлено, False - нет получателей,
+        исключение - ошибка отправки
+        """
+        if not email_messages:
+            return []
+        if self.connection:
+            # соединение открыто явно - отправляем через него последовательно
+            if self._lock is None:
+                self._lock = asyncio.Lock()
+            async with self._lock:
+                results: list[bool | Exception] = []
                 for message in email_messages:
-                    sent = await self._send(message)
-                    if sent:
-                        num_sent += 1
-            finally:
-                if new_conn_created:
-                    await self.close()
-        return num_sent
-
-    async def _send(self, email_message) -> bool:
+                    try:
+                        results.append(await self._send(self.connection, message))
+                    except (SMTPException, AttachmentStreamConsumedError) as e:
+                        results.append(e)
+                return results
+        results = [False] * len(email_messages)
+        messages = iter(enumerate(email_messages))
+        workers = min(self.max_connections, len(email_messages))
+        errors = await asyncio.gather(*(self._send_from_pool(messages, results) for _ in range(workers)))
+        # письма, которые не взял ни один воркер, т.к. не удалось подключиться к серверу
+        error = next((error for error in errors if error is not None), None)
+        for index, _ in messages:
+            results[index] = error
+        return results
+
+    async def _send_from_pool(self, messages, results: list) -> Exception | None:
+        """
+        Воркер берет соединение из пула и отправляет письма из общего итератора, пока они не закончатся.  Результат
+        отправки каждого письма записывается в results.  Если подключиться к серверу не удалось, то возвращает
+        ошибку, а оставшиеся письма отправляют другие воркеры
+        """
+        pool = self.get_pool()
+        try:
+            connection = await pool.acquire()
+        except (OSError, SMTPException) as e:
+            return e
+        discard = False
+        try:
+            for index, message in messages:
+                try:
+                    try:
+                        results[index] = await self._send(connection, message)
+                    except SMTPServerDisconnected:
+                        # сервер закрыл соединение (напр., по таймауту) - переподключаемся и повторяем один раз.
+                        # письмо, вложение которого из асинхронного потока уже прочитано, повторить нельзя
+                        await pool.release(connection, discard=True)
+                        connection = None
+                        connection = await pool.acquire()
+                        if not getattr(message, "resendable", True):
+                            raise
+                        results[index] = await self._send(connection, message)
+                except (OSError, SMTPException, AttachmentStreamConsumedError) as e:
+                    results[index] = e
+                    if connection is None:
+                        return e
+        except BaseException:
+            discard = True
+            raise
+        finally:
+            if connection is not None:
+                await pool.release(connection, discard=discard)
+        return None
+
+    async def _send(self, connection, email_message) -> bool:
         """A helper method that does the actual sending."""
         if not email_message.recipients():
             return False
@@ -115,12 +329,69 @@ class EmailBackend(BaseEmailBackend):
             sanitize_address(addr, encoding) for addr in email_message.recipients()
         ]
         message = email_message.message()
-        try:
-            await self.connection.sendmail(
+        if getattr(message, "lazy_attachments", None):
+            await self._sendmail_stream(connection, from_email, recipients, message.iter_bytes(linesep="\r\n"))
+        else:
+            await connection.sendmail(
                 from_email, recipients, message.as_bytes(linesep="\r\n")
             )
-        except SMTPException:
-            if not self.fail_silently:
-                raise
-            return False
         return True
+
+    async def _sendmail_stream(self, connection: SMTP, from_email, recipients, chunks) -> None:
+        """
+        Аналог SMTP.sendmail(), который передает письмо в DATA по частям.  Используется для писем с вложениями,
+        которые читаются при отправке, чтобы не держать в памяти письмо целиком
+        """
+        if connection.protocol is not None and not supports_streaming(connection.protocol):
+            # в этой версии aiosmtplib нет атрибутов протокола, через которые письмо передается по частям -
+            # отправляем письмо целиком
+            await connection.sendmail(from_email, recipients, b"".join([chunk async for chunk in chunks]))
+            return
+        try:
+            await connection.mail(from_email)
+            errors = []
+            for recipient in recipients:
+                try:
+                    await connection.rcpt(recipient)
+                except SMTPRecipientRefused as e:
+                    errors.append(e)
+            if len(errors) == len(recipients):
+                raise SMTPRecipientsRefused(errors)
+        except (SMTPResponseException, SMTPRecipientsRefused):
+            try:
+                await connection.rset()
+            except (ConnectionError, SMTPResponseException):
+                pass
+            raise
+        # у aiosmtplib нет API для передачи DATA частями, поэтому пишем напрямую в протокол, как
+        # SMTPProtocol.execute_data_command()
+        protocol = connection.protocol
+        if protocol is None:
+            raise SMTPServerDisconnected("Connection lost")
+        transferring = False
+        try:
+            async with protocol._command_lock:
+                protocol.write(b"DATA\r\n")
+                response = await protocol.read_response(timeout=connection.timeout)
+                if response.code != SMTPStatus.start_input:
+                    raise SMTPDataError(response.code, response.message)
+                transferring = True
+                tail = b"\r\n"
+                async for chunk in chunks:
+                    if not chunk:
+                        continue
+                    # части режутся по границам строк, поэтому ^ в начале части - это начало строки
+                    protocol.write(PERIOD_REGEX.sub(b"..", chunk))
+                    # ждем, пока буфер транспорта не освободится, чтобы не накапливать письмо в памяти
+                    await protocol._drain_helper()
+                    tail = chunk[-2:]
+                protocol.write(b".\r\n" if tail == b"\r\n" else b"\r\n.\r\n")
+                response = await protocol.read_response(timeout=connection.timeout)
+                transferring = False
+                if response.code != SMTPStatus.completed:
+                    raise SMTPDataError(response.code, response.message)
+        except BaseException:
+            if transferring:
+                # письмо передано не полностью, соединение больше использовать нельзя
+                connection.close()
+            raise
@@ -1,4 +1,8 @@
+import asyncio
+import base64
 import mimetypes
+import re
+import uuid
 from collections import namedtuple
 from email import charset as Charset
 from email import encoders as Encoders
@@ -7,6 +11,7 @@ from email.errors import HeaderParseError
 from email.header import Header
 from email.headerregistry import Address, parser
 from email.message import Message
+from email.policy import compat32
 from email.mime.base import MIMEBase
 from email.mime.message import MIMEMessage
 from email.mime.multipart import MIMEMultipart
@@ -14,6 +19,7 @@ from email.mime.text import MIMEText
 from email.utils import formataddr, formatdate, getaddresses, make_msgid
 from io import BytesIO, StringIO
 from pathlib import Path
+from typing import AsyncIterable, AsyncIterator
 
 from fastapi_django.conf import settings
 from fastapi_django.mail.utils import DNS_NAME
@@ -32,11 +38,21 @@ DEFAULT_ATTACHMENT_MIME_TYPE = "application/octet-stream"
 
 RFC5322_EMAIL_LINE_LENGTH_LIMIT = 998
 
+# вложения, подключаемые при сериализации письма, читаются и кодируются порциями этого размера.
+# размер кратен 57 байтам - столько кодируется в одну строку base64 (76 символов)
+LAZY_ATTACHMENT_CHUNK_SIZE = 57 * 1024
+LAZY_ATTACHMENT_MARKER = "fastapidjangolazyattachment"
+LAZY_ATTACHMENT_MARKER_REGEX = re.compile(rb"%s[0-9a-f]{32}" % LAZY_ATTACHMENT_MARKER.encode())
+
 
 class BadHeaderError(ValueError):
     pass
 
 
+class AttachmentStreamConsumedError(ValueError):
+    pass
+
+
 # Header names that contain structured address data (RFC 5322).
 ADDRESS_HEADERS = {
     "from",
@@ -147,7 +163,35 @@ class MIMEMixin:
         fp = BytesIO()
         g = generator.BytesGenerator(fp, mangle_from_=False)
         g.flatten(self, unixfrom=unixfrom, linesep=linesep)
-        return fp.getvalue()
+        data = fp.getvalue()
+        if self.lazy_attachments:
+            data = LAZY_ATTACHMENT_MARKER_REGEX.sub(
+                lambda match: read_lazy_attachment(self.lazy_attachments[match.group().decode()], linesep), data
+            )
+        return data
+
+    # вложения, которые читаются при сериализации: {маркер в теле письма: путь к файлу или асинхронный поток}
+    lazy_attachments: dict = {}
+
+    async def iter_bytes(self, linesep="\n") -> AsyncIterator[bytes]:
+        """
+        Сериализует письмо порциями.  Вложения, добавленные через attach_file(lazy=True) и attach_stream(),
+        читаются и кодируются по частям, поэтому не загружаются в память целиком
+        """
+        if not self.lazy_attachments:
+            yield self.as_bytes(linesep=linesep)
+            return
+        fp = BytesIO()
+        g = generator.BytesGenerator(fp, mangle_from_=False)
+        g.flatten(self, linesep=linesep)
+        data = fp.getvalue()
+        start = 0
+        for match in LAZY_ATTACHMENT_MARKER_REGEX.finditer(data):
+            yield data[start:match.start()]
+            async for chunk in iter_lazy_attachment(self.lazy_attachments[match.group().decode()], linesep):
+                yield chunk
+            start = match.end()
+        yield data[start:]
 
 
 class SafeMIMEMessage(MIMEMixin, MIMEMessage):
@@ -193,6 +237,66 @@ class SafeMIMEMultipart(MIMEMixin, MIMEMultipart):
 
 EmailAlternative = namedtuple("EmailAlternative", ["content", "mimetype"])
 EmailAttachment = namedtuple("EmailAttachment", ["filename", "content", "mimetype"])
+# source - путь к файлу или AttachmentStream
+LazyAttachment = namedtuple("LazyAttachment", ["filename", "source", "mimetype"])
+
+
+class AttachmentStream:
+    """
+    Асинхронный поток байт вложения.  Поток можно прочитать только один раз, поэтому повторное чтение (напр., при
+    повторной отправке письма) вызывает AttachmentStreamConsumedError, а не отправляет пустое или обрезанное вложение
+    """
+
+    def __init__(self, stream: AsyncIterable[bytes]):
+        self.stream = stream
+        self.consumed = False
+
+    def __aiter__(self) -> AsyncIterator[bytes]:
+        if self.consumed:
+            raise AttachmentStreamConsumedError("Вложение из асинхронного потока уже прочитано при отправке письма")
+        self.consumed = True
+        return aiter(self.stream)
+
+
+def _encode_base64(data: bytes, linesep: str) -> bytes:
+    encoded = base64.encodebytes(data)
+    return encoded if linesep == "\n" else encoded.replace(b"\n", linesep.encode())
+
+
+def read_lazy_attachment(source, linesep="\n") -> bytes:
+    """Читает и кодирует вложение целиком.  Используется бэкендами, которые не умеют отправлять письмо порциями"""
+    if not isinstance(source, Path):
+        raise ValueError("Вложение из асинхронного потока может быть отправлено только через iter_bytes()")
+    return _encode_base64(source.read_bytes(), linesep).rstrip(linesep.encode())
+
+
+async def iter_lazy_attachment(source, linesep="\n") -> AsyncIterator[bytes]:
+    """Читает и кодирует вложение порциями по LAZY_ATTACHMENT_CHUNK_SIZE байт"""
+    # последняя строка base64 не должна заканчиваться переводом строки - его добавит генератор после маркера
+    last = b""
+    if isinstance(source, Path):
+        file = await asyncio.to_thread(source.open, "rb")
+        try:
+            while chunk := await asyncio.to_thread(file.read, LAZY_ATTACHMENT_CHUNK_SIZE):
+                if last:
+                    yield last
+                last = _encode_base64(chunk, linesep)
+        finally:
+            await asyncio.to_thread(file.close)
+    else:
+        buffer = b""
+        async for data in source:
+            buffer += data
+            size = len(buffer) - len(buffer) % 57
+            if size >= LAZY_ATTACHMENT_CHUNK_SIZE:
+                if last:
+                    yield last
+                last, buffer = _encode_base64(buffer[:size], linesep), buffer[size:]
+        if buffer:
+            if last:
+                yield last
+            last = _encode_base64(buffer, linesep)
+    yield last.rstrip(linesep.encode())
 
 
 class EmailMessage:
@@ -214,7 +318,7 @@ class EmailMessage:
         cc=None,
         reply_to=None,
         connection=None,
-        provider = settings.DEFAULT_EMAIL_PROVIDER_ALIAS,
+        provider: str | None = None,
     ):
         """
         Initialize a single email message (which can be sent to multiple
@@ -250,13 +354,13 @@ class EmailMessage:
         self.attachments = []
         if attachments:
             for attachment in attachments:
-                if isinstance(attachment, MIMEBase):
-                    self.attach(attachment)
+                if isinstance(attachment, (MIMEBase, LazyAttachment)):
+                    self.attachments.append(attachment)
                 else:
                     self.attach(*attachment)
         self.extra_headers = headers or {}
         self.connection = connection
-        self.provider = provider
+        self.provider = provider or settings.DEFAULT_EMAIL_PROVIDER_ALIAS
 
     def get_connection(self, fail_silently=False):
         from fastapi_django.mail import get_connection
@@ -306,7 +410,11 @@ class EmailMessage:
             # Don't bother creating the network connection if there's nobody to
             # send to.
             return 0
-        return await self.get_connection(fail_silently).send_messages([self])
+        if self.connection:
+            return await self.connection.send_messages([self])
+        from fastapi_django.mail.providers import providers
+
+        return await providers.get_backend(self.provider, fail_silently).send_messages([self])
 
     def attach(self, filename=None, content=None, mimetype=None):
         """
@@ -348,7 +456,7 @@ class EmailMessage:
 
             self.attachments.append(EmailAttachment(filename, content, mimetype))
 
-    def attach_file(self, path, mimetype=None):
+    def attach_file(self, path, mimetype=None, lazy=False):
         """
         Attach a file from the filesystem.
 
@@ -358,12 +466,37 @@ class EmailMessage:
         For a text/* mimetype (guessed or specified), decode the file's content
         as UTF-8. If that fails, set the mimetype to
         DEFAULT_ATTACHMENT_MIME_TYPE and don't decode the content.
+
+        Если lazy=True, то файл не читается сразу, а читается и кодируется (base64) порциями при отправке
         """
         path = Path(path)
+        if lazy:
+            mimetype = mimetype or mimetypes.guess_type(path.name)[0] or DEFAULT_ATTACHMENT_MIME_TYPE
+            self.attachments.append(LazyAttachment(path.name, path, mimetype))
+            return
         with path.open("rb") as file:  # TODO: асинхронно?
             content = file.read()
             self.attach(path.name, content, mimetype)
 
+    def attach_stream(self, filename, stream: AsyncIterable[bytes], mimetype=None):
+        """
+        Прикрепляет вложение из асинхронного потока байт.  Поток читается и кодируется (base64) порциями при
+        отправке, поэтому письмо можно отправить только один раз (см. resendable) и только бэкендом, который
+        отправляет письмо порциями (SMTP)
+        """
+        mimetype = mimetype or mimetypes.guess_type(filename)[0] or DEFAULT_ATTACHMENT_MIME_TYPE
+        self.attachments.append(LazyAttachment(filename, AttachmentStream(stream), mimetype))
+
+    @property
+    def resendable(self) -> bool:
+        """False, если вложение из асинхронного потока уже прочитано при отправке и повторно письмо отправить нельзя"""
+        return not any(
+            isinstance(attachment, LazyAttachment)
+            and isinstance(attachment.source, AttachmentStream)
+            and attachment.source.consumed
+            for attachment in self.attachments
+        )
+
     def _create_message(self, msg):
         return self._create_attachments(msg)
 
@@ -374,11 +507,17 @@ class EmailMessage:
             msg = SafeMIMEMultipart(_subtype=self.mixed_subtype, encoding=encoding)
             if self.body or body_msg.is_multipart():
                 msg.attach(body_msg)
+            lazy_attachments = {}
             for attachment in self.attachments:
                 if isinstance(attachment, MIMEBase):
                     msg.attach(attachment)
+                elif isinstance(attachment, LazyAttachment):
+                    marker = LAZY_ATTACHMENT_MARKER + uuid.uuid4().hex
+                    lazy_attachments[marker] = attachment.source
+                    msg.attach(self._create_lazy_attachment(attachment.filename, marker, attachment.mimetype))
                 else:
                     msg.attach(self._create_attachment(*attachment))
+            msg.lazy_attachments = lazy_attachments
         return msg
 
     def _create_mime_attachment(self, content, mimetype):
@@ -417,6 +556,22 @@ class EmailMessage:
         object.
         """
         attachment = self._create_mime_attachment(content, mimetype)
+        self._set_content_disposition(attachment, filename)
+        return attachment
+
+    def _create_lazy_attachment(self, filename, marker, mimetype):
+        """
+        Создает вложение, содержимое которого заменено маркером.  Маркер заменяется на содержимое вложения
+        при сериализации письма
+        """
+        basetype, subtype = mimetype.split("/", 1)
+        attachment = MIMEBase(basetype, subtype)
+        attachment["Content-Transfer-Encoding"] = "base64"
+        attachment.set_payload(marker)
+        self._set_content_disposition(attachment, filename)
+        return attachment
+
+    def _set_content_disposition(self, attachment, filename):
         if filename:
             try:
                 filename.encode("ascii")
@@ -425,7 +580,6 @@ class EmailMessage:
             attachment.add_header(
                 "Content-Disposition", "attachment", filename=filename
             )
-        return attachment
 
     def _set_list_header_if_not_empty(self, msg, header, values):
         """
@@ -461,7 +615,7 @@ class EmailMultiAlternatives(EmailMessage):
         cc=None,
         reply_to=None,
         connection=None,
-        provider: str = settings.DEFAULT_EMAIL_PROVIDER_ALIAS,
+        provider: str | None = None,
     ):
         """
         Initialize a single email message (which can be sent to multiple
@@ -522,3 +676,118 @@ class EmailMultiAlternatives(EmailMessage):
             if mimetype.startswith("text/") and text not in content:
                 return False
         return True
+
+
+class EmailMessageSkeleton:
+    """
+    Заготовка письма для отправки одного и того же письма множеству получателей
+
+    EmailMessage.message() при каждой отправке заново строит MIME-дерево, кодирует заголовки, тело и вложения
+    (base64) и сериализует их.  Заготовка делает это один раз, а для каждого получателя заново формируются только
+    заголовки To, Date и Message-ID (и переданные дополнительные заголовки):
+
+        skeleton = EmailMessageSkeleton(EmailMessage("Отчет", body, attachments=[("report.pdf", content, None)]))
+        for email in recipients:
+            await skeleton.message(to=[email]).send()
+
+    Заголовки To, Date и Message-ID, заданные в headers исходного письма, остаются общими для всех получателей.
+    Вложения из асинхронного потока (attach_stream()) в заготовке не поддерживаются: поток читается один раз, а
+    заготовка сериализуется целиком.  Файлы, прикрепленные с lazy=True, читаются при первой сериализации
+    """
+
+    per_recipient_headers = ("To", "Date", "Message-ID")
+
+    def __init__(self, email_message: EmailMessage):
+        if any(
+            isinstance(attachment, LazyAttachment) and isinstance(attachment.source, AttachmentStream)
+            for attachment in email_message.attachments
+        ):
+            raise ValueError("Вложения из асинхронного потока (attach_stream()) не поддерживаются в заготовке письма")
+        self.email_message = email_message
+        header_names = {key.lower() for key in email_message.extra_headers}
+        self.dynamic_headers = [name for name in self.per_recipient_headers if name.lower() not in header_names]
+        msg = email_message.message()
+        for name in self.dynamic_headers:
+            del msg[name]
+        self._msg = msg
+        self._serialized: dict[str, tuple[bytes, bytes]] = {}
+
+    def serialize(self, linesep: str = "\n") -> tuple[bytes, bytes]:
+        """Общие заголовки и тело письма.  Сериализуются один раз для каждого linesep"""
+        if linesep not in self._serialized:
+            data = self._msg.as_bytes(linesep=linesep)
+            sep = linesep.encode()
+            index = data.index(sep * 2)
+            self._serialized[linesep] = data[:index + len(sep)], data[index + 2 * len(sep):]
+        return self._serialized[linesep]
+
+    def message(self, to=None, bcc=None, headers=None) -> "SkeletonEmailMessage":
+        return SkeletonEmailMessage(self, to=to, bcc=bcc, headers=headers)
+
+
+class SkeletonEmailMessage(EmailMessage):
+    """Письмо конкретному получателю, собираемое из заготовки EmailMessageSkeleton"""
+
+    def __init__(self, skeleton: EmailMessageSkeleton, to=None, bcc=None, headers=None):
+        base = skeleton.email_message
+        super().__init__(
+            base.subject,
+            base.body,
+            base.from_email,
+            to,
+            bcc,
+            cc=base.cc,
+            reply_to=base.reply_to,
+            connection=base.connection,
+            provider=base.provider,
+        )
+        self.encoding = base.encoding
+        self.attachments = base.attachments
+        self.skeleton = skeleton
+        # дополнительные заголовки получателя, общие заголовки уже есть в заготовке
+        self.recipient_headers = headers or {}
+        self.extra_headers = {**base.extra_headers, **self.recipient_headers}
+
+    def message(self):
+        encoding = self.encoding or settings.DEFAULT_CHARSET
+        header_names = {key.lower() for key in self.recipient_headers}
+        headers = []
+        for name in self.skeleton.dynamic_headers:
+            if name.lower() in header_names:
+                continue
+            if name == "To":
+                if self.to:
+                    headers.append(forbid_multi_line_headers(name, ", ".join(str(v) for v in self.to), encoding))
+            elif name == "Date":
+                headers.append((name, formatdate(localtime=settings.EMAIL_USE_LOCALTIME)))
+            else:
+                headers.append((name, make_msgid(domain=DNS_NAME)))
+        for name, value in self.recipient_headers.items():
+            headers.append(forbid_multi_line_headers(name, value, encoding))
+        return PreparedMessage(self.skeleton, headers)
+
+
+class PreparedMessage:
+    """
+    Сериализованное письмо: общие заголовки и тело из заготовки плюс заголовки получателя.  Поддерживает
+    ту часть интерфейса email.message.Message, которая используется бэкендами
+    """
+
+    def __init__(self, skeleton: EmailMessageSkeleton, headers: list[tuple[str, str]]):
+        self.skeleton = skeleton
+        self.headers = headers
+
+    def __getitem__(self, name):
+        for header, value in self.headers:
+            if header.lower() == name.lower():
+                return value
+        return self.skeleton._msg[name]
+
+    def get_charset(self):
+        return self.skeleton._msg.get_charset()
+
+    def as_bytes(self, unixfrom=False, linesep="\n"):
+        head, body = self.skeleton.serialize(linesep)
+        policy = compat32.clone(linesep=linesep)
+        recipient_head = b"".join(policy.fold_binary(name, value) for name, value in self.headers)
+        return b"".join((head, recipient_head, linesep.encode(), body))
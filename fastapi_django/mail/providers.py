@@ -0,0 +1,89 @@
+"""
+Provider registry: validated EMAIL_PROVIDERS, cached backend classes and shared backend instances.
+"""
+from typing import Any
+
+from fastapi_django.conf import on_setting_changed, settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.utils.module_loading import import_string
+
+
+class ProviderRegistry:
+    """
+    Реестр провайдеров отправки писем
+
+    При первом обращении (или при запуске приложения, см. app.get_lifespan()) проверяет все записи EMAIL_PROVIDERS,
+    импортирует классы бэкендов и создает по одному экземпляру бэкенда на провайдера.  Эти экземпляры используются
+    send_mail() и другими функциями отправки, поэтому при отправке не тратится время на поиск настроек, импорт и
+    создание бэкенда.  Экземпляры закрываются при остановке приложения
+
+    При подмене EMAIL_PROVIDERS через override_settings реестр сбрасывается
+    """
+
+    def __init__(self):
+        self._classes: dict[str, type] | None = None
+        self._instances: dict[tuple[str, bool], Any] = {}
+
+    def setup(self) -> None:
+        from fastapi_django.mail.backends.base import BaseEmailBackend
+
+        classes = {}
+        for provider, config in settings.EMAIL_PROVIDERS.items():
+            if not isinstance(config, dict) or "BACKEND" not in config:
+                raise ImproperlyConfigured(f"Не задан BACKEND в EMAIL_PROVIDERS['{provider}']")
+            try:
+                klass = import_string(config["BACKEND"])
+            except ImportError as e:
+                raise ImproperlyConfigured(f"Не удалось импортировать бэкенд EMAIL_PROVIDERS['{provider}']: {e}") from e
+            if not (isinstance(klass, type) and issubclass(klass, BaseEmailBackend)):
+                raise ImproperlyConfigured(
+                    f"Бэкенд EMAIL_PROVIDERS['{provider}'] должен быть наследником BaseEmailBackend"
+                )
+            classes[provider] = klass
+        # создание экземпляров проверяет настройки, которые бэкенды читают в __init__ (HOST, file_path и т.д.).
+        # реестр заполняется, только если все экземпляры созданы, иначе при следующем обращении проверка повторится
+        instances = {
+            (provider, False): klass(fail_silently=False, provider=provider) for provider, klass in classes.items()
+        }
+        self._classes = classes
+        self._instances = instances
+
+    def reset(self) -> None:
+        self._classes = None
+        self._instances.clear()
+
+    def get_backend_class(self, provider: str) -> type:
+        if self._classes is None:
+            self.setup()
+        try:
+            return self._classes[provider]
+        except KeyError:
+            raise ImproperlyConfigured(f"`{provider}` отсутствует в EMAIL_PROVIDERS") from None
+
+    def get_backend(self, provider: str, fail_silently: bool = False):
+        """
+        Общий экземпляр бэкенда провайдера.  Не следует явно открывать его соединение (open(), async with) - для
+        этого нужно создать отдельный экземпляр через get_connection()
+        """
+        key = (provider, fail_silently)
+        backend = self._instances.get(key)
+        if backend is None:
+            backend = self.get_backend_class(provider)(fail_silently=fail_silently, provider=provider)
+            self._instances[key] = backend
+        return backend
+
+    async def close(self) -> None:
+        """Закрывает общие экземпляры бэкендов.  Вызывается при остановке приложения"""
+        instances = list(self._instances.values())
+        self._instances.clear()
+        for backend in instances:
+            await backend.close()
+
+
+providers = ProviderRegistry()
+
+
+@on_setting_changed
+def reset_providers(setting: str, value: Any) -> None:
+    if setting == "EMAIL_PROVIDERS":
+        providers.reset()
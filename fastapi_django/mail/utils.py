@@ -2,17 +2,19 @@
 Email message and email sending related helper functions.
 """
 
+import asyncio
 import socket
+import time
 from typing import Any
 
-from fastapi_django.conf import settings
+from fastapi_django.conf import on_setting_changed, settings
 from fastapi_django.exceptions import ImproperlyConfigured
 from fastapi_django.utils.encoding import punycode
 
 
 def get_provider(provider: str) -> dict[str, Any]:
-    if provider := settings.EMAIL_PROVIDERS.get(provider):
-        return provider
+    if config := settings.EMAIL_PROVIDERS.get(provider):
+        return config
     raise ImproperlyConfigured(f"`{provider}` отсутствует в EMAIL_PROVIDERS")
 
 
@@ -29,6 +31,55 @@ def get_required(provider: str, param: str) -> Any:
     return get_provider(provider)[param]
 
 
+class TokenBucket:
+    """
+    Ограничитель скорости отправки: не более rate писем в секунду, с возможностью кратковременно отправить
+    до capacity писем подряд
+
+    Токены резервируются сразу (их количество может уйти в минус), а вызывающий ждет, пока зарезервированный
+    токен не накопится.  Поэтому блокировка не нужна, а конкурирующие отправители обслуживаются по очереди
+    """
+
+    def __init__(self, rate: int | float, capacity: int | float | None = None):
+        if rate <= 0:
+            raise ValueError("rate должен быть больше 0")
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        self._tokens -= 1
+        if self._tokens < 0:
+            await asyncio.sleep(-self._tokens / self.rate)
+
+
+# ограничители скорости провайдеров.  общие для процесса, т.к. лимиты провайдера не зависят от того,
+# сколько рассылок идет одновременно
+_rate_limiters: dict[str, TokenBucket | None] = {}
+
+
+def get_rate_limiter(provider: str) -> TokenBucket | None:
+    """
+    Ограничитель скорости провайдера по OPTIONS["rate_limit"] (писем в секунду) и OPTIONS["rate_limit_burst"].
+    Если rate_limit не задан, то возвращает None
+    """
+    if provider not in _rate_limiters:
+        options = get_options(provider)
+        rate = options.get("rate_limit")
+        _rate_limiters[provider] = TokenBucket(rate, options.get("rate_limit_burst")) if rate else None
+    return _rate_limiters[provider]
+
+
+@on_setting_changed
+def reset_rate_limiters(setting: str, value: Any) -> None:
+    if setting == "EMAIL_PROVIDERS":
+        _rate_limiters.clear()
+
+
 # Cache the hostname, but do it lazily: socket.getfqdn() can take a couple of
 # seconds, which slows down the restart of the server.
 class CachedDnsName:
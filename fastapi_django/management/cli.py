@@ -1,6 +1,6 @@
 import uvicorn
 from IPython import embed
-from typer import Typer
+from typer import Exit, Typer
 
 from fastapi_django.conf import settings
 from fastapi_django.exceptions import ImproperlyConfigured
@@ -41,3 +41,73 @@ def shell() -> None:
     Runs a Python interactive interpreter (iPython)
     """
     embed()
+
+
+@typer.command()
+def openapi(output: str | None = None) -> None:
+    """
+    Сохраняет схему OpenAPI приложения UVICORN_APP в файл (по умолчанию - API_OPENAPI_FILE).
+
+    Выполняется при сборке, чтобы воркеры загружали готовую схему, а не строили ее при запуске
+    """
+    from uvicorn.importer import import_from_string
+
+    from fastapi_django.docs.openapi import serialize_openapi
+
+    output = output or settings.API_OPENAPI_FILE
+    if output is None:
+        raise ImproperlyConfigured("Не задан файл схемы OpenAPI (API_OPENAPI_FILE)")
+    app = import_from_string(settings.UVICORN_APP)
+    if settings.UVICORN_FACTORY:
+        app = app()
+    content = serialize_openapi(app)
+    with open(output, "wb") as f:
+        f.write(content)
+    print(f"Схема OpenAPI сохранена в {output}: {len(content)} байт")
+
+
+@typer.command()
+def compressstatic(directory: str | None = None) -> None:
+    """
+    Создает сжатые варианты (.gz и, если установлен brotli, .br) статических файлов.
+
+    По умолчанию сжимаются статические файлы документации (swagger, redoc).  Выполняется при сборке
+    """
+    from pathlib import Path
+
+    from fastapi_django.staticfiles import COMPRESSIBLE_EXTENSIONS, compress_file
+
+    root = Path(directory) if directory else Path(__file__).parent.parent / "static"
+    created = 0
+    for path in root.rglob("*"):
+        if path.is_file() and path.suffix in COMPRESSIBLE_EXTENSIONS:
+            created += len(compress_file(path))
+    print(f"Создано сжатых файлов: {created}")
+
+
+@typer.command()
+def compiletemplates() -> None:
+    """
+    Компилирует все шаблоны из TEMPLATES_DIRECTORY и сохраняет байткод в кэш.
+
+    Выполняется при деплое, чтобы воркеры не компилировали шаблоны при первом обращении. Кэш байткода задается
+    опцией TEMPLATES_ENV_OPTIONS["bytecode_cache"] (напр., "filesystem")
+    """
+    from jinja2 import TemplateError
+
+    from fastapi_django.template import get_async_env, templates
+
+    if templates.env.bytecode_cache is None:
+        raise ImproperlyConfigured('Не задан кэш байткода шаблонов (TEMPLATES_ENV_OPTIONS["bytecode_cache"])')
+    failed = 0
+    names = templates.env.list_templates()
+    for name in names:
+        try:
+            templates.env.get_template(name)
+            get_async_env().get_template(name)
+        except TemplateError as e:
+            failed += 1
+            print(f"{name}: {e}")
+    print(f"Скомпилировано шаблонов: {len(names) - failed}, с ошибками: {failed}")
+    if failed:
+        raise Exit(code=1)
@@ -0,0 +1,45 @@
+"""
+Подключение middleware из настройки MIDDLEWARES.
+
+Middleware лучше писать на чистом ASGI (см. request_id.RequestIdMiddleware): BaseHTTPMiddleware добавляет к каждому
+запросу заметные накладные расходы (отдельная задача, очереди для тела ответа) и ломает потоковую отдачу ответа.
+"""
+import logging
+from typing import Any
+
+from starlette.middleware import Middleware
+from starlette.middleware.base import BaseHTTPMiddleware
+
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+def get_middleware(entry: Any) -> Middleware:
+    """
+    Элемент MIDDLEWARES:
+
+    - путь до класса middleware: "fastapi_django.middleware.timing.TimingMiddleware"
+    - путь и параметры инициализации: ("starlette.middleware.gzip.GZipMiddleware", {"minimum_size": 1000})
+    - класс или функция, напр., partial(TrustedHostMiddleware, allowed_hosts=["example.com"])
+    """
+    kwargs = {}
+    if isinstance(entry, (tuple, list)):
+        if len(entry) != 2 or not isinstance(entry[1], dict):
+            raise ImproperlyConfigured(f"Элемент MIDDLEWARES должен быть парой (путь, параметры): {entry!r}")
+        entry, kwargs = entry
+    if isinstance(entry, str):
+        try:
+            entry = import_string(entry)
+        except ImportError as e:
+            raise ImproperlyConfigured(f"Не удалось импортировать middleware {entry}: {e}") from e
+    if not callable(entry):
+        raise ImproperlyConfigured(f"Некорректный элемент MIDDLEWARES: {entry!r}")
+    if isinstance(entry, type) and issubclass(entry, BaseHTTPMiddleware):
+        logger.warning(f"{entry.__qualname__} основан на BaseHTTPMiddleware, лучше переписать его на чистом ASGI")
+    return Middleware(entry, **kwargs)
+
+
+def get_middlewares(entries: list) -> list[Middleware]:
+    return [get_middleware(entry) for entry in entries]
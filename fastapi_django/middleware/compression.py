@@ -0,0 +1,178 @@
+"""
+Сжатие ответов br, zstd и gzip.
+"""
+import zlib
+
+from starlette.datastructures import Headers, MutableHeaders
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from fastapi_django.utils.http import get_preferred_encoding
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# типы содержимого, которые уже сжаты или которые нельзя буферизовать
+EXCLUDED_CONTENT_TYPES = (
+    "image/",
+    "video/",
+    "audio/",
+    "font/woff",
+    "application/zip",
+    "application/gzip",
+    "application/x-gzip",
+    "application/zstd",
+    "application/octet-stream",
+    "text/event-stream",
+)
+
+
+class GzipCompressor:
+    def __init__(self, level: int):
+        self._compressobj = zlib.compressobj(level, zlib.DEFLATED, zlib.MAX_WBITS | 16)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush()
+
+
+class BrotliCompressor:
+    def __init__(self, quality: int):
+        self._compressor = brotli.Compressor(quality=quality)
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressor.process(data) + self._compressor.flush()
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressor.process(data) + self._compressor.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level: int):
+        self._compressobj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data: bytes) -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self, data: bytes = b"") -> bytes:
+        return self._compressobj.compress(data) + self._compressobj.flush()
+
+
+class CompressionMiddleware:
+    """
+    Сжимает ответы кодировкой, которую предпочитает клиент (Accept-Encoding): br (если установлен brotli), zstd (если
+    установлен zstandard) или gzip.  При одинаковом предпочтении выбирается первая из encodings
+
+    Ответы меньше minimum_size байт, уже сжатые ответы (с Content-Encoding), частичные ответы (206 или с
+    Content-Range) и ответы с типом содержимого из excluded_content_types не сжимаются.  Потоковые ответы
+    (StreamingResponse) сжимаются по частям: каждая часть отправляется клиенту сразу, без ожидания окончания ответа
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = 500,
+        gzip_level: int = 6,
+        brotli_quality: int = 4,
+        zstd_level: int = 3,
+        encodings: tuple[str, ...] = ("br", "zstd", "gzip"),
+        excluded_content_types: tuple[str, ...] = EXCLUDED_CONTENT_TYPES,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.excluded_content_types = tuple(excluded_content_types)
+        self.compressors = {
+            "br": (lambda: BrotliCompressor(brotli_quality)) if brotli is not None else None,
+            "zstd": (lambda: ZstdCompressor(zstd_level)) if zstandard is not None else None,
+            "gzip": lambda: GzipCompressor(gzip_level),
+        }
+        self.encodings = [encoding for encoding in encodings if self.compressors.get(encoding) is not None]
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        if not (encoding := get_preferred_encoding(accept_encoding, self.encodings)):
+            await self.app(scope, receive, send)
+            return
+        responder = CompressionResponder(self, encoding, send)
+        await self.app(scope, receive, responder.send)
+
+
+class CompressionResponder:
+    def __init__(self, middleware: CompressionMiddleware, encoding: str, send: Send):
+        self.middleware = middleware
+        self.encoding = encoding
+        self._send = send
+        self.start_message: Message | None = None
+        self.compressor = None
+        self.passthrough = False
+
+    async def send(self, message: Message) -> None:
+        if self.passthrough:
+            await self._send(message)
+        elif message["type"] == "http.response.start":
+            # заголовки отправляются вместе с первой частью тела, когда станет понятно, сжимать ли ответ
+            self.start_message = message
+            headers = Headers(raw=message["headers"])
+            content_type = headers.get("content-type", "")
+            if (
+                "content-encoding" in headers
+                # Content-Range описывает несжатые байты, сжатие испортит частичный ответ
+                or "content-range" in headers
+                or message["status"] in (204, 206, 304)
+                or content_type.startswith(self.middleware.excluded_content_types)
+            ):
+                await self._pass()
+        elif message["type"] != "http.response.body":
+            # напр., http.response.pathsend; после начала сжатия заголовки уже отправлены
+            if self.compressor is not None:
+                await self._send(message)
+            else:
+                await self._pass(message)
+        elif self.compressor is not None:
+            body = message.get("body", b"")
+            if message.get("more_body", False):
+                if body:
+                    await self._send({**message, "body": self.compressor.compress(body)})
+            else:
+                await self._send({**message, "body": self.compressor.finish(body)})
+        else:
+            await self._start(message)
+
+    async def _pass(self, message: Message | None = None) -> None:
+        self.passthrough = True
+        await self._send(self.start_message)
+        if message is not None:
+            await self._send(message)
+
+    async def _start(self, message: Message) -> None:
+        body = message.get("body", b"")
+        more_body = message.get("more_body", False)
+        if not more_body and len(body) < self.middleware.minimum_size:
+            await self._pass(message)
+            return
+        self.compressor = self.middleware.compressors[self.encoding]()
+        headers = MutableHeaders(raw=list(self.start_message["headers"]))
+        headers["Content-Encoding"] = self.encoding
+        headers.add_vary_header("Accept-Encoding")
+        # сжатое тело отличается байт в байт, поэтому ETag становится слабым
+        if (etag := headers.get("etag")) and not etag.startswith("W/"):
+            headers["ETag"] = f"W/{etag}"
+        if more_body:
+            del headers["Content-Length"]
+            body = self.compressor.compress(body) if body else b""
+        else:
+            body = self.compressor.finish(body)
+            headers["Content-Length"] = str(len(body))
+        await self._send({**self.start_message, "headers": headers.raw})
+        await self._send({**message, "body": body})
@@ -0,0 +1,45 @@
+import os
+import re
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from fastapi_django.logging import logging_context
+
+REQUEST_ID_REGEX = re.compile(r"^[\w\-.:]{1,200}$")
+
+
+class RequestIdMiddleware:
+    """
+    Идентификатор запроса: берется из заголовка header_name (если он корректный) или генерируется.  Доступен
+    в request.state.request_id и в контексте логирования (request_id), возвращается в заголовке ответа
+    """
+
+    def __init__(self, app: ASGIApp, header_name: str = "X-Request-ID", trust_header: bool = True):
+        self.app = app
+        self.header_key = header_name.lower().encode("latin-1")
+        self.trust_header = trust_header
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        request_id = None
+        if self.trust_header:
+            for key, value in scope["headers"]:
+                if key == self.header_key:
+                    value = value.decode("latin-1")
+                    if REQUEST_ID_REGEX.match(value):
+                        request_id = value
+                    break
+        if request_id is None:
+            request_id = os.urandom(16).hex()
+        scope.setdefault("state", {})["request_id"] = request_id
+
+        async def send_with_request_id(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                # заголовок добавляется в список без разбора остальных заголовков (MutableHeaders)
+                message["headers"] = [*message.get("headers", ()), (self.header_key, request_id.encode("latin-1"))]
+            await send(message)
+
+        with logging_context(request_id=request_id):
+            await self.app(scope, receive, send_with_request_id)
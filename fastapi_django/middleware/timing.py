@@ -0,0 +1,37 @@
+import logging
+import time
+
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+logger = logging.getLogger(__name__)
+
+
+class TimingMiddleware:
+    """
+    Время обработки запроса до отправки заголовков ответа: в заголовке Server-Timing (app;dur=мс).  Запросы,
+    обработка которых (вместе с отправкой тела ответа) заняла больше slow_threshold секунд, логируются
+    """
+
+    def __init__(self, app: ASGIApp, server_timing: bool = True, slow_threshold: int | float | None = None):
+        self.app = app
+        self.server_timing = server_timing
+        self.slow_threshold = slow_threshold
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        started_at = time.perf_counter()
+
+        async def send_with_timing(message: Message) -> None:
+            if message["type"] == "http.response.start" and self.server_timing:
+                duration = (time.perf_counter() - started_at) * 1000
+                message["headers"] = [*message.get("headers", ()), (b"server-timing", b"app;dur=%.1f" % duration)]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            duration = time.perf_counter() - started_at
+            if self.slow_threshold is not None and duration > self.slow_threshold:
+                logger.warning(f"Медленный запрос {scope['method']} {scope['path']}: {duration * 1000:.1f} мс")
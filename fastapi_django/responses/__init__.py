@@ -0,0 +1,36 @@
+"""
+Быстрая сериализация ответов в JSON.
+"""
+from typing import Any
+
+from pydantic_core import to_json, to_jsonable_python
+from starlette.responses import JSONResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONResponse(JSONResponse):
+    """
+    JSONResponse, который сериализует содержимое через orjson (если установлен) или pydantic-core, а не json.dumps().
+    Типы, которые orjson не поддерживает (модели pydantic, Decimal и т.д.), сериализуются как в pydantic
+
+    Класс ответа по умолчанию задается настройкой API_DEFAULT_RESPONSE_CLASS.  Ускоряется только последний шаг -
+    преобразование в байты: данные, которые вернул обработчик, FastAPI по-прежнему сначала проверяет и сериализует
+    по response_model (или jsonable_encoder, если response_model не задана).  Пропустить и этот шаг можно, только
+    вернув из обработчика готовый Response, напр., ListService.list_response()
+    """
+
+    def render(self, content: Any) -> bytes:
+        if orjson is not None:
+            return orjson.dumps(content, default=to_jsonable_python, option=orjson.OPT_NON_STR_KEYS)
+        return to_json(content)
+
+
+class RawJSONResponse(JSONResponse):
+    """Ответ с уже сериализованным в JSON содержимым (bytes), напр., из TypeAdapter.dump_json()"""
+
+    def render(self, content: bytes) -> bytes:
+        return content
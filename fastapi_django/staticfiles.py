@@ -0,0 +1,133 @@
+"""
+Раздача статических файлов с хэшем содержимого в имени и предварительно сжатыми вариантами.
+"""
+import gzip
+import hashlib
+import os
+import re
+import stat
+from mimetypes import guess_type
+from pathlib import Path
+
+import anyio.to_thread
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.staticfiles import StaticFiles
+from starlette.types import Scope
+
+from fastapi_django.utils.http import get_accepted_encodings
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+HASHED_NAME_REGEX = re.compile(r"^(?P<name>.+)\.(?P<hash>[0-9a-f]{12})(?P<ext>\.[^./]+)$")
+# кодировка: расширение сжатого варианта файла
+COMPRESSED_SUFFIXES = {"br": ".br", "gzip": ".gz"}
+COMPRESSIBLE_EXTENSIONS = {".js", ".css", ".html", ".svg", ".json", ".map", ".txt", ".xml"}
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+
+class CompressedStaticFiles(StaticFiles):
+    """
+    StaticFiles, который:
+
+    - отдает файл по имени с хэшем содержимого (swagger-ui.css -> swagger-ui.1a2b3c4d5e6f.css, см. hashed_name()) с заголовком
+      Cache-Control: immutable.  Файлы по обычному имени отдаются с Cache-Control: no-cache
+    - отдает сжатый вариант файла (file.js.br, file.js.gz), если клиент его поддерживает.  Сжатые варианты создаются
+      командой compressstatic
+
+    ETag, If-None-Match и Range поддерживаются FileResponse
+    """
+
+    def __init__(self, *args, **kw):
+        super().__init__(*args, **kw)
+        self._hashes: dict[str, str] = {}
+
+    def file_hash(self, path: str) -> str | None:
+        if (file_hash := self._hashes.get(path)) is None:
+            full_path, stat_result = self.lookup_path(path)
+            if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+                return None
+            with open(full_path, "rb") as f:
+                file_hash = self._hashes[path] = hashlib.file_digest(f, "md5").hexdigest()[:12]
+        return file_hash
+
+    def compute_hashes(self) -> None:
+        """Вычисляет хэши всех файлов заранее (см. warmup.hash_static_files), чтобы не читать файлы при запросах"""
+        compressed_suffixes = tuple(COMPRESSED_SUFFIXES.values())
+        for directory in self.all_directories:
+            for root, _, files in os.walk(directory):
+                for fname in files:
+                    if not fname.endswith(compressed_suffixes):
+                        self.file_hash(Path(os.path.relpath(os.path.join(root, fname), directory)).as_posix())
+
+    def hashed_name(self, path: str) -> str:
+        """Имя файла с хэшем содержимого.  Если файла нет, то возвращает path"""
+        if (file_hash := self.file_hash(path)) is None:
+            return path
+        name, ext = os.path.splitext(path)
+        return f"{name}.{file_hash}{ext}"
+
+    async def ahashed_name(self, path: str) -> str:
+        """hashed_name() для асинхронного кода: если хэш еще не вычислен, то файл читается в отдельном потоке"""
+        if (file_hash := self._hashes.get(path)) is None:
+            return await anyio.to_thread.run_sync(self.hashed_name, path)
+        name, ext = os.path.splitext(path)
+        return f"{name}.{file_hash}{ext}"
+
+    async def get_response(self, path: str, scope: Scope) -> Response:
+        immutable = False
+        if (match := HASHED_NAME_REGEX.match(path)) is not None:
+            name = match["name"] + match["ext"]
+            if (file_hash := self._hashes.get(name)) is None:
+                file_hash = await anyio.to_thread.run_sync(self.file_hash, name)
+            if file_hash == match["hash"]:
+                path, immutable = name, True
+        if scope["method"] not in ("GET", "HEAD"):
+            return await super().get_response(path, scope)
+        full_path, stat_result = await anyio.to_thread.run_sync(self.lookup_path, path)
+        if stat_result is None or not stat.S_ISREG(stat_result.st_mode):
+            # директории, 404 и т.д.
+            return await super().get_response(path, scope)
+
+        response = None
+        accept_encoding = Headers(scope=scope).get("accept-encoding", "")
+        for encoding in get_accepted_encodings(accept_encoding, list(COMPRESSED_SUFFIXES)):
+            compressed_path, compressed_stat = await anyio.to_thread.run_sync(
+                self.lookup_path, path + COMPRESSED_SUFFIXES[encoding]
+            )
+            # сжатый вариант, созданный до изменения файла, не используется
+            if compressed_stat is None or compressed_stat.st_mtime < stat_result.st_mtime:
+                continue
+            response = self.file_response(compressed_path, compressed_stat, scope)
+            if response.status_code != 304:
+                media_type = guess_type(path)[0] or "application/octet-stream"
+                if media_type.startswith("text/"):
+                    media_type += f"; charset={response.charset}"
+                response.headers["Content-Type"] = media_type
+                response.headers["Content-Encoding"] = encoding
+            break
+        if response is None:
+            response = self.file_response(full_path, stat_result, scope)
+        response.headers["Cache-Control"] = IMMUTABLE_CACHE_CONTROL if immutable else "no-cache"
+        response.headers["Vary"] = "Accept-Encoding"
+        return response
+
+
+def compress_file(path: Path) -> list[Path]:
+    """Создает сжатые варианты файла (.gz и, если установлен brotli, .br).  Возвращает созданные файлы"""
+    content = path.read_bytes()
+    created = []
+    variants = {".gz": lambda: gzip.compress(content, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants[".br"] = lambda: brotli.compress(content, quality=11)
+    for suffix, compress in variants.items():
+        compressed = compress()
+        # сжатие не всегда уменьшает размер (напр., уже сжатые файлы)
+        if len(compressed) < len(content):
+            compressed_path = path.with_name(path.name + suffix)
+            compressed_path.write_bytes(compressed)
+            created.append(compressed_path)
+    return created
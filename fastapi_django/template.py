@@ -1,33 +1,259 @@
-from jinja2 import Environment, Template, FileSystemLoader
+import os
+from typing import Any, AsyncIterator
+
+from jinja2 import BytecodeCache, Environment, FileSystemBytecodeCache, FileSystemLoader, Template, nodes
+from jinja2.ext import Extension
+from starlette.background import BackgroundTask
+from starlette.requests import Request
+from starlette.responses import StreamingResponse
 from starlette.templating import Jinja2Templates
 
+from fastapi_django.cache import caches
+from fastapi_django.cache.backends.base import DEFAULT_TIMEOUT
 from fastapi_django.conf import settings
+from fastapi_django.exceptions import ImproperlyConfigured
+
+_missing = object()
+
+
+class MemoryBytecodeCache(BytecodeCache):
+    """Байткод скомпилированных шаблонов в памяти процесса"""
+
+    def __init__(self):
+        self._cache: dict[str, bytes] = {}
+
+    def load_bytecode(self, bucket) -> None:
+        if (code := self._cache.get(bucket.key)) is not None:
+            bucket.bytecode_from_string(code)
+
+    def dump_bytecode(self, bucket) -> None:
+        self._cache[bucket.key] = bucket.bytecode_to_string()
+
+    def clear(self) -> None:
+        self._cache.clear()
+
+
+class AsyncBytecodeCache(BytecodeCache):
+    """
+    Кэш байткода для асинхронного окружения поверх общего кэша.  Jinja не учитывает enable_async в ключе кэша,
+    а байткод синхронных и асинхронных шаблонов отличается, поэтому ключи разделяются префиксом
+    """
+
+    def __init__(self, bytecode_cache: BytecodeCache):
+        self.bytecode_cache = bytecode_cache
+
+    def get_cache_key(self, name: str, filename: str | None = None) -> str:
+        return "async-" + super().get_cache_key(name, filename)
+
+    def load_bytecode(self, bucket) -> None:
+        self.bytecode_cache.load_bytecode(bucket)
+
+    def dump_bytecode(self, bucket) -> None:
+        self.bytecode_cache.dump_bytecode(bucket)
+
+    def clear(self) -> None:
+        self.bytecode_cache.clear()
+
+
+def get_bytecode_cache(bytecode_cache: BytecodeCache | str | None) -> BytecodeCache | None:
+    """
+    Кэш байткода шаблонов по опции TEMPLATES_ENV_OPTIONS["bytecode_cache"]:
+
+    - "filesystem" - в файлах в директории TEMPLATES_BYTECODE_CACHE_DIRECTORY (по умолчанию - во временной
+      директории).  Кэш переживает перезапуск и общий для воркеров, а заполнить его можно командой compiletemplates
+    - "memory" - в памяти процесса
+    - объект jinja2.BytecodeCache
+    """
+    if bytecode_cache is None or isinstance(bytecode_cache, BytecodeCache):
+        return bytecode_cache
+    if bytecode_cache == "filesystem":
+        directory = settings.TEMPLATES_BYTECODE_CACHE_DIRECTORY
+        if directory is None:
+            return FileSystemBytecodeCache()
+        return FileSystemBytecodeCache(directory)
+    if bytecode_cache == "memory":
+        return MemoryBytecodeCache()
+    raise ImproperlyConfigured(f"Неизвестный кэш байткода шаблонов: {bytecode_cache}")
+
+
+def get_fragment_cache():
+    return caches[settings.TEMPLATES_FRAGMENT_CACHE_ALIAS]
+
+
+def get_template_mtime(filename: str | None) -> int:
+    try:
+        return int(os.path.getmtime(filename)) if filename else 0
+    except OSError:
+        return 0
+
+
+def make_cache_key(key: Any) -> str:
+    if isinstance(key, (list, tuple)):
+        return ":".join(str(part) for part in key)
+    return str(key)
+
+
+class FragmentCacheExtension(Extension):
+    """
+    Кэширует отрендеренный фрагмент шаблона:
+
+        {% cache "footer" %}...{% endcache %}
+        {% cache ("product", product.id), 600 %}...{% endcache %}
+
+    Первый аргумент - ключ (строка или кортеж), второй - время жизни, сек. (по умолчанию - TIMEOUT кэша).  Кэш задается
+    настройкой TEMPLATES_FRAGMENT_CACHE_ALIAS.  В ключ входят имя шаблона, время его изменения и номер строки, поэтому
+    при изменении шаблона кэш не используется.  Сбросить все фрагменты можно, увеличив TEMPLATES_FRAGMENT_CACHE_VERSION
+    """
+
+    tags = {"cache"}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        if parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(("name:endcache",), drop_needle=True)
+        prefix = f"{parser.name}:{get_template_mtime(parser.filename)}:{lineno}"
+        call = self.call_method("_cache_support", [nodes.Const(prefix), *args])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _cache_support(self, prefix, key, timeout=DEFAULT_TIMEOUT, *, caller):
+        cache = get_fragment_cache()
+        cache_key = f"template.fragment:{prefix}:{make_cache_key(key)}"
+        if self.environment.is_async:
+            return self._async_cache_support(cache, cache_key, timeout, caller)
+        version = settings.TEMPLATES_FRAGMENT_CACHE_VERSION
+        value = cache.get(cache_key, _missing, version=version)
+        if value is _missing:
+            value = caller()
+            cache.set(cache_key, value, timeout, version=version)
+        return value
+
+    async def _async_cache_support(self, cache, cache_key, timeout, caller):
+        # кэш может читать файлы (FileBasedCache), поэтому обращаемся к нему через aget()/aset(), чтобы не блокировать
+        # цикл событий
+        version = settings.TEMPLATES_FRAGMENT_CACHE_VERSION
+        value = await cache.aget(cache_key, _missing, version=version)
+        if value is _missing:
+            value = await caller()
+            await cache.aset(cache_key, value, timeout, version=version)
+        return value
+
+
+def get_env_options() -> dict[str, Any]:
+    env_options = dict(settings.TEMPLATES_ENV_OPTIONS)
+    env_options.setdefault("loader", FileSystemLoader(settings.TEMPLATES_DIRECTORY))
+    env_options.setdefault("autoescape", True)
+    env_options["extensions"] = [*env_options.get("extensions", ()), FragmentCacheExtension]
+    env_options["bytecode_cache"] = get_bytecode_cache(env_options.get("bytecode_cache"))
+    return env_options
 
 
 def get_templates() -> Jinja2Templates:
     kw = {}
     if context_processors := getattr(settings, "TEMPLATES_CONTEXT_PROCESSORS", None):
         kw["context_processors"] = context_processors
-    env_options = settings.TEMPLATES_ENV_OPTIONS
-    loader = FileSystemLoader(settings.TEMPLATES_DIRECTORY)
-    env_options.setdefault("loader", loader)
-    env_options.setdefault("autoescape", True)
-    env = Environment(**env_options)
+    env = Environment(**get_env_options())
     kw["env"] = env
     return Jinja2Templates(**kw)
 
 
 templates = get_templates()
+_async_env: Environment | None = None
 
 
-def render_to_string(template_name: str, context: dict | None = None) -> str:
+def get_async_env() -> Environment:
+    """
+    Окружение для асинхронного рендеринга (enable_async=True).  Загрузчик и кэш байткода общие с templates.env,
+    а отдельное окружение нужно, т.к. render() в асинхронном окружении нельзя вызывать внутри цикла событий
+    """
+    global _async_env
+    if _async_env is None:
+        env = templates.env
+        bytecode_cache = AsyncBytecodeCache(env.bytecode_cache) if env.bytecode_cache is not None else None
+        # cache_size передается, чтобы у окружения был свой кэш шаблонов, а не копия синхронного
+        _async_env = env.overlay(
+            enable_async=True,
+            bytecode_cache=bytecode_cache,
+            cache_size=settings.TEMPLATES_ENV_OPTIONS.get("cache_size", 400),
+        )
+    return _async_env
+
+
+def get_render_cache_key(template: Template, cache_key: Any) -> str:
+    return f"template:{template.name}:{get_template_mtime(template.filename)}:{make_cache_key(cache_key)}"
+
+
+def render_to_string(
+    template_name: str, context: dict | None = None, cache_key: Any = None, timeout: Any = DEFAULT_TIMEOUT
+) -> str:
+    """
+    Если передан cache_key, то результат кэшируется на timeout секунд (см. FragmentCacheExtension).  cache_key должен
+    однозначно определять контекст, напр., ("product", product.id, product.updated_at)
+    """
     template = templates.get_template(template_name)
     context = context or {}
-    return template.render(**context)
+    if cache_key is None:
+        return template.render(**context)
+    return get_fragment_cache().get_or_set(
+        get_render_cache_key(template, cache_key),
+        lambda: template.render(**context),
+        timeout,
+        version=settings.TEMPLATES_FRAGMENT_CACHE_VERSION,
+    )
+
+
+async def render_to_string_async(
+    template_name: str, context: dict | None = None, cache_key: Any = None, timeout: Any = DEFAULT_TIMEOUT
+) -> str:
+    """
+    Асинхронный render_to_string.  В контексте можно передавать асинхронные функции (шаблон дождется результата их
+    вызова: {{ get_title() }}) и асинхронные итераторы
+    """
+    template = get_async_env().get_template(template_name)
+    context = context or {}
+    if cache_key is None:
+        return await template.render_async(**context)
+    cache = get_fragment_cache()
+    key = get_render_cache_key(template, cache_key)
+    version = settings.TEMPLATES_FRAGMENT_CACHE_VERSION
+    value = await cache.aget(key, _missing, version=version)
+    if value is _missing:
+        value = await template.render_async(**context)
+        await cache.aset(key, value, timeout, version=version)
+    return value
 
 
 def get_template(template_name: str) -> Template:
     return templates.get_template(template_name)
 
 
+class StreamingTemplateResponse(StreamingResponse):
+    """
+    Ответ, который отдает шаблон клиенту по частям по мере рендеринга (Template.generate_async).  Подходит для
+    больших страниц: клиент начинает получать ответ раньше, а рендеринг не держит цикл событий до конца
+    """
+
+    def __init__(
+        self,
+        request: Request,
+        name: str,
+        context: dict | None = None,
+        status_code: int = 200,
+        headers: dict[str, str] | None = None,
+        media_type: str | None = "text/html",
+        background: BackgroundTask | None = None,
+    ):
+        context = {"request": request, **(context or {})}
+        for context_processor in templates.context_processors:
+            context.update(context_processor(request))
+        self.template = get_async_env().get_template(name)
+        self.context = context
+        super().__init__(self._render(), status_code, headers, media_type, background)
+
+    async def _render(self) -> AsyncIterator[str]:
+        async for chunk in self.template.generate_async(**self.context):
+            yield chunk
+
+
 TemplateResponse = templates.TemplateResponse
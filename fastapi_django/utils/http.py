@@ -0,0 +1,36 @@
+def parse_accept_encoding(header: str) -> dict[str, float]:
+    """
+    Разбирает заголовок Accept-Encoding: {кодировка: q}.  q=0 означает, что клиент явно запретил кодировку
+    """
+    encodings = {}
+    for item in header.split(","):
+        encoding, _, params = item.partition(";")
+        if not (encoding := encoding.strip().lower()):
+            continue
+        q = 1.0
+        for param in params.split(";"):
+            name, _, value = param.partition("=")
+            if name.strip() == "q":
+                try:
+                    q = float(value)
+                except ValueError:
+                    q = 0.0
+        encodings[encoding] = q
+    return encodings
+
+
+def get_accepted_encodings(header: str, available: list[str]) -> list[str]:
+    """
+    Кодировки из available, которые поддерживает клиент, в порядке его предпочтения.  При одинаковом q раньше
+    идет та, что раньше в available
+    """
+    encodings = parse_accept_encoding(header)
+    wildcard = encodings.get("*", 0.0)
+    accepted = [encoding for encoding in available if encodings.get(encoding, wildcard) > 0]
+    return sorted(accepted, key=lambda encoding: encodings.get(encoding, wildcard), reverse=True)
+
+
+def get_preferred_encoding(header: str, available: list[str]) -> str | None:
+    """Кодировка из available, которую предпочитает клиент"""
+    accepted = get_accepted_encodings(header, available)
+    return accepted[0] if accepted else None
@@ -0,0 +1,130 @@
+"""
+Прогрев приложения при запуске: то, что иначе выполнялось бы лениво при первых запросах.
+"""
+import asyncio
+import inspect
+import logging
+import time
+from contextlib import AsyncExitStack
+from typing import Any
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+from fastapi_django.conf import settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.utils.module_loading import import_string
+
+logger = logging.getLogger(__name__)
+
+
+class WarmUp:
+    """
+    Выполняет шаги прогрева из WARMUP_STEPS параллельно и запоминает время выполнения каждого шага
+
+    Шаг - функция, которая принимает приложение.  Асинхронные шаги выполняются в цикле событий, синхронные - в
+    отдельных потоках.  Если шаг завершился с ошибкой, то остальные шаги отменяются, а приложение не запускается
+    """
+
+    def __init__(self, steps: list[str]):
+        self.steps = {}
+        for path in steps:
+            try:
+                self.steps[path] = import_string(path)
+            except ImportError as e:
+                raise ImproperlyConfigured(f"Не удалось импортировать шаг прогрева {path}: {e}") from e
+        self.timings: dict[str, float] = {}
+        self.duration: float | None = None
+        self.ready = False
+
+    async def run(self, app: FastAPI) -> None:
+        started_at = time.perf_counter()
+        async with asyncio.TaskGroup() as tg:
+            for path, step in self.steps.items():
+                tg.create_task(self._run_step(app, path, step))
+        self.duration = time.perf_counter() - started_at
+        self.ready = True
+        logger.info(f"Прогрев приложения завершен за {self.duration * 1000:.1f} мс")
+
+    async def _run_step(self, app: FastAPI, path: str, step) -> None:
+        started_at = time.perf_counter()
+        if inspect.iscoroutinefunction(step):
+            await step(app)
+        else:
+            await asyncio.to_thread(step, app)
+        self.timings[path] = time.perf_counter() - started_at
+        logger.info(f"Шаг прогрева {path} выполнен за {self.timings[path] * 1000:.1f} мс")
+
+    def stats(self) -> dict[str, Any]:
+        return {"ready": self.ready, "duration": self.duration, "steps": self.timings}
+
+
+def setup_email_providers(app: FastAPI) -> None:
+    """Проверяет EMAIL_PROVIDERS и создает бэкенды, чтобы ошибки в настройках обнаруживались при запуске"""
+    from fastapi_django.mail.providers import providers
+
+    providers.setup()
+
+
+def configure_mappers(app: FastAPI) -> None:
+    """Настраивает мапперы моделей SQLAlchemy (связи, наследование), иначе это делается при первом запросе к БД"""
+    from sqlalchemy.orm import configure_mappers
+
+    configure_mappers()
+
+
+async def connect_database(app: FastAPI) -> None:
+    """Открывает соединения пула, чтобы первые запросы не тратили время на подключение к БД"""
+    if not settings.DATABASE:
+        return
+    from fastapi_django.db import engine
+
+    size = engine.pool.size() if hasattr(engine.pool, "size") else 1
+    # соединения удерживаются одновременно, иначе пул будет отдавать одно и то же соединение
+    async with AsyncExitStack() as stack:
+        await asyncio.gather(*(stack.enter_async_context(engine.connect()) for _ in range(size)))
+
+
+def build_openapi(app: FastAPI) -> None:
+    """
+    Строит и сериализует схему OpenAPI (и JSON-схемы моделей pydantic), которую иначе строит первый запрос
+    к документации
+    """
+    from fastapi_django.docs.openapi import get_openapi_document
+
+    get_openapi_document(app)
+
+
+def hash_static_files(app: FastAPI) -> None:
+    """
+    Вычисляет хэши содержимого файлов, подключенных через CompressedStaticFiles (в т.ч. статики документации), иначе
+    файлы читаются при первых запросах
+    """
+    from starlette.routing import Mount
+
+    from fastapi_django.staticfiles import CompressedStaticFiles
+
+    for route in app.routes:
+        if isinstance(route, Mount) and isinstance(route.app, CompressedStaticFiles):
+            route.app.compute_hashes()
+
+
+def compile_templates(app: FastAPI) -> None:
+    """Компилирует шаблоны из TEMPLATES_DIRECTORY (или загружает их байткод из кэша)"""
+    from jinja2 import TemplateError
+
+    from fastapi_django.template import templates
+
+    for name in templates.env.list_templates():
+        try:
+            templates.env.get_template(name)
+        except TemplateError as e:
+            logger.warning(f"Не удалось скомпилировать шаблон {name}: {e}")
+
+
+async def readiness(request: Request) -> JSONResponse:
+    """Готовность приложения: 200, если прогрев завершен, иначе 503"""
+    warmup = getattr(request.app.state, "warmup", None)
+    if warmup is None or not warmup.ready:
+        return JSONResponse({"ready": False}, status_code=503)
+    return JSONResponse(warmup.stats())
@@ -0,0 +1,17 @@
+import os
+
+import pytest
+
+os.environ.setdefault("FASTAPI_DJANGO_SETTINGS_MODULE", "tests.settings")
+
+from fastapi_django.mail.backends.smtp import close_pools  # noqa: E402
+from tests.smtp_server import SMTPServer  # noqa: E402
+
+
+@pytest.fixture
+async def smtp_server():
+    server = SMTPServer()
+    await server.start()
+    yield server
+    await close_pools()
+    await server.stop()
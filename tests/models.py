@@ -0,0 +1,50 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+from sqlalchemy import ForeignKey, Numeric, Text
+from sqlalchemy.orm import Mapped, mapped_column, relationship
+
+from fastapi_django.db.models.base import Model
+
+
+class PublicationStatus(Model):
+    __tablename__ = "statuses"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    code: Mapped[str]
+    name: Mapped[str]
+
+
+class Section(Model):
+    __tablename__ = "sections"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str] = mapped_column(index=True)
+    body: Mapped[str] = mapped_column(Text, default="")
+    status_id: Mapped[int] = mapped_column(ForeignKey("statuses.id"))
+    status: Mapped[PublicationStatus] = relationship()
+    subsections: Mapped[list["Subsection"]] = relationship(back_populates="section")
+
+
+class Subsection(Model):
+    __tablename__ = "subsections"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    name: Mapped[str]
+    section_id: Mapped[int] = mapped_column(ForeignKey("sections.id"))
+    section: Mapped[Section] = relationship(back_populates="subsections")
+    status_id: Mapped[int] = mapped_column(ForeignKey("statuses.id"))
+    status: Mapped[PublicationStatus] = relationship()
+
+
+class Event(Model):
+    __tablename__ = "events"
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    uid: Mapped[uuid.UUID]
+    name: Mapped[str]
+    is_public: Mapped[bool]
+    starts_at: Mapped[datetime.datetime]
+    price: Mapped[Decimal] = mapped_column(Numeric(10, 2))
+    rating: Mapped[float]
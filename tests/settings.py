@@ -0,0 +1,8 @@
+# настройки для тестов.  БД не нужна: запросы в тестах только компилируются
+DATABASE = {}
+
+API_TITLE = "Tests"
+API_SUMMARY = None
+API_DESCRIPTION = ""
+API_VERSION = "0.1.0"
+API_DOCS_ENABLED = False
@@ -0,0 +1,82 @@
+"""
+Минимальный SMTP-сервер для тестов почтовых бэкендов.  Письма не отправляются, а сохраняются в messages
+"""
+import asyncio
+from dataclasses import dataclass, field
+
+
+@dataclass
+class ReceivedMessage:
+    from_email: str
+    recipients: list[str]
+    data: bytes
+
+
+@dataclass
+class SMTPServer:
+    host: str = "127.0.0.1"
+    port: int = 0
+    messages: list[ReceivedMessage] = field(default_factory=list)
+    # получатели, которым сервер отказывает (550)
+    refused: set[str] = field(default_factory=set)
+    # после стольких писем в одном соединении сервер закрывает соединение, не отвечая на DATA
+    disconnect_after: int | None = None
+    connections: int = 0
+
+    async def start(self) -> None:
+        self._server = await asyncio.start_server(self._handle, self.host, self.port)
+        self.port = self._server.sockets[0].getsockname()[1]
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        received = 0
+        from_email, recipients = None, []
+
+        async def reply(line: str) -> None:
+            writer.write(line.encode() + b"\r\n")
+            await writer.drain()
+
+        try:
+            await reply("220 localhost ESMTP")
+            while line := await reader.readline():
+                command, _, arg = line.decode().rstrip("\r\n").partition(" ")
+                command = command.upper()
+                if command in ("EHLO", "HELO"):
+                    await reply("250 localhost")
+                elif command == "MAIL":
+                    from_email, recipients = arg.partition(":")[2].strip("<> "), []
+                    await reply("250 OK")
+                elif command == "RCPT":
+                    recipient = arg.partition(":")[2].strip("<> ")
+                    if recipient in self.refused:
+                        await reply("550 No such user")
+                    else:
+                        recipients.append(recipient)
+                        await reply("250 OK")
+                elif command == "DATA":
+                    await reply("354 End data with <CR><LF>.<CR><LF>")
+                    data = bytearray()
+                    while (chunk := await reader.readline()) != b".\r\n":
+                        if not chunk:
+                            return
+                        data += chunk[1:] if chunk.startswith(b".") else chunk
+                    if self.disconnect_after is not None and received >= self.disconnect_after:
+                        return
+                    received += 1
+                    self.messages.append(ReceivedMessage(from_email, recipients, bytes(data)))
+                    await reply("250 OK")
+                elif command in ("RSET", "NOOP"):
+                    await reply("250 OK")
+                elif command == "QUIT":
+                    await reply("221 Bye")
+                    return
+                else:
+                    await reply("502 Command not implemented")
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
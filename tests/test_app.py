@@ -0,0 +1,41 @@
+from contextlib import asynccontextmanager
+
+import pytest
+
+from fastapi_django.app import get_default_app
+from fastapi_django.conf import override_settings
+
+
+@pytest.mark.filterwarnings("ignore:\\s*on_event is deprecated:DeprecationWarning")
+@override_settings(WARMUP_STEPS=[], WARMUP_READINESS_URL=None)
+async def test_lifespan_runs_event_handlers_and_app_lifespan():
+    calls = []
+
+    @asynccontextmanager
+    async def lifespan(app):
+        calls.append("lifespan startup")
+        yield {"client": "client"}
+        calls.append("lifespan shutdown")
+
+    app = get_default_app(lifespan=lifespan)
+
+    @app.on_event("startup")
+    async def startup():
+        calls.append("startup")
+
+    @app.on_event("shutdown")
+    def shutdown():
+        calls.append("shutdown")
+
+    async with app.router.lifespan_context(app) as state:
+        assert state == {"client": "client"}
+        assert app.state.warmup is not None
+        calls.append("running")
+    assert calls == ["startup", "lifespan startup", "running", "lifespan shutdown", "shutdown"]
+
+
+@override_settings(WARMUP_STEPS=[], WARMUP_READINESS_URL=None)
+async def test_lifespan_without_app_lifespan():
+    app = get_default_app()
+    async with app.router.lifespan_context(app) as state:
+        assert state is None
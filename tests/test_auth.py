@@ -0,0 +1,102 @@
+import base64
+import time
+
+import pytest
+from fastapi.requests import Request
+from fastapi.security import HTTPBasicCredentials
+
+from fastapi_django.auth import BasicAuthentication
+from fastapi_django.exceptions.http import HTTP401Exception
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+class CountingAuthentication(BasicAuthentication):
+    def __init__(self, passwords: dict[str, str], **kwargs):
+        super().__init__(**kwargs)
+        self.passwords = passwords
+        self.calls = []
+
+    async def _authenticate(self, credentials: HTTPBasicCredentials | None):
+        self.calls.append(credentials.username)
+        if self.passwords.get(credentials.username) == credentials.password:
+            return {"username": credentials.username}
+        return None
+
+
+def make_request(username: str, password: str) -> Request:
+    token = base64.b64encode(f"{username}:{password}".encode())
+    return Request({"type": "http", "headers": [(b"authorization", b"Basic " + token)]})
+
+
+async def test_cache_hit(clock):
+    auth = CountingAuthentication({"user": "secret"}, cache_timeout=60)
+    first = await auth(make_request("user", "secret"))
+    assert await auth(make_request("user", "secret")) is first
+    assert auth.calls == ["user"]
+    # после истечения cache_timeout креды проверяются заново
+    clock.now += 61
+    assert await auth(make_request("user", "secret")) == {"username": "user"}
+    assert auth.calls == ["user", "user"]
+
+
+async def test_cache_depends_on_password(clock):
+    auth = CountingAuthentication({"user": "secret"}, cache_timeout=60)
+    await auth(make_request("user", "secret"))
+    with pytest.raises(HTTP401Exception):
+        await auth(make_request("user", "wrong"))
+    assert auth.calls == ["user", "user"]
+
+
+async def test_negative_cache(clock):
+    auth = CountingAuthentication({"user": "secret"}, cache_timeout=60, negative_cache_timeout=5, auto_error=False)
+    assert await auth(make_request("user", "wrong")) is None
+    assert await auth(make_request("user", "wrong")) is None
+    assert auth.calls == ["user"]
+    clock.now += 6
+    assert await auth(make_request("user", "wrong")) is None
+    assert auth.calls == ["user", "user"]
+
+
+async def test_invalidate_user(clock):
+    auth = CountingAuthentication({"user": "secret", "other": "secret"}, cache_timeout=60)
+    await auth(make_request("user", "secret"))
+    await auth(make_request("other", "secret"))
+    # напр., пароль пользователя изменен
+    auth.passwords["user"] = "changed"
+    auth.invalidate("user")
+    with pytest.raises(HTTP401Exception):
+        await auth(make_request("user", "secret"))
+    await auth(make_request("other", "secret"))
+    assert auth.calls == ["user", "other", "user"]
+
+
+async def test_invalidate_all(clock):
+    auth = CountingAuthentication({"user": "secret", "other": "secret"}, cache_timeout=60)
+    await auth(make_request("user", "secret"))
+    await auth(make_request("other", "secret"))
+    auth.invalidate()
+    await auth(make_request("user", "secret"))
+    await auth(make_request("other", "secret"))
+    assert auth.calls == ["user", "other", "user", "other"]
+
+
+async def test_without_cache():
+    auth = CountingAuthentication({"user": "secret"})
+    await auth(make_request("user", "secret"))
+    await auth(make_request("user", "secret"))
+    auth.invalidate("user")
+    assert auth.calls == ["user", "user"]
@@ -0,0 +1,201 @@
+import asyncio
+import time
+
+import httpx
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import rsa
+from fastapi.requests import Request
+from jwt.algorithms import RSAAlgorithm
+
+from fastapi_django.app import get_default_app
+from fastapi_django.auth.jwt import JWKSCache, JWTAuthentication, get_kid
+from fastapi_django.exceptions.http import HTTP401Exception
+
+JWKS_URL = "https://auth.example.com/jwks"
+
+
+class SigningKey:
+    def __init__(self, kid: str):
+        self.kid = kid
+        self.private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+
+    @property
+    def jwk(self) -> dict:
+        return {**RSAAlgorithm.to_jwk(self.private_key.public_key(), as_dict=True), "kid": self.kid, "use": "sig"}
+
+    def sign(self, **claims) -> str:
+        payload = {"sub": "user", "aud": "api", "exp": int(time.time()) + 60, **claims}
+        return jwt.encode(payload, self.private_key, algorithm="RS256", headers={"kid": self.kid})
+
+
+@pytest.fixture(scope="module")
+def key_a():
+    return SigningKey("a")
+
+
+@pytest.fixture(scope="module")
+def key_b():
+    return SigningKey("b")
+
+
+class JWKSServer:
+    def __init__(self):
+        self.keys = []
+        self.requests = 0
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        assert str(request.url) == JWKS_URL
+        # ответ не сразу, чтобы одновременные обновления ожидали блокировку
+        await asyncio.sleep(0)
+        self.requests += 1
+        return httpx.Response(200, json={"keys": [key.jwk for key in self.keys]})
+
+
+@pytest.fixture
+def jwks_server(monkeypatch):
+    server = JWKSServer()
+    client_cls = httpx.AsyncClient
+    monkeypatch.setattr(
+        httpx, "AsyncClient", lambda **kwargs: client_cls(transport=httpx.MockTransport(server.handle), **kwargs)
+    )
+    return server
+
+
+def make_request(token: str) -> Request:
+    return Request({"type": "http", "headers": [(b"authorization", f"Bearer {token}".encode())]})
+
+
+async def test_static_jwks(key_a, key_b):
+    auth = JWTAuthentication(jwks={"keys": [key_a.jwk]}, audience="api")
+    token = key_a.sign()
+    request = make_request(token)
+    user = await auth(request)
+    assert user["sub"] == "user"
+    assert request.scope["user"] is user
+    # токен, подписанный неизвестным ключом
+    assert await auth.verify(key_b.sign()) is None
+    # токен подписан ключом b, но в заголовке указан kid ключа a
+    forged = jwt.encode({"sub": "user", "aud": "api"}, key_b.private_key, algorithm="RS256", headers={"kid": "a"})
+    assert await auth.verify(forged) is None
+
+
+async def test_invalid_tokens(key_a):
+    auth = JWTAuthentication(jwks={"keys": [key_a.jwk]}, audience="api")
+    assert await auth.verify(key_a.sign(exp=int(time.time()) - 10)) is None
+    assert await auth.verify(key_a.sign(aud="other")) is None
+    assert await auth.verify("garbage") is None
+    with pytest.raises(HTTP401Exception):
+        await auth(make_request("garbage"))
+    auth.auto_error = False
+    assert await auth(make_request("garbage")) is None
+
+
+def test_get_kid(key_a):
+    assert get_kid(key_a.sign()) == "a"
+    assert get_kid(jwt.encode({}, "secret" * 6, algorithm="HS256")) is None
+    assert get_kid("garbage") is False
+    # заголовок - не объект
+    assert get_kid("WzFd.e30.") is False
+    # kid - не строка
+    assert get_kid("eyJraWQiOjF9.e30.") is False
+
+
+async def test_cached_token(key_a):
+    auth = JWTAuthentication(jwks={"keys": [key_a.jwk]}, audience="api")
+    token = key_a.sign()
+    payload = await auth.verify(token)
+    # повторная проверка берет полезную нагрузку из кэша
+    assert await auth.verify(token) is payload
+    # токены без exp не кэшируются
+    token = jwt.encode({"sub": "user", "aud": "api"}, key_a.private_key, algorithm="RS256", headers={"kid": "a"})
+    assert await auth.verify(token) is not await auth.verify(token)
+
+
+async def test_jwks_url(jwks_server, key_a):
+    jwks_server.keys = [key_a]
+    auth = JWTAuthentication(JWKS_URL, audience="api")
+    try:
+        assert (await auth.verify(key_a.sign()))["sub"] == "user"
+        assert jwks_server.requests >= 1
+    finally:
+        await auth.jwks.close()
+
+
+async def test_key_rotation(jwks_server, key_a, key_b):
+    jwks_server.keys = [key_a]
+    auth = JWTAuthentication(JWKS_URL, audience="api")
+    auth.jwks.min_refresh_interval = 0
+    try:
+        token_a = key_a.sign()
+        assert await auth.verify(token_a) is not None
+        # ключ a заменен ключом b: токен с неизвестным kid приводит к внеочередному обновлению JWKS
+        jwks_server.keys = [key_b]
+        requests = jwks_server.requests
+        assert await auth.verify(key_b.sign()) is not None
+        assert jwks_server.requests == requests + 1
+        assert set(auth.jwks.keys) == {"b"}
+        # закэшированный токен, подписанный удаленным ключом, больше не принимается
+        assert await auth.verify(token_a) is None
+    finally:
+        await auth.jwks.close()
+
+
+async def test_min_refresh_interval(jwks_server, key_a, key_b):
+    jwks_server.keys = [key_a]
+    jwks = JWKSCache(JWKS_URL, min_refresh_interval=30)
+    try:
+        assert await jwks.get_key("a") is not None
+        requests = jwks_server.requests
+        # неизвестный kid не приводит к обновлению чаще, чем раз в min_refresh_interval
+        assert await jwks.get_key("b") is None
+        assert await jwks.get_key("b") is None
+        assert jwks_server.requests == requests
+    finally:
+        await jwks.close()
+
+
+async def test_refresh_error_keeps_keys(jwks_server, key_a):
+    jwks_server.keys = [key_a]
+    jwks = JWKSCache(JWKS_URL, min_refresh_interval=0)
+    try:
+        assert await jwks.get_key("a") is not None
+        jwks_server.handle = lambda request: httpx.Response(500)
+        assert await jwks.get_key("unknown") is None
+        assert await jwks.get_key("a") is not None
+    finally:
+        await jwks.close()
+
+
+def test_jwks_source_required(key_a):
+    with pytest.raises(ValueError):
+        JWKSCache()
+    with pytest.raises(ValueError):
+        JWKSCache(JWKS_URL, jwks={"keys": [key_a.jwk]})
+
+
+def test_jwks_in_several_loops(jwks_server, key_a):
+    # кэш уровня модуля используется в разных циклах событий, напр., в тестах
+    jwks_server.keys = [key_a]
+    jwks = JWKSCache(JWKS_URL, min_refresh_interval=0)
+
+    async def get_keys():
+        # одновременные обновления ожидают одну блокировку
+        keys = await asyncio.gather(jwks.get_key("a"), jwks.get_key("unknown"), jwks.get_key("unknown"))
+        await jwks.close()
+        return keys
+
+    for _ in range(2):
+        assert [key and key.key_id for key in asyncio.run(get_keys())] == ["a", None, None]
+
+
+async def test_lifespan_closes_jwks_caches(jwks_server, key_a):
+    jwks_server.keys = [key_a]
+    auth = JWTAuthentication(JWKS_URL, audience="api")
+    app = get_default_app()
+    async with app.router.lifespan_context(app):
+        assert await auth.verify(key_a.sign()) is not None
+        task = auth.jwks._task
+        assert not task.done()
+    assert task.cancelled()
+    assert auth.jwks._task is None
@@ -0,0 +1,140 @@
+import re
+
+import pytest
+from sqlalchemy.dialects import postgresql
+
+from fastapi_django.db.repositories.builder import InvalidDeferFieldError, InvalidOnlyFieldError, QueryBuilder
+from fastapi_django.db.repositories.queryset import QuerySet
+from tests.models import Section
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+def sections_sql(queryset: QuerySet) -> str:
+    return compile_sql(queryset._query_builder.build_select_stmt())
+
+
+def build(builder: QueryBuilder) -> QueryBuilder:
+    builder.filter(name="a", subsections__status__code="published", status__code__in=["published"])
+    builder.join("subsections__section__status", isouter=True)
+    builder.order_by("-subsections__name", "id")
+    builder.options("subsections__status")
+    return builder
+
+
+def test_same_query_gives_byte_identical_sql():
+    first = compile_sql(build(QueryBuilder(Section)).build_select_stmt())
+    second = compile_sql(build(QueryBuilder(Section)).build_select_stmt())
+    assert first == second
+
+
+def test_join_aliases_are_named_by_relationship_path():
+    sql = compile_sql(build(QueryBuilder(Section)).build_select_stmt())
+    assert set(re.findall(r"\bAS (t_\w+)", sql)) == {
+        "t_status",
+        "t_subsections",
+        "t_subsections__status",
+        "t_subsections__section",
+        "t_subsections__section__status",
+    }
+    # анонимных алиасов вида subsections_1 нет
+    assert not re.search(r"\b(sections|subsections|statuses)_\d+\b", sql)
+
+
+def test_limited_query_with_options_gives_byte_identical_sql():
+    first = build(QueryBuilder(Section))
+    first.limit(10)
+    second = build(QueryBuilder(Section))
+    second.limit(10)
+    assert compile_sql(first.build_select_stmt()) == compile_sql(second.build_select_stmt())
+
+
+def test_clone_gives_byte_identical_sql():
+    builder = build(QueryBuilder(Section))
+    assert compile_sql(builder.clone().build_select_stmt()) == compile_sql(builder.build_select_stmt())
+
+
+def test_repeated_build_gives_byte_identical_sql():
+    builder = build(QueryBuilder(Section))
+    assert compile_sql(builder.build_select_stmt()) == compile_sql(builder.build_select_stmt())
+
+
+def test_queryset_clones_give_byte_identical_sql():
+    base = QuerySet(Section, None).filter(subsections__name="a").options("subsections")
+    first = base.filter(status__code="published").order_by("subsections__status__code")
+    second = base.filter(status__code="draft").order_by("subsections__status__code")
+    assert sections_sql(first) == sections_sql(second)
+
+
+def test_queryset_clones_do_not_share_joins():
+    base = QuerySet(Section, None).filter(subsections__name="a")
+    expected = sections_sql(base)
+    base.filter(subsections__status__code="published")
+    base.innerjoin("subsections__section")
+    assert sections_sql(base) == expected
+
+
+def select_list(sql: str) -> str:
+    # столбцы первого (внешнего) SELECT
+    return sql.partition("\nFROM")[0]
+
+
+def test_only():
+    sql = sections_sql(QuerySet(Section, None).only("name"))
+    # первичный ключ выбирается всегда
+    assert select_list(sql) == "SELECT sections.id, sections.name "
+
+
+def test_repeated_only_replaces_fields():
+    sql = sections_sql(QuerySet(Section, None).only("name").only("body"))
+    assert select_list(sql) == "SELECT sections.id, sections.body "
+
+
+def test_defer():
+    sql = sections_sql(QuerySet(Section, None).defer("name", "body"))
+    assert select_list(sql) == "SELECT sections.id, sections.status_id "
+
+
+def test_only_and_defer_of_related_fields():
+    queryset = QuerySet(Section, None).options("subsections").only("name", "subsections__name")
+    sql = sections_sql(queryset.defer("subsections__section_id"))
+    assert "t_subsections.name" in select_list(sql)
+    assert "t_subsections.section_id" not in select_list(sql)
+    assert "sections.body" not in select_list(sql)
+    queryset = QuerySet(Section, None).options("subsections")
+    sql = sections_sql(queryset.defer("subsections__name", "subsections__status_id"))
+    assert "t_subsections.name" not in select_list(sql)
+    assert "t_subsections.status_id" not in select_list(sql)
+
+
+def test_invalid_only_and_defer_fields():
+    with pytest.raises(InvalidOnlyFieldError):
+        QuerySet(Section, None).only("unknown")
+    with pytest.raises(InvalidOnlyFieldError):
+        QuerySet(Section, None).only("status")
+    with pytest.raises(InvalidDeferFieldError):
+        QuerySet(Section, None).defer("subsections__unknown")
+
+
+def test_sliced_query_with_options_and_only_keeps_ordering_columns():
+    sql = sections_sql(QuerySet(Section, None).options("subsections").only("id").order_by("name")[0:10])
+    subquery, _, outer = sql.partition(") AS t ")
+    # столбец сортировки выбирается в DISTINCT-подзапросе, а внешний запрос сортируется по столбцу подзапроса
+    assert "SELECT DISTINCT sections.id AS id, sections.name AS name, sections.status_id AS status_id" in subquery
+    assert "ORDER BY sections.name ASC" in subquery
+    assert "sections.body" not in subquery
+    assert outer.endswith("ORDER BY t.name ASC")
+    assert not re.search(r"\bsections\.", outer)
+    # загружается только поле из only()
+    assert "t.name" not in select_list(sql)
+
+
+def test_sliced_query_with_options_and_defer_keeps_ordering_columns():
+    sql = sections_sql(QuerySet(Section, None).options("subsections").defer("name", "body").order_by("-name")[0:10])
+    subquery, _, outer = sql.partition(") AS t ")
+    assert "sections.name AS name" in subquery
+    assert "sections.body" not in subquery
+    assert outer.endswith("ORDER BY t.name DESC")
+    assert not re.search(r"\bsections\.", outer)
@@ -0,0 +1,75 @@
+import os
+import pickle
+import stat
+import threading
+
+import pytest
+from jinja2 import DictLoader, Environment
+
+from fastapi_django.cache import caches
+from fastapi_django.cache.backends.filebased import FileBasedCache
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.template import FragmentCacheExtension
+
+
+def test_filebased_requires_location():
+    with pytest.raises(ImproperlyConfigured):
+        FileBasedCache(None)
+
+
+def test_filebased_creates_private_directory(tmp_path):
+    cache = FileBasedCache(str(tmp_path / "cache"))
+    assert stat.S_IMODE(os.stat(cache.directory).st_mode) & 0o077 == 0
+
+
+def test_filebased_rejects_shared_directory(tmp_path):
+    directory = tmp_path / "cache"
+    directory.mkdir()
+    directory.chmod(0o777)
+    with pytest.raises(ImproperlyConfigured):
+        FileBasedCache(str(directory))
+
+
+def test_filebased_get_set(tmp_path):
+    cache = FileBasedCache(str(tmp_path))
+    cache.set("key", {"a": [1, "б"]})
+    assert cache.get("key") == {"a": [1, "б"]}
+    cache.set("expired", "value", timeout=-1)
+    assert cache.get("expired", "default") == "default"
+    assert cache.delete("key")
+    assert cache.get("key") is None
+
+
+def test_filebased_ignores_pickle(tmp_path):
+    # подложенный pickle не загружается, а считается отсутствующим значением
+    cache = FileBasedCache(str(tmp_path))
+    fname = cache._key_to_file("key")
+    with open(fname, "wb") as f:
+        pickle.dump((None, "value"), f)
+    assert cache.get("key", "default") == "default"
+    assert not os.path.exists(fname)
+
+
+async def test_fragment_cache_does_not_block_event_loop(tmp_path, monkeypatch):
+    threads = []
+    get = FileBasedCache.get
+
+    def record_thread(self, *args, **kwargs):
+        threads.append(threading.current_thread())
+        return get(self, *args, **kwargs)
+
+    monkeypatch.setattr(FileBasedCache, "get", record_thread)
+    env = Environment(
+        loader=DictLoader({"page.html": "{% cache 'key' %}{{ value }}{% endcache %}"}),
+        extensions=[FragmentCacheExtension],
+        enable_async=True,
+    )
+    backend = "fastapi_django.cache.backends.filebased.FileBasedCache"
+    with override_settings(CACHES={"default": {"BACKEND": backend, "LOCATION": str(tmp_path)}}):
+        template = env.get_template("page.html")
+        assert await template.render_async(value="first") == "first"
+        assert await template.render_async(value="second") == "first"
+        assert isinstance(caches["default"], FileBasedCache)
+    assert len(threads) == 2
+    assert threading.main_thread() not in threads
@@ -0,0 +1,162 @@
+import gzip
+
+import brotli
+import httpx
+import pytest
+import zstandard
+from fastapi import FastAPI
+from starlette.responses import FileResponse, PlainTextResponse, Response, StreamingResponse
+
+from fastapi_django.middleware.compression import CompressionMiddleware
+
+BODY = "fastapi-django " * 100
+
+
+def get_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/text")
+    async def text():
+        return PlainTextResponse(BODY, headers={"ETag": '"abc"'})
+
+    @app.get("/small")
+    async def small():
+        return PlainTextResponse("ok")
+
+    @app.get("/image")
+    async def image():
+        return Response(BODY.encode(), media_type="image/png")
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(BODY.encode()), headers={"Content-Encoding": "gzip"})
+
+    @app.get("/stream")
+    async def stream():
+        async def chunks():
+            for _ in range(3):
+                yield BODY
+
+        return StreamingResponse(chunks(), media_type="text/plain")
+
+    @app.get("/file")
+    async def file():
+        return FileResponse(app.state.file_path, media_type="text/plain")
+
+    app.add_middleware(CompressionMiddleware)
+    return app
+
+
+@pytest.fixture
+async def client(tmp_path):
+    app = get_app()
+    app.state.file_path = tmp_path / "data.txt"
+    app.state.file_path.write_text(BODY)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        yield client
+
+
+async def get_raw(client: httpx.AsyncClient, url: str, **headers) -> tuple[httpx.Response, bytes]:
+    async with client.stream("GET", url, headers=headers) as response:
+        return response, b"".join([chunk async for chunk in response.aiter_raw()])
+
+
+@pytest.mark.parametrize(
+    "encoding, decompress",
+    [
+        ("gzip", gzip.decompress),
+        ("br", brotli.decompress),
+        ("zstd", lambda data: zstandard.ZstdDecompressor().decompressobj().decompress(data)),
+    ],
+)
+async def test_compress(client, encoding, decompress):
+    response, body = await get_raw(client, "/text", **{"Accept-Encoding": encoding})
+    assert response.headers["content-encoding"] == encoding
+    assert response.headers["content-length"] == str(len(body))
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert response.headers["etag"] == 'W/"abc"'
+    assert decompress(body) == BODY.encode()
+
+
+async def test_preferred_encoding(client):
+    response, _ = await get_raw(client, "/text", **{"Accept-Encoding": "gzip;q=1, br;q=0.5"})
+    assert response.headers["content-encoding"] == "gzip"
+    response, _ = await get_raw(client, "/text", **{"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+
+
+@pytest.mark.parametrize("url", ["/small", "/image"])
+async def test_not_compressed(client, url):
+    response, body = await get_raw(client, url, **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-length"] == str(len(body))
+
+
+async def test_no_accept_encoding(client):
+    response, body = await get_raw(client, "/text", **{"Accept-Encoding": "identity"})
+    assert "content-encoding" not in response.headers
+    assert body == BODY.encode()
+
+
+async def test_already_encoded(client):
+    response, body = await get_raw(client, "/encoded", **{"Accept-Encoding": "br"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY.encode()
+
+
+async def test_streaming(client):
+    response, body = await get_raw(client, "/stream", **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "content-length" not in response.headers
+    assert gzip.decompress(body) == BODY.encode() * 3
+
+
+async def test_file(client):
+    response, body = await get_raw(client, "/file", **{"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert gzip.decompress(body) == BODY.encode()
+
+
+async def test_range_not_compressed(client):
+    response, body = await get_raw(client, "/file", **{"Accept-Encoding": "gzip", "Range": "bytes=0-999"})
+    assert response.status_code == 206
+    assert "content-encoding" not in response.headers
+    assert response.headers["content-range"] == f"bytes 0-999/{len(BODY)}"
+    assert body == BODY.encode()[:1000]
+
+
+async def test_content_range_not_compressed():
+    app = FastAPI()
+
+    @app.get("/")
+    async def view():
+        return PlainTextResponse(BODY, headers={"Content-Range": f"bytes 0-{len(BODY) - 1}/{len(BODY)}"})
+
+    app.add_middleware(CompressionMiddleware)
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        response, body = await get_raw(client, "/", **{"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in response.headers
+    assert body == BODY.encode()
+
+
+async def test_non_body_message_after_compression():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": BODY.encode(), "more_body": True})
+        await send({"type": "http.response.trailers", "headers": [], "more_trailers": False})
+        await send({"type": "http.response.body", "body": b""})
+
+    messages = []
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "headers": [(b"accept-encoding", b"gzip")]}
+    await CompressionMiddleware(app)(scope, None, send)
+    assert [message["type"] for message in messages] == [
+        "http.response.start",
+        "http.response.body",
+        "http.response.trailers",
+        "http.response.body",
+    ]
+    assert gzip.decompress(messages[1]["body"] + messages[3]["body"]) == BODY.encode()
@@ -0,0 +1,86 @@
+import asyncio
+
+import pytest
+
+from fastapi_django.conf import override_settings, settings
+from fastapi_django.exceptions import ImproperlyConfigured
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"MIDDLEWARES": ()},
+        {"MIDDLEWARES": ["path.to.Middleware", ("path.to.Middleware", {"option": 1}), object]},
+        {"WARMUP_STEPS": ("fastapi_django.warmup.build_openapi",)},
+        {"MANAGEMENT": ({"name": "command"},)},
+    ],
+)
+def test_sequence_settings_accept_tuples(options):
+    with override_settings(**options):
+        for setting, value in options.items():
+            assert getattr(settings, setting) == value
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"WARMUP_STEPS": "fastapi_django.warmup.build_openapi"},
+        {"MIDDLEWARES": "path.to.Middleware"},
+        {"EMAIL_QUEUE_DRAIN_TIMEOUT": "30"},
+        {"WARMUP_READINESS_URL": 1},
+    ],
+)
+def test_invalid_settings(options):
+    with pytest.raises(ImproperlyConfigured):
+        with override_settings(**options):
+            pass
+
+
+def test_settings_assignment_is_forbidden():
+    with pytest.raises(AttributeError):
+        settings.DEBUG = True
+    with pytest.raises(AttributeError):
+        del settings.CACHES
+    with pytest.raises(AttributeError):
+        settings._get_wrapped().DEBUG = True
+
+
+def test_container_settings_are_not_copied():
+    # заморожен только верхний уровень: значения-контейнеры общие для снимков, поэтому их подменяют целиком
+    caches = settings.CACHES
+    with override_settings(DEBUG=True):
+        assert settings.CACHES is caches
+    with override_settings(CACHES={"default": {"BACKEND": "fastapi_django.cache.backends.locmem.LocMemCache"}}):
+        assert settings.CACHES is not caches
+    assert settings.CACHES is caches
+
+
+def test_nested_override_settings():
+    with override_settings(API_TITLE="outer"):
+        with override_settings(API_TITLE="inner"):
+            assert settings.API_TITLE == "inner"
+        assert settings.API_TITLE == "outer"
+    assert settings.API_TITLE == "Tests"
+
+
+async def test_concurrent_calls_of_decorated_function():
+    first_entered = asyncio.Event()
+    second_exited = asyncio.Event()
+    decorator = override_settings(API_TITLE="overridden")
+
+    @decorator
+    async def decorated(first: bool):
+        # стек снимков создается при каждом вызове, а не хранится в общем экземпляре
+        assert decorator._previous == []
+        if first:
+            first_entered.set()
+            # второй вызов входит после первого, а выходит раньше
+            await second_exited.wait()
+        else:
+            await first_entered.wait()
+        assert settings.API_TITLE == "overridden"
+        if not first:
+            second_exited.set()
+
+    await asyncio.wait_for(asyncio.gather(decorated(True), decorated(False)), 5)
+    assert settings.API_TITLE == "Tests"
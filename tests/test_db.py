@@ -0,0 +1,74 @@
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from fastapi_django.db import get_asyncpg_options
+from fastapi_django.db.repositories.builder import QueryBuilder
+from fastapi_django.db.statistics import statement_cache_statistics, track_statement_cache
+from fastapi_django.exceptions import ImproperlyConfigured
+from tests.models import Section
+
+
+def compile_sql(stmt) -> str:
+    return str(stmt.compile(dialect=postgresql.asyncpg.dialect()))
+
+
+def test_asyncpg_options():
+    connect_args = get_asyncpg_options(
+        {"STATEMENT_CACHE_SIZE": 0, "PREPARED_STATEMENT_CACHE_SIZE": 500, "PREPARED_STATEMENTS": "named", "JIT": False}
+    )
+    assert connect_args == {
+        "statement_cache_size": 0,
+        "prepared_statement_cache_size": 500,
+        "server_settings": {"jit": "off"},
+    }
+
+
+def test_asyncpg_unique_prepared_statements():
+    name_func = get_asyncpg_options({"PREPARED_STATEMENTS": "unique"})["prepared_statement_name_func"]
+    assert name_func().startswith("__asyncpg_")
+    assert name_func() != name_func()
+
+
+def test_asyncpg_unnamed_prepared_statements_disable_cache():
+    connect_args = get_asyncpg_options({"PREPARED_STATEMENTS": "unnamed"})
+    assert connect_args["prepared_statement_name_func"]() == ""
+    assert connect_args["prepared_statement_cache_size"] == 0
+    assert get_asyncpg_options({"PREPARED_STATEMENTS": "unnamed", "PREPARED_STATEMENT_CACHE_SIZE": 0})
+
+
+@pytest.mark.parametrize(
+    "options",
+    [
+        {"PREPARED_STATEMENTS": "unnamed", "PREPARED_STATEMENT_CACHE_SIZE": 100},
+        {"PREPARED_STATEMENTS": "anonymous"},
+    ],
+)
+def test_asyncpg_invalid_options(options):
+    with pytest.raises(ImproperlyConfigured):
+        get_asyncpg_options(options)
+
+
+def test_sql_text_does_not_depend_on_values():
+    # одинаковый текст запроса - одна запись в кэше prepared statements
+    first = QueryBuilder(Section)
+    first.filter(name="a", status__code__in=["published"])
+    second = QueryBuilder(Section)
+    second.filter(name="b", status__code__in=["draft", "archived"])
+    assert compile_sql(first.build_select_stmt()) == compile_sql(second.build_select_stmt())
+
+
+def test_statement_cache_statistics():
+    engine = create_engine("sqlite://")
+    track_statement_cache(engine)
+    track_statement_cache(engine)
+    statement_cache_statistics.reset()
+    with engine.connect() as connection:
+        for _ in range(3):
+            connection.execute(select(1))
+    assert statement_cache_statistics.as_dict() == {
+        "compiled_cache_hits": 2,
+        "compiled_cache_misses": 1,
+        "prepared_statement_hits": 0,
+        "prepared_statement_misses": 0,
+    }
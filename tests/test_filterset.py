@@ -0,0 +1,71 @@
+from unittest import mock
+
+import pytest
+from pydantic import field_serializer
+from sqlalchemy.dialects import postgresql
+
+from fastapi_django.db.repositories.builder import InvalidFilterFieldError, resolve_filter_field
+from fastapi_django.db.repositories.queryset import QuerySet
+from fastapi_django.db.services.list import FilterSet
+from tests.models import Section, Subsection
+
+
+def compile_sql(queryset: QuerySet) -> tuple[str, dict]:
+    compiled = queryset._query_builder.build_select_stmt().compile(dialect=postgresql.asyncpg.dialect())
+    return str(compiled), compiled.params
+
+
+class SectionsFilterSet(FilterSet):
+    model_cls = Section
+
+    name: str | None = None
+    id__in: list[int] | None = None
+    subsections__status__code: str | None = None
+
+    @field_serializer("name")
+    def serialize_name(self, value: str) -> str:
+        return value.strip()
+
+
+def test_filter_plan_is_built_at_class_creation():
+    plan = SectionsFilterSet._filter_plans[Section]
+    assert [filter_field for filter_field, _ in plan] == ["name", "id__in", "subsections__status__code"]
+    assert plan[2][1] == resolve_filter_field(Section, "subsections__status__code")
+
+
+def test_invalid_filter_field_fails_at_class_creation():
+    with pytest.raises(InvalidFilterFieldError):
+        class InvalidFilterSet(FilterSet):
+            model_cls = Section
+
+            unknown__in: list[int] | None = None
+
+
+def test_filter_queryset_does_not_resolve_fields():
+    filterset = SectionsFilterSet(id__in=[1, 2], subsections__status__code="published")
+    with mock.patch("fastapi_django.db.repositories.builder.resolve_filter_field") as resolve:
+        filterset.filter_queryset(QuerySet(Section, None))
+    resolve.assert_not_called()
+
+
+def test_filter_queryset_matches_model_dump():
+    filterset = SectionsFilterSet(name="  a ", id__in=[1, 2], subsections__status__code=None)
+    queryset = QuerySet(Section, None)
+    expected = queryset.filter(**filterset.model_dump(exclude_unset=True, exclude_none=True))
+    sql, params = compile_sql(filterset.filter_queryset(queryset))
+    assert (sql, params) == compile_sql(expected)
+    # значение поля с field_serializer сериализовано
+    assert "a" in params.values()
+
+
+def test_serialized_fields():
+    assert SectionsFilterSet.serialized_fields == {"name"}
+
+
+def test_filter_plan_without_model_cls_is_built_on_first_use():
+    class NamesFilterSet(FilterSet):
+        name: str | None = None
+
+    NamesFilterSet(name="a").filter_queryset(QuerySet(Subsection, None))
+    assert list(NamesFilterSet._filter_plans) == [Subsection]
+    assert FilterSet._filter_plans == {}
@@ -0,0 +1,152 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+import pytest
+from pydantic import (
+    BaseModel,
+    ConfigDict,
+    Field,
+    TypeAdapter,
+    ValidationError,
+    field_serializer,
+    field_validator,
+    model_validator,
+)
+
+from fastapi_django.db.services.list import CompiledSerializer
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.responses import FastJSONResponse
+from tests.models import Event, Section
+
+ROWS = [
+    {
+        "id": 1,
+        "uid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+        "name": " Концерт ",
+        "is_public": True,
+        "starts_at": datetime.datetime(2026, 1, 2, 3, 4, 5, tzinfo=datetime.timezone.utc),
+        "price": Decimal("1500.50"),
+        "rating": 1e20,
+    },
+    {
+        "id": 2,
+        "uid": uuid.UUID("87654321-4321-8765-4321-876543218765"),
+        "name": "Выставка",
+        "is_public": False,
+        "starts_at": datetime.datetime(2026, 5, 6, 7, 8, 9, 123456),
+        "price": Decimal("0.10"),
+        "rating": 0.1,
+    },
+]
+
+
+def dump(schema: type[BaseModel], rows: list[dict], passthrough: bool) -> bytes:
+    rows = [{name: row[name] for name in CompiledSerializer(Event, schema).fields} for row in rows]
+    if passthrough:
+        return FastJSONResponse(rows).body
+    adapter = TypeAdapter(list[schema])
+    return adapter.dump_json(adapter.validate_python(rows), by_alias=True)
+
+
+class PlainSchema(BaseModel):
+    id: int
+    name: str
+    is_public: bool | None
+
+
+class NotNativeSchema(BaseModel):
+    id: int
+    uid: uuid.UUID
+    starts_at: datetime.datetime
+    price: Decimal
+    rating: float
+
+
+class FieldValidatorSchema(BaseModel):
+    id: int
+    name: str
+
+    @field_validator("name")
+    @classmethod
+    def strip_name(cls, value: str) -> str:
+        return value.strip()
+
+
+class ModelValidatorSchema(BaseModel):
+    id: int
+    name: str
+
+    @model_validator(mode="after")
+    def upper_name(self):
+        self.name = self.name.upper()
+        return self
+
+
+class ConstrainedSchema(BaseModel):
+    id: int = Field(gt=0)
+    name: str = Field(max_length=5)
+
+
+class StrippedSchema(BaseModel):
+    model_config = ConfigDict(str_strip_whitespace=True)
+
+    id: int
+    name: str
+
+
+class ExcludedSchema(BaseModel):
+    id: int
+    name: str = Field(exclude=True)
+
+
+class AliasSchema(BaseModel):
+    id: int
+    name: str = Field(serialization_alias="title")
+
+
+def test_passthrough_matches_pydantic():
+    assert CompiledSerializer(Event, PlainSchema).passthrough
+    assert dump(PlainSchema, ROWS, passthrough=True) == dump(PlainSchema, ROWS, passthrough=False)
+
+
+@pytest.mark.parametrize(
+    "schema",
+    [
+        NotNativeSchema,
+        FieldValidatorSchema,
+        ModelValidatorSchema,
+        StrippedSchema,
+        ExcludedSchema,
+        AliasSchema,
+    ],
+)
+def test_no_passthrough(schema):
+    # для этих схем прямая сериализация дала бы не тот же JSON, что pydantic
+    assert not CompiledSerializer(Event, schema).passthrough
+    assert dump(schema, ROWS, passthrough=True) != dump(schema, ROWS, passthrough=False)
+
+
+def test_no_passthrough_with_constraints():
+    # ограничения поля отклоняют строки, которые прямая сериализация пропустила бы
+    assert not CompiledSerializer(Event, ConstrainedSchema).passthrough
+    with pytest.raises(ValidationError):
+        dump(ConstrainedSchema, ROWS, passthrough=False)
+
+
+def test_not_compilable():
+    class SerializerSchema(BaseModel):
+        id: int
+
+        @field_serializer("id")
+        def serialize_id(self, value: int) -> str:
+            return str(value)
+
+    class RelationSchema(BaseModel):
+        id: int
+        status: dict
+
+    with pytest.raises(ImproperlyConfigured):
+        CompiledSerializer(Section, SerializerSchema)
+    with pytest.raises(ImproperlyConfigured):
+        CompiledSerializer(Section, RelationSchema)
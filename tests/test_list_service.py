@@ -0,0 +1,225 @@
+import datetime
+import logging
+from decimal import Decimal
+
+import pytest
+from pydantic import BaseModel, Field, TypeAdapter
+
+from fastapi_django.db.repositories.builder import InvalidOrderByFieldError, OrderBy
+from fastapi_django.db.repositories.queryset import QuerySet
+from fastapi_django.db.services.list import ListService, Ordering, get_schema_fields, get_unindexed_orderings
+from fastapi_django.exceptions.http import HTTP400Exception
+from fastapi_django.responses import FastJSONResponse, RawJSONResponse
+from tests.models import Event, Section
+from tests.test_builder import sections_sql, select_list
+
+
+class StatusSchema(BaseModel):
+    code: str
+
+
+class SubsectionSchema(BaseModel):
+    name: str
+    status: StatusSchema | None
+
+
+class SectionSchema(BaseModel):
+    id: int
+    title: str = Field(validation_alias="name")
+    status: StatusSchema
+    subsections: list[SubsectionSchema]
+    # нет в модели
+    url: str = ""
+
+
+def test_get_schema_fields():
+    assert get_schema_fields(Section, SectionSchema) == [
+        "id",
+        "name",
+        "status__code",
+        "subsections__name",
+        "subsections__status__code",
+    ]
+
+
+def test_schema_fields_with_sliced_ordered_query():
+    # так ListService применяет response_schema к запросу с options, сортировкой и пагинацией
+    queryset = QuerySet(Section, None).options("subsections", "subsections__status", "status")
+    queryset = queryset.only(*get_schema_fields(Section, SectionSchema)).order_by("-name", "id")[0:10]
+    sql = sections_sql(queryset)
+    subquery, _, outer = sql.partition(") AS t ")
+    assert "sections.body" not in sql
+    assert "SELECT DISTINCT sections.id AS id, sections.name AS name, sections.status_id AS status_id" in subquery
+    # загружаются только поля схемы
+    assert select_list(sql) == (
+        "SELECT t_status.id, t_status.code, t_subsections__status.id AS id_1, t_subsections__status.code AS code_1, "
+        "t_subsections.id AS id_2, t_subsections.name, t.id AS id_3, t.name AS name_1 "
+    )
+    assert outer.endswith("ORDER BY t.name DESC, t.id ASC")
+
+
+def order_by_sql(queryset: QuerySet) -> str:
+    return sections_sql(queryset).partition("ORDER BY ")[2]
+
+
+class SectionOrdering(Ordering):
+    model_cls = Section
+    allowed_orderings = {"name": "name", "status": "status__code", "title": OrderBy("name", nulls="last")}
+
+
+def test_allowed_orderings_are_parsed():
+    assert SectionOrdering.allowed_orderings == {
+        "name": OrderBy("name"),
+        "status": OrderBy("status__code"),
+        "title": OrderBy("name", nulls="last"),
+    }
+
+    class TupleOrdering(Ordering):
+        allowed_orderings = ("id", "-name")
+
+    assert TupleOrdering.allowed_orderings == {"id": OrderBy("id"), "-name": OrderBy("name", descending=True)}
+
+
+def test_invalid_allowed_orderings_fail_on_class_creation():
+    with pytest.raises(InvalidOrderByFieldError):
+
+        class InvalidOrdering(Ordering):
+            model_cls = Section
+            allowed_orderings = ("unknown",)
+
+
+def test_not_allowed_ordering():
+    ordering = SectionOrdering(ordering=["body"])
+    with pytest.raises(HTTP400Exception) as exc_info:
+        ordering.order_queryset(QuerySet(Section, None))
+    assert exc_info.value.status_code == 400
+    assert exc_info.value.detail == "Сортировка body не поддерживается"
+
+
+def test_order_queryset():
+    queryset = SectionOrdering(ordering=["-status", "title"]).order_queryset(QuerySet(Section, None))
+    # направление задает клиент, остальные параметры - allowed_orderings.  первичный ключ добавляется в конец
+    assert order_by_sql(queryset) == "t_status.code DESC, sections.name ASC NULLS LAST, sections.id ASC"
+    queryset = SectionOrdering(ordering=["-title"]).order_queryset(QuerySet(Section, None))
+    assert order_by_sql(queryset) == "sections.name DESC NULLS LAST, sections.id ASC"
+
+
+def test_order_queryset_without_allowed_orderings():
+    queryset = Ordering(ordering=["-body", "id"]).order_queryset(QuerySet(Section, None))
+    # первичный ключ уже есть в сортировке
+    assert order_by_sql(queryset) == "sections.body DESC, sections.id ASC"
+    assert order_by_sql(Ordering(ordering=[]).order_queryset(QuerySet(Section, None))) == "sections.id ASC"
+
+
+def test_order_queryset_without_pk():
+    class NoPKOrdering(Ordering):
+        append_pk = False
+
+    queryset = NoPKOrdering(ordering=["name"]).order_queryset(QuerySet(Section, None))
+    assert order_by_sql(queryset) == "sections.name ASC"
+
+
+def test_get_unindexed_orderings():
+    orderings = {
+        "id": OrderBy("id"),
+        "name": OrderBy("name"),
+        "body": OrderBy("body"),
+        "status": OrderBy("status__code"),
+    }
+    # индекс по name без первичного ключа не обеспечивает сортировку name, id
+    assert get_unindexed_orderings(Section, orderings) == ["name", "body", "status"]
+    assert get_unindexed_orderings(Section, orderings, append_pk=False) == ["body", "status"]
+
+
+def test_unindexed_orderings_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="fastapi_django.db.services.list"):
+
+        class BodyOrdering(Ordering):
+            model_cls = Section
+            allowed_orderings = ("id", "body")
+            append_pk = False
+
+    assert [record.getMessage() for record in caplog.records] == [
+        "Для сортировок body из BodyOrdering.allowed_orderings нет подходящего индекса в таблице sections"
+    ]
+
+
+class FakeResult:
+    def __init__(self, rows: list):
+        self.rows = rows
+
+    def unique(self):
+        return self
+
+    def tuples(self):
+        return self
+
+    def scalars(self):
+        return self
+
+    def all(self):
+        return self.rows
+
+
+class FakeSession:
+    # вместо БД возвращает заданные строки и запоминает выполненный запрос
+    def __init__(self, rows: list):
+        self.rows = rows
+        self.statements = []
+
+    async def execute(self, stmt):
+        self.statements.append(stmt)
+        return FakeResult(self.rows)
+
+
+class EventSchema(BaseModel):
+    id: int
+    name: str
+    is_public: bool
+
+
+class EventPriceSchema(BaseModel):
+    id: int
+    price: Decimal
+
+
+def get_events_service(schema: type[BaseModel], rows: list, compiled: bool = True) -> ListService:
+    session = FakeSession(rows)
+
+    class EventsListService(ListService):
+        response_schema = schema
+        compile_serializer = compiled
+
+        def get_queryset(self) -> QuerySet:
+            return QuerySet(Event, session)
+
+    service = EventsListService()
+    service.session = session
+    return service
+
+
+async def test_list_response_passthrough():
+    service = get_events_service(EventSchema, [(1, "Концерт", True), (2, "Выставка", False)])
+    response = await service.list_response()
+    # словари из БД сериализуются без проверки pydantic
+    assert type(response) is FastJSONResponse
+    assert response.body == TypeAdapter(list[EventSchema]).dump_json(
+        [EventSchema(id=1, name="Концерт", is_public=True), EventSchema(id=2, name="Выставка", is_public=False)]
+    )
+    [stmt] = service.session.statements
+    assert [column.name for column in stmt.selected_columns] == ["id", "name", "is_public"]
+
+
+async def test_list_response_compiled_without_passthrough():
+    service = get_events_service(EventPriceSchema, [(1, Decimal("1500.50"))])
+    response = await service.list_response()
+    assert type(response) is RawJSONResponse
+    assert response.body == b'[{"id":1,"price":"1500.50"}]'
+
+
+async def test_list_response_from_models():
+    event = Event(id=1, name="Концерт", is_public=True, price=Decimal("1.00"), starts_at=datetime.datetime(2026, 1, 2))
+    service = get_events_service(EventSchema, [event], compiled=False)
+    response = await service.list_response()
+    assert type(response) is RawJSONResponse
+    assert response.body == '[{"id":1,"name":"Концерт","is_public":true}]'.encode()
@@ -0,0 +1,202 @@
+import asyncio
+import time
+
+import pytest
+
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.mail import EmailMessage, iter_send_mass_mail
+from fastapi_django.mail.backends.base import BaseEmailBackend
+from fastapi_django.mail.utils import TokenBucket, get_rate_limiter
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def __call__(self):
+        return self.now
+
+    async def sleep(self, delay):
+        # время не идет: видно, сколько ждал бы каждый вызов
+        self.sleeps.append(delay)
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    monkeypatch.setattr(asyncio, "sleep", clock.sleep)
+    return clock
+
+
+class RecordingBackend(BaseEmailBackend):
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.sent = []
+
+    async def send_messages(self, email_messages):
+        for message in email_messages:
+            if message.to == ["fail@example.com"]:
+                raise OSError("refused")
+            self.sent.append(message)
+        return len(email_messages)
+
+
+class BlockingBackend(BaseEmailBackend):
+    # отправка не завершается, пока не будет установлено событие
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.release = asyncio.Event()
+
+    async def send_messages(self, email_messages):
+        await self.release.wait()
+        return len(email_messages)
+
+
+def datatuples(*recipients):
+    return [("subject", "body", "from@example.com", [recipient]) for recipient in recipients]
+
+
+async def test_token_bucket_burst_and_rate(clock):
+    bucket = TokenBucket(rate=2, capacity=3)
+    for _ in range(3):
+        await bucket.acquire()
+    assert clock.sleeps == []
+    # токены кончились: следующие письма ждут накопления токенов по очереди
+    await bucket.acquire()
+    await bucket.acquire()
+    assert clock.sleeps == [0.5, 1.0]
+    clock.now += 1
+    await bucket.acquire()
+    assert clock.sleeps == [0.5, 1.0, 0.5]
+    # за время простоя токены накапливаются, но не больше capacity
+    clock.now += 10
+    for _ in range(3):
+        await bucket.acquire()
+    assert clock.sleeps == [0.5, 1.0, 0.5]
+
+
+async def test_token_bucket_concurrent_acquire(clock):
+    bucket = TokenBucket(rate=10)
+    for _ in range(10):
+        await bucket.acquire()
+    # конкурирующие отправители резервируют токены сразу и ждут по очереди
+    await asyncio.gather(*(bucket.acquire() for _ in range(3)))
+    assert clock.sleeps == pytest.approx([0.1, 0.2, 0.3])
+
+
+def test_token_bucket_invalid_rate():
+    with pytest.raises(ValueError):
+        TokenBucket(rate=0)
+
+
+def test_get_rate_limiter():
+    with override_settings(
+        EMAIL_PROVIDERS={
+            "limited": {"BACKEND": "fastapi_django.mail.backends.locmem.EmailBackend", "OPTIONS": {"rate_limit": 5}},
+            "default": {"BACKEND": "fastapi_django.mail.backends.locmem.EmailBackend"},
+        }
+    ):
+        limiter = get_rate_limiter("limited")
+        assert (limiter.rate, limiter.capacity) == (5, 5)
+        assert get_rate_limiter("limited") is limiter
+        assert get_rate_limiter("default") is None
+        with pytest.raises(ImproperlyConfigured):
+            get_rate_limiter("unknown")
+
+
+async def test_iter_send_mass_mail():
+    connection = RecordingBackend()
+    results = [
+        result
+        async for result in iter_send_mass_mail(
+            datatuples("a@example.com", "fail@example.com", "b@example.com"), concurrency=2, connection=connection
+        )
+    ]
+    results.sort(key=lambda result: result.index)
+    assert [(result.index, result.sent) for result in results] == [(0, True), (1, False), (2, True)]
+    assert isinstance(results[1].error, OSError)
+    assert results[1].message.to == ["fail@example.com"]
+    assert sorted(message.to[0] for message in connection.sent) == ["a@example.com", "b@example.com"]
+
+
+async def test_iter_send_mass_mail_with_explicit_connection_does_not_need_provider():
+    # без default в EMAIL_PROVIDERS ограничитель скорости не ищется
+    with override_settings(EMAIL_PROVIDERS={}):
+        stream = iter_send_mass_mail(datatuples("a@example.com"), connection=RecordingBackend())
+        results = [result async for result in stream]
+    assert [result.sent for result in results] == [True]
+
+
+async def test_iter_send_mass_mail_build_message():
+    async def users():
+        for name in ("a", "b", "broken"):
+            yield name
+
+    async def build(name):
+        if name == "broken":
+            raise ValueError("broken")
+        return EmailMessage("subject", "body", "from@example.com", [f"{name}@example.com"])
+
+    connection = RecordingBackend()
+    results = {result.index: result async for result in iter_send_mass_mail(users(), build, connection=connection)}
+    assert [results[index].sent for index in range(3)] == [True, True, False]
+    # письмо не построено
+    assert results[2].message is None
+    assert isinstance(results[2].error, ValueError)
+
+
+async def test_iter_send_mass_mail_rate_limit(monkeypatch):
+    acquired = []
+
+    async def acquire(self):
+        acquired.append(self.rate)
+
+    monkeypatch.setattr(TokenBucket, "acquire", acquire)
+    with override_settings(
+        EMAIL_PROVIDERS={
+            "default": {"BACKEND": "fastapi_django.mail.backends.locmem.EmailBackend", "OPTIONS": {"rate_limit": 5}},
+        }
+    ):
+        results = [result async for result in iter_send_mass_mail(datatuples("a@example.com", "b@example.com"))]
+    assert [result.sent for result in results] == [True, True]
+    assert acquired == [5, 5]
+
+
+async def test_iter_send_mass_mail_items_error():
+    def items():
+        yield from datatuples("a@example.com")
+        raise RuntimeError("items")
+
+    with pytest.raises(RuntimeError):
+        async for _ in iter_send_mass_mail(items(), connection=RecordingBackend()):
+            pass
+
+
+async def test_iter_send_mass_mail_early_exit():
+    connection = RecordingBackend()
+    tasks = asyncio.all_tasks()
+    items = datatuples(*(f"{i}@example.com" for i in range(100)))
+    stream = iter_send_mass_mail(items, concurrency=2, connection=connection)
+    async for _ in stream:
+        break
+    await stream.aclose()
+    # производитель и работники завершены, хотя очереди заполнены
+    assert asyncio.all_tasks() == tasks
+
+
+async def test_iter_send_mass_mail_early_exit_while_sending():
+    connection = BlockingBackend()
+    tasks = asyncio.all_tasks()
+    items = datatuples(*(f"{i}@example.com" for i in range(100)))
+    stream = iter_send_mass_mail(items, concurrency=2, connection=connection)
+    with pytest.raises(asyncio.TimeoutError):
+        await asyncio.wait_for(anext(stream), 0.01)
+    assert asyncio.all_tasks() == tasks
+
+
+async def test_iter_send_mass_mail_invalid_concurrency():
+    with pytest.raises(ValueError):
+        await anext(iter_send_mass_mail([], concurrency=0, connection=RecordingBackend()))
@@ -0,0 +1,130 @@
+import random
+import time
+
+import pytest
+
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.mail import EmailMessage
+from fastapi_django.mail.backends.base import BaseEmailBackend
+from fastapi_django.mail.backends.failover import EmailBackend, ProviderState
+from fastapi_django.mail.providers import providers
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(time, "monotonic", clock)
+    return clock
+
+
+def failover_providers(weights, **options):
+    return {
+        **{name: {"BACKEND": "tests.test_mail_failover.RecordingBackend"} for name in weights},
+        "default": {
+            "BACKEND": "fastapi_django.mail.backends.failover.EmailBackend",
+            "OPTIONS": {"providers": weights, **options},
+        },
+    }
+
+
+class RecordingBackend(BaseEmailBackend):
+    """Запоминает отправленные письма, а письма на fail@<провайдер> не отправляет"""
+
+    sent: dict[str, list] = {}
+
+    async def send_messages(self, email_messages):
+        sent = [message for message in email_messages if message.to != [f"fail@{self.provider}"]]
+        self.sent.setdefault(self.provider, []).extend(sent)
+        return len(sent)
+
+
+def test_breaker_transitions(clock):
+    state = ProviderState("smtp", failure_threshold=2, recovery_timeout=30)
+    state.record_failure()
+    assert state.state == ProviderState.CLOSED
+    assert state.available()
+    state.record_failure()
+    assert state.state == ProviderState.OPEN
+    assert not state.available()
+
+    clock.now += 30
+    # пробная отправка: пока она идет, остальные отправки не пропускаются
+    assert state.available()
+    assert state.state == ProviderState.HALF_OPEN
+    state.start()
+    assert not state.available()
+    state.record_failure()
+    assert state.state == ProviderState.OPEN
+    assert not state.available()
+
+    clock.now += 30
+    assert state.available()
+    state.start()
+    state.record_success(0.1)
+    assert state.state == ProviderState.CLOSED
+    assert state.available()
+    assert state.stats()["errors"] == 3
+
+
+def test_breaker_hung_trial(clock):
+    state = ProviderState("smtp", failure_threshold=1, recovery_timeout=30)
+    state.record_failure()
+    clock.now += 30
+    assert state.available()
+    state.start()
+    clock.now += 29
+    assert not state.available()
+    # пробная отправка зависла - через recovery_timeout разрешается следующая
+    clock.now += 1
+    assert state.available()
+
+
+def test_weighted_selection():
+    random.seed(0)
+    with override_settings(EMAIL_PROVIDERS=failover_providers({"primary": 3, "reserve": 1})):
+        backend = EmailBackend()
+        first = [backend.get_providers()[0] for _ in range(10000)]
+    assert 0.72 < first.count("primary") / len(first) < 0.78
+
+
+def test_slow_provider_weight():
+    with override_settings(EMAIL_PROVIDERS=failover_providers({"primary": 3, "reserve": 1}, slow_threshold=2)):
+        backend = EmailBackend()
+        backend.states["primary"].record_success(4)
+        assert backend.get_weight("primary") == 3 / 4
+        assert backend.get_weight("reserve") == 1
+
+
+@pytest.mark.parametrize("weight", [0, -1, "1"])
+def test_invalid_weight(weight):
+    with override_settings(EMAIL_PROVIDERS=failover_providers({"primary": weight, "reserve": 1})):
+        with pytest.raises(ImproperlyConfigured):
+            EmailBackend()
+
+
+def test_invalid_slow_threshold():
+    with override_settings(EMAIL_PROVIDERS=failover_providers({"primary": 1}, slow_threshold=0)):
+        with pytest.raises(ImproperlyConfigured):
+            EmailBackend()
+
+
+async def test_failover_sends_only_failed_messages():
+    random.seed(0)
+    RecordingBackend.sent = {}
+    with override_settings(EMAIL_PROVIDERS=failover_providers({"primary": 1000000, "reserve": 1})):
+        messages = [
+            EmailMessage("subject", "body", "from@example.com", [to]) for to in ("a@example.com", "fail@primary")
+        ]
+        assert await providers.get_backend("default").send_messages(messages) == 2
+        backend = providers.get_backend("default")
+    assert RecordingBackend.sent == {"primary": [messages[0]], "reserve": [messages[1]]}
+    assert backend.states["primary"].stats()["errors"] == 1
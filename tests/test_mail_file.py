@@ -0,0 +1,81 @@
+import asyncio
+import io
+
+import pytest
+
+from fastapi_django.conf import override_settings
+from fastapi_django.mail import EmailMessage
+from fastapi_django.mail.backends.console import EmailBackend as ConsoleEmailBackend
+from fastapi_django.mail.backends.filebased import EmailBackend as FileEmailBackend
+
+
+def make_messages(count):
+    return [
+        EmailMessage(f"subject {i}", "body " * 100, "from@example.com", [f"to{i}@example.com"]) for i in range(count)
+    ]
+
+
+async def send_with_ticker(backend, messages) -> tuple[int, int]:
+    """Отправляет письма и считает, сколько раз за это время выполнился конкурирующий asyncio.sleep(0)"""
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0)
+
+    task = asyncio.create_task(ticker())
+    await asyncio.sleep(0)
+    started = ticks
+    try:
+        sent = await backend.send_messages(messages)
+    finally:
+        task.cancel()
+    return sent, ticks - started
+
+
+@pytest.fixture
+def file_providers(tmp_path):
+    def make(**options):
+        return {
+            "default": {
+                "BACKEND": "fastapi_django.mail.backends.filebased.EmailBackend",
+                "OPTIONS": {"file_path": str(tmp_path), **options},
+            }
+        }
+
+    return make
+
+
+async def test_console_does_not_block_event_loop():
+    stream = io.StringIO()
+    with override_settings(EMAIL_PROVIDERS={"default": {"BACKEND": "fastapi_django.mail.backends.console.EmailBackend"}}):
+        sent, ticks = await send_with_ticker(ConsoleEmailBackend(stream=stream), make_messages(2000))
+    assert sent == 2000
+    assert stream.getvalue().count("-" * 79) == 2000
+    # если бы письма записывались в цикле событий, то ticker не выполнился бы ни разу
+    assert ticks > 1
+
+
+async def test_file_does_not_block_event_loop(tmp_path, file_providers):
+    with override_settings(EMAIL_PROVIDERS=file_providers()):
+        sent, ticks = await send_with_ticker(FileEmailBackend(), make_messages(2000))
+    assert sent == 2000
+    [path] = tmp_path.iterdir()
+    assert path.read_bytes().count(b"-" * 79) == 2000
+    assert ticks > 1
+
+
+async def test_file_rotation(tmp_path, file_providers):
+    messages = make_messages(10)
+    # размер писем может отличаться на несколько байт (Date, Message-ID)
+    max_bytes = len(FileEmailBackend.format_message(None, messages[0])) * 3 + 50
+    with override_settings(EMAIL_PROVIDERS=file_providers(max_bytes=max_bytes)):
+        backend = FileEmailBackend()
+        for message in messages:
+            assert await backend.send_messages([message]) == 1
+    files = list(tmp_path.iterdir())
+    assert len(files) == 4
+    assert all(path.stat().st_size <= max_bytes for path in files)
+    assert sum(path.read_bytes().count(b"-" * 79) for path in files) == 10
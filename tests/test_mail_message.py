@@ -0,0 +1,96 @@
+from email import message_from_bytes
+
+import pytest
+
+from fastapi_django.conf import override_settings
+from fastapi_django.mail import EmailMessage, EmailMessageSkeleton
+from fastapi_django.mail.backends.smtp import EmailBackend
+from fastapi_django.mail.message import PreparedMessage
+from tests.test_mail_smtp import iter_chunks, smtp_providers
+
+CONTENT = bytes(range(256)) * 100
+
+
+def make_skeleton(**kwargs) -> EmailMessageSkeleton:
+    message = EmailMessage(
+        "Отчет", "Текст письма", "from@example.com", attachments=[("report.bin", CONTENT, None)], **kwargs
+    )
+    return EmailMessageSkeleton(message)
+
+
+def get_attachments(data: bytes) -> dict[str, bytes]:
+    parts = message_from_bytes(data).walk()
+    return {part.get_filename(): part.get_payload(decode=True) for part in parts if part.get_filename()}
+
+
+def test_skeleton_message():
+    skeleton = make_skeleton(cc=["cc@example.com"])
+    message = skeleton.message(to=["a@example.com"], bcc=["bcc@example.com"])
+    assert message.recipients() == ["a@example.com", "cc@example.com", "bcc@example.com"]
+    prepared = message.message()
+    assert isinstance(prepared, PreparedMessage)
+    parsed = message_from_bytes(prepared.as_bytes())
+    assert parsed["To"] == "a@example.com"
+    assert parsed["Cc"] == "cc@example.com"
+    assert parsed["Subject"] == EmailMessage("Отчет", from_email="from@example.com").message()["Subject"]
+    assert parsed["Date"] and parsed["Message-ID"]
+    assert get_attachments(prepared.as_bytes()) == {"report.bin": CONTENT}
+    assert prepared["To"] == "a@example.com"
+    assert prepared["From"] == "from@example.com"
+
+
+def test_skeleton_per_recipient_headers():
+    skeleton = make_skeleton()
+    first = skeleton.message(to=["a@example.com"]).message()
+    second = skeleton.message(to=["b@example.com"], headers={"X-Campaign": "news"}).message()
+    assert first["Message-ID"] != second["Message-ID"]
+    assert (first["To"], second["To"]) == ("a@example.com", "b@example.com")
+    assert message_from_bytes(second.as_bytes())["X-Campaign"] == "news"
+    assert message_from_bytes(first.as_bytes())["X-Campaign"] is None
+
+
+def test_skeleton_shared_headers():
+    # заголовки, заданные в исходном письме, общие для всех получателей
+    skeleton = make_skeleton(headers={"Message-ID": "<shared@example.com>", "To": "list@example.com"})
+    assert skeleton.dynamic_headers == ["Date"]
+    prepared = skeleton.message(to=["a@example.com"]).message()
+    parsed = message_from_bytes(prepared.as_bytes())
+    assert parsed["Message-ID"] == "<shared@example.com>"
+    assert parsed.get_all("To") == ["list@example.com"]
+
+
+def test_skeleton_serialized_once():
+    skeleton = make_skeleton()
+    assert skeleton.serialize() is skeleton.serialize()
+    head, body = skeleton.serialize("\r\n")
+    assert b"\r\n" in head and b"\n" not in head.replace(b"\r\n", b"")
+    prepared = skeleton.message(to=["a@example.com"]).message()
+    assert prepared.as_bytes(linesep="\r\n").endswith(body)
+
+
+def test_skeleton_lazy_file_attachment(tmp_path):
+    path = tmp_path / "data.bin"
+    path.write_bytes(CONTENT)
+    message = EmailMessage("subject", "body", "from@example.com")
+    message.attach_file(path, lazy=True)
+    prepared = EmailMessageSkeleton(message).message(to=["a@example.com"]).message()
+    assert get_attachments(prepared.as_bytes()) == {"data.bin": CONTENT}
+
+
+def test_skeleton_rejects_stream_attachment():
+    message = EmailMessage("subject", "body", "from@example.com")
+    message.attach_stream("data.bin", iter_chunks(CONTENT))
+    with pytest.raises(ValueError):
+        EmailMessageSkeleton(message)
+
+
+async def test_send_skeleton_messages(smtp_server):
+    skeleton = make_skeleton()
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server)):
+        messages = [skeleton.message(to=[f"to{i}@example.com"]) for i in range(3)]
+        assert await EmailBackend().send_messages(messages) == 3
+    assert sorted(message.recipients[0] for message in smtp_server.messages) == [
+        "to0@example.com", "to1@example.com", "to2@example.com"
+    ]
+    for received in smtp_server.messages:
+        assert get_attachments(received.data) == {"report.bin": CONTENT}
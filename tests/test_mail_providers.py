@@ -0,0 +1,40 @@
+import pytest
+
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.mail.providers import ProviderRegistry
+
+LOCMEM = {"BACKEND": "fastapi_django.mail.backends.locmem.EmailBackend"}
+
+
+def test_setup_creates_instances():
+    registry = ProviderRegistry()
+    with override_settings(EMAIL_PROVIDERS={"default": LOCMEM, "other": LOCMEM}):
+        registry.setup()
+        assert registry.get_backend("default") is registry.get_backend("default")
+        assert registry.get_backend("other").provider == "other"
+
+
+def test_setup_failure_leaves_registry_empty(tmp_path):
+    registry = ProviderRegistry()
+    # путь для файлового бэкенда - не каталог, экземпляр не создается
+    (path := tmp_path / "mails").touch()
+    broken = {
+        "default": LOCMEM,
+        "file": {"BACKEND": "fastapi_django.mail.backends.filebased.EmailBackend", "OPTIONS": {"file_path": str(path)}},
+    }
+    with override_settings(EMAIL_PROVIDERS=broken):
+        with pytest.raises(ImproperlyConfigured):
+            registry.setup()
+        assert registry._classes is None
+        assert registry._instances == {}
+        # следующее обращение снова проверяет настройки, а не возвращает наполовину настроенный реестр
+        with pytest.raises(ImproperlyConfigured):
+            registry.get_backend("default")
+
+
+def test_setup_invalid_backend():
+    registry = ProviderRegistry()
+    with override_settings(EMAIL_PROVIDERS={"default": {"BACKEND": "fastapi_django.conf.settings"}}):
+        with pytest.raises(ImproperlyConfigured):
+            registry.setup()
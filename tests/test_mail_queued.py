@@ -0,0 +1,83 @@
+from fastapi_django.conf import override_settings
+from fastapi_django.mail import EmailMessage
+from fastapi_django.mail.backends.base import BaseEmailBackend, EmailNotSentError
+from fastapi_django.mail.backends.queued import drain_queues, get_queue
+from fastapi_django.mail.providers import providers
+
+
+def make_messages(*recipients):
+    return [EmailMessage("subject", "body", "from@example.com", [recipient]) for recipient in recipients]
+
+
+def queued_providers(server, **options):
+    return {
+        "smtp": {
+            "BACKEND": "fastapi_django.mail.backends.smtp.EmailBackend",
+            "HOST": server.host,
+            "PORT": server.port,
+            "OPTIONS": {"max_connections": 2},
+        },
+        "default": {
+            "BACKEND": "fastapi_django.mail.backends.queued.EmailBackend",
+            "OPTIONS": {"provider": "smtp", "retry_delay": 0, **options},
+        },
+    }
+
+
+async def test_retry_only_failed_messages(smtp_server):
+    smtp_server.refused = {"refused@example.com"}
+    dead = []
+    with override_settings(
+        EMAIL_PROVIDERS=queued_providers(smtp_server, max_retries=2, dead_letter=lambda m, e: dead.extend(m))
+    ):
+        messages = make_messages("a@example.com", "refused@example.com", "b@example.com")
+        assert await providers.get_backend("default").send_messages(messages) == 3
+        queue = get_queue("default")
+        await drain_queues()
+    # отправленные письма пачки повторно не отправляются
+    assert sorted(message.recipients[0] for message in smtp_server.messages) == ["a@example.com", "b@example.com"]
+    assert dead == [messages[1]]
+    stats = queue.stats()
+    assert (stats["sent"], stats["failed"], stats["retries"]) == (2, 1, 2)
+
+
+class ShortCountBackend(BaseEmailBackend):
+    # как бэкенд с fail_silently=True: ошибку не выбрасывает, но и письмо не отправляет
+    async def send_messages(self, email_messages):
+        return sum(1 for message in email_messages if message.to != ["fail@example.com"])
+
+
+async def test_send_messages_results_short_count():
+    results = await ShortCountBackend().send_messages_results(make_messages("a@example.com", "fail@example.com"))
+    assert results[0] is None
+    assert isinstance(results[1], EmailNotSentError)
+
+
+async def test_smtp_send_messages_results(smtp_server):
+    smtp_server.refused = {"refused@example.com"}
+    with override_settings(EMAIL_PROVIDERS=queued_providers(smtp_server)):
+        results = await providers.get_backend("smtp").send_messages_results(
+            make_messages("a@example.com", "refused@example.com")
+        )
+    assert results[0] is None
+    assert results[1] is not None
+    assert len(smtp_server.messages) == 1
+
+
+async def test_consumed_stream_is_not_retried(smtp_server):
+    async def stream():
+        yield b"data" * 1000
+
+    smtp_server.disconnect_after = 0
+    dead = []
+    message = EmailMessage("subject", "body", "from@example.com", ["a@example.com"])
+    message.attach_stream("data.bin", stream())
+    with override_settings(
+        EMAIL_PROVIDERS=queued_providers(smtp_server, max_retries=3, dead_letter=lambda m, e: dead.extend(m))
+    ):
+        await providers.get_backend("default").send_messages([message])
+        queue = get_queue("default")
+        await drain_queues()
+    assert dead == [message]
+    assert queue.stats()["retries"] == 0
+    assert smtp_server.messages == []
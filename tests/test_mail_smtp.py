@@ -0,0 +1,94 @@
+from email import message_from_bytes
+
+import pytest
+from aiosmtplib import SMTPServerDisconnected
+
+from fastapi_django.conf import override_settings
+from fastapi_django.mail import EmailMessage
+from fastapi_django.mail.backends import smtp
+from fastapi_django.mail.backends.smtp import EmailBackend
+from fastapi_django.mail.message import AttachmentStreamConsumedError
+
+
+def smtp_providers(server, **options):
+    return {
+        "default": {
+            "BACKEND": "fastapi_django.mail.backends.smtp.EmailBackend",
+            "HOST": server.host,
+            "PORT": server.port,
+            "OPTIONS": options,
+        }
+    }
+
+
+def make_messages(count):
+    return [
+        EmailMessage(f"subject {i}", "body", "from@example.com", [f"to{i}@example.com"]) for i in range(count)
+    ]
+
+
+async def test_send_messages_generator(smtp_server):
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server, max_connections=2)):
+        backend = EmailBackend()
+        sent = await backend.send_messages(message for message in make_messages(3))
+    assert sent == 3
+    assert sorted(message.recipients[0] for message in smtp_server.messages) == [
+        "to0@example.com", "to1@example.com", "to2@example.com"
+    ]
+
+
+async def test_send_messages_empty_generator(smtp_server):
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server)):
+        assert await EmailBackend().send_messages(message for message in []) == 0
+    assert smtp_server.connections == 0
+
+
+async def iter_chunks(data: bytes, size: int = 1000):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def make_stream_message(data: bytes) -> EmailMessage:
+    message = EmailMessage("subject", "body", "from@example.com", ["to@example.com"])
+    message.attach_stream("data.bin", iter_chunks(data), "application/octet-stream")
+    return message
+
+
+def get_attachment(data: bytes) -> bytes:
+    [attachment] = [part for part in message_from_bytes(data).walk() if part.get_filename() == "data.bin"]
+    return attachment.get_payload(decode=True)
+
+
+@pytest.mark.parametrize("streaming", [True, False])
+async def test_send_stream_attachment(smtp_server, monkeypatch, streaming):
+    if not streaming:
+        # приватный API aiosmtplib, через который письмо передается по частям, недоступен
+        monkeypatch.setattr(smtp, "supports_streaming", lambda protocol: False)
+    data = bytes(range(256)) * 1000
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server)):
+        assert await EmailBackend().send_messages([make_stream_message(data)]) == 1
+    [received] = smtp_server.messages
+    assert get_attachment(received.data) == data
+
+
+async def test_reconnect_resends_message(smtp_server):
+    smtp_server.disconnect_after = 1
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server)):
+        assert await EmailBackend().send_messages(make_messages(2)) == 2
+    assert len(smtp_server.messages) == 2
+    assert smtp_server.connections == 2
+
+
+async def test_reconnect_does_not_resend_consumed_stream(smtp_server):
+    smtp_server.disconnect_after = 0
+    message = make_stream_message(b"data" * 1000)
+    with override_settings(EMAIL_PROVIDERS=smtp_providers(smtp_server)):
+        backend = EmailBackend()
+        [result] = await backend.send_messages_results([message])
+        assert isinstance(result, SMTPServerDisconnected)
+        assert not message.resendable
+        # повторное чтение потока - ошибка, а не письмо с пустым вложением
+        smtp_server.disconnect_after = None
+        with pytest.raises(AttachmentStreamConsumedError):
+            await backend.send_messages([message])
+    assert smtp_server.messages == []
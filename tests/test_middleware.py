@@ -0,0 +1,142 @@
+import logging
+from functools import partial
+
+import httpx
+import pytest
+from fastapi import FastAPI, Request
+from starlette.middleware.base import BaseHTTPMiddleware
+from starlette.middleware.gzip import GZipMiddleware
+from starlette.middleware.trustedhost import TrustedHostMiddleware
+
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.logging import logging_context_var
+from fastapi_django.middleware import get_middleware, get_middlewares
+from fastapi_django.middleware.request_id import RequestIdMiddleware
+from fastapi_django.middleware.timing import TimingMiddleware
+
+
+class LegacyMiddleware(BaseHTTPMiddleware):
+    async def dispatch(self, request, call_next):
+        return await call_next(request)
+
+
+def test_get_middleware_from_path():
+    middleware = get_middleware("fastapi_django.middleware.timing.TimingMiddleware")
+    assert middleware.cls is TimingMiddleware
+    assert middleware.kwargs == {}
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        ("starlette.middleware.gzip.GZipMiddleware", {"minimum_size": 10}),
+        ["starlette.middleware.gzip.GZipMiddleware", {"minimum_size": 10}],
+    ],
+)
+def test_get_middleware_with_options(entry):
+    middleware = get_middleware(entry)
+    assert middleware.cls is GZipMiddleware
+    assert middleware.kwargs == {"minimum_size": 10}
+
+
+def test_get_middleware_from_callable():
+    factory = partial(TrustedHostMiddleware, allowed_hosts=["example.com"])
+    assert get_middleware(factory).cls is factory
+    assert get_middleware(TimingMiddleware).cls is TimingMiddleware
+
+
+@pytest.mark.parametrize(
+    "entry",
+    [
+        "fastapi_django.middleware.unknown.Middleware",
+        ("starlette.middleware.gzip.GZipMiddleware",),
+        ("starlette.middleware.gzip.GZipMiddleware", {"minimum_size": 10}, {}),
+        ("starlette.middleware.gzip.GZipMiddleware", ["minimum_size"]),
+        1,
+    ],
+)
+def test_get_middleware_invalid(entry):
+    with pytest.raises(ImproperlyConfigured):
+        get_middleware(entry)
+
+
+def test_base_http_middleware_warning(caplog):
+    with caplog.at_level(logging.WARNING, logger="fastapi_django.middleware"):
+        get_middleware(LegacyMiddleware)
+    assert "LegacyMiddleware основан на BaseHTTPMiddleware" in caplog.text
+
+
+def test_get_middlewares_keeps_order():
+    middlewares = get_middlewares(
+        ("fastapi_django.middleware.request_id.RequestIdMiddleware", TimingMiddleware)
+    )
+    assert [middleware.cls for middleware in middlewares] == [RequestIdMiddleware, TimingMiddleware]
+
+
+def make_client(*middlewares) -> httpx.AsyncClient:
+    app = FastAPI()
+
+    @app.get("/")
+    async def view(request: Request):
+        return {"request_id": getattr(request.state, "request_id", None), "context": logging_context_var.get()}
+
+    for middleware in reversed(middlewares):
+        app.add_middleware(middleware.cls, *middleware.args, **middleware.kwargs)
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver")
+
+
+async def test_request_id_generated():
+    async with make_client(get_middleware(RequestIdMiddleware)) as client:
+        response = await client.get("/")
+    request_id = response.headers["x-request-id"]
+    assert len(request_id) == 32
+    assert response.json() == {"request_id": request_id, "context": {"request_id": request_id}}
+
+
+async def test_request_id_from_header():
+    async with make_client(get_middleware(RequestIdMiddleware)) as client:
+        response = await client.get("/", headers={"X-Request-ID": "abc-123"})
+        assert response.headers["x-request-id"] == "abc-123"
+        assert response.json()["request_id"] == "abc-123"
+        # некорректный идентификатор заменяется сгенерированным
+        response = await client.get("/", headers={"X-Request-ID": "bad id"})
+        assert response.headers["x-request-id"] != "bad id"
+        assert len(response.headers["x-request-id"]) == 32
+
+
+async def test_request_id_untrusted_header():
+    middleware = get_middleware(
+        ("fastapi_django.middleware.request_id.RequestIdMiddleware", {"trust_header": False, "header_name": "X-Trace"})
+    )
+    async with make_client(middleware) as client:
+        response = await client.get("/", headers={"X-Trace": "abc-123"})
+    assert response.headers["x-trace"] != "abc-123"
+    assert response.json()["request_id"] == response.headers["x-trace"]
+    # после запроса контекст логирования восстанавливается
+    assert logging_context_var.get() == {}
+
+
+async def test_timing_server_timing_header():
+    async with make_client(get_middleware(TimingMiddleware)) as client:
+        response = await client.get("/")
+    name, _, duration = response.headers["server-timing"].partition(";dur=")
+    assert name == "app"
+    assert float(duration) >= 0
+
+
+async def test_timing_without_header():
+    async with make_client(get_middleware((TimingMiddleware, {"server_timing": False}))) as client:
+        response = await client.get("/")
+    assert "server-timing" not in response.headers
+
+
+async def test_timing_slow_request(caplog):
+    async with make_client(get_middleware((TimingMiddleware, {"slow_threshold": 0}))) as client:
+        with caplog.at_level(logging.WARNING, logger="fastapi_django.middleware.timing"):
+            await client.get("/")
+    assert "Медленный запрос GET /" in caplog.text
+    caplog.clear()
+    async with make_client(get_middleware((TimingMiddleware, {"slow_threshold": 10}))) as client:
+        with caplog.at_level(logging.WARNING, logger="fastapi_django.middleware.timing"):
+            await client.get("/")
+    assert caplog.text == ""
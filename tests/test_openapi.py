@@ -0,0 +1,50 @@
+import gzip
+import json
+
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from fastapi_django.docs.openapi import get_openapi_document, setup_openapi
+
+
+@pytest.fixture
+def app():
+    app = FastAPI(openapi_url=None)
+
+    @app.get("/items")
+    def items() -> list[int]:
+        return []
+
+    setup_openapi(app, "/openapi.json")
+    return app
+
+
+def test_root_path_after_warmup(app):
+    # схема построена при прогреве, до первого запроса
+    get_openapi_document(app)
+    client = TestClient(app, root_path="/api")
+    response = client.get("/openapi.json", headers={"Accept-Encoding": "identity"})
+    assert response.json()["servers"] == [{"url": "/api"}]
+    # схема без root_path не изменилась
+    assert "servers" not in json.loads(get_openapi_document(app).content)
+    assert "servers" not in app.openapi()
+
+
+def test_root_path_already_in_servers(app):
+    app.servers = [{"url": "/api"}]
+    app.openapi_schema = None
+    assert json.loads(get_openapi_document(app, "/api").content)["servers"] == [{"url": "/api"}]
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, gzipped",
+    [("gzip", True), ("br, gzip;q=0.5", True), ("gzip;q=0", False), ("gzip;q=0, *", False), ("", False)],
+)
+def test_gzip(app, accept_encoding, gzipped):
+    client = TestClient(app)
+    response = client.get("/openapi.json", headers={"Accept-Encoding": accept_encoding})
+    document = get_openapi_document(app)
+    assert (response.headers.get("content-encoding") == "gzip") is gzipped
+    assert response.headers["etag"] == (document.gzip_etag if gzipped else document.etag)
+    assert gzip.decompress(document.gzip_content) == document.content
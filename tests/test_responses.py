@@ -0,0 +1,57 @@
+import datetime
+import uuid
+from decimal import Decimal
+
+import httpx
+from fastapi import FastAPI
+from pydantic import BaseModel
+
+from fastapi_django import responses
+from fastapi_django.responses import FastJSONResponse, RawJSONResponse
+
+
+class ItemSchema(BaseModel):
+    id: int
+    price: Decimal
+
+
+CONTENT = {
+    "uid": uuid.UUID("12345678-1234-5678-1234-567812345678"),
+    "price": Decimal("1500.50"),
+    "date": datetime.date(2026, 1, 2),
+    "item": ItemSchema(id=1, price=Decimal("0.10")),
+    1: "int key",
+}
+
+
+def test_render_with_orjson():
+    assert FastJSONResponse(CONTENT).body == (
+        b'{"uid":"12345678-1234-5678-1234-567812345678","price":"1500.50","date":"2026-01-02",'
+        b'"item":{"id":1,"price":"0.10"},"1":"int key"}'
+    )
+
+
+def test_render_without_orjson(monkeypatch):
+    monkeypatch.setattr(responses, "orjson", None)
+    assert FastJSONResponse(CONTENT).body == (
+        b'{"uid":"12345678-1234-5678-1234-567812345678","price":"1500.50","date":"2026-01-02",'
+        b'"item":{"id":1,"price":"0.10"},"1":"int key"}'
+    )
+
+
+def test_raw_response():
+    response = RawJSONResponse(b'[{"id":1}]')
+    assert response.body == b'[{"id":1}]'
+    assert response.headers["content-type"] == "application/json"
+
+
+async def test_default_response_class():
+    app = FastAPI(default_response_class=FastJSONResponse)
+
+    @app.get("/")
+    async def view() -> list[ItemSchema]:
+        return [ItemSchema(id=1, price=Decimal("1.5"))]
+
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        response = await client.get("/")
+    assert response.content == b'[{"id":1,"price":"1.5"}]'
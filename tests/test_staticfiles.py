@@ -0,0 +1,50 @@
+import pytest
+from fastapi import FastAPI
+from starlette.testclient import TestClient
+
+from fastapi_django.staticfiles import IMMUTABLE_CACHE_CONTROL, CompressedStaticFiles
+from fastapi_django.warmup import hash_static_files
+
+
+@pytest.fixture
+def static_dir(tmp_path):
+    (tmp_path / "css").mkdir()
+    (tmp_path / "css" / "site.css").write_text("body {}")
+    (tmp_path / "css" / "site.css.gz").write_bytes(b"")
+    (tmp_path / "app.js").write_text("alert(1)")
+    return tmp_path
+
+
+def test_hash_static_files_warmup(static_dir):
+    static_files = CompressedStaticFiles(directory=static_dir)
+    app = FastAPI()
+    app.mount("/static", static_files)
+    hash_static_files(app)
+    assert set(static_files._hashes) == {"css/site.css", "app.js"}
+
+
+async def test_ahashed_name(static_dir, monkeypatch):
+    static_files = CompressedStaticFiles(directory=static_dir)
+    name = await static_files.ahashed_name("css/site.css")
+    assert name == static_files.hashed_name("css/site.css")
+    assert name.startswith("css/site.") and name.endswith(".css")
+    assert await static_files.ahashed_name("missing.css") == "missing.css"
+
+    # вычисленный хэш не требует чтения файла
+    def fail(path):
+        raise AssertionError(path)
+
+    monkeypatch.setattr(static_files, "file_hash", fail)
+    assert await static_files.ahashed_name("css/site.css") == name
+
+
+def test_hashed_response(static_dir):
+    static_files = CompressedStaticFiles(directory=static_dir)
+    static_files.compute_hashes()
+    app = FastAPI()
+    app.mount("/static", static_files)
+    client = TestClient(app)
+    response = client.get(f"/static/{static_files.hashed_name('app.js')}")
+    assert response.text == "alert(1)"
+    assert response.headers["cache-control"] == IMMUTABLE_CACHE_CONTROL
+    assert client.get("/static/app.js").headers["cache-control"] == "no-cache"
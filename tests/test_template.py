@@ -0,0 +1,135 @@
+import pytest
+from starlette.requests import Request
+from typer.testing import CliRunner
+
+from fastapi_django import template
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.management.cli import typer as cli
+from fastapi_django.template import (
+    AsyncBytecodeCache,
+    MemoryBytecodeCache,
+    StreamingTemplateResponse,
+    get_bytecode_cache,
+    render_to_string,
+    render_to_string_async,
+)
+
+TEMPLATES = {
+    "page.html": "<h1>{{ title }}</h1>",
+    "call.html": "<h1>{{ get_title() }}</h1>",
+    "list.html": "<ul>{% for item in items %}<li>{{ item }}</li>{% endfor %}</ul>",
+    "request.html": "{{ request.url.path }} {{ user }}",
+}
+
+
+@pytest.fixture
+def templates_dir(tmp_path, monkeypatch):
+    for name, source in TEMPLATES.items():
+        (tmp_path / name).write_text(source)
+    with override_settings(TEMPLATES_DIRECTORY=str(tmp_path), TEMPLATES_ENV_OPTIONS={"bytecode_cache": "memory"}):
+        monkeypatch.setattr(template, "templates", template.get_templates())
+        monkeypatch.setattr(template, "_async_env", None)
+        yield tmp_path
+
+
+def test_get_bytecode_cache(tmp_path):
+    assert isinstance(get_bytecode_cache("memory"), MemoryBytecodeCache)
+    with override_settings(TEMPLATES_BYTECODE_CACHE_DIRECTORY=str(tmp_path)):
+        assert get_bytecode_cache("filesystem").directory == str(tmp_path)
+    cache = MemoryBytecodeCache()
+    assert get_bytecode_cache(cache) is cache
+    assert get_bytecode_cache(None) is None
+    with pytest.raises(ImproperlyConfigured):
+        get_bytecode_cache("redis")
+
+
+def test_async_bytecode_keys_are_separated(templates_dir):
+    template.templates.env.get_template("page.html")
+    template.get_async_env().get_template("page.html")
+    cache = template.templates.env.bytecode_cache
+    assert isinstance(template.get_async_env().bytecode_cache, AsyncBytecodeCache)
+    [sync_key] = [key for key in cache._cache if not key.startswith("async-")]
+    assert set(cache._cache) == {sync_key, "async-" + sync_key}
+
+
+async def test_async_template_loaded_from_bytecode(templates_dir):
+    template.get_async_env().get_template("page.html")
+    # новое окружение загружает асинхронный шаблон из кэша байткода, а не компилирует его
+    template._async_env = None
+    env = template.get_async_env()
+    bytecode_cache = env.bytecode_cache
+    loaded = []
+    load_bytecode = bytecode_cache.load_bytecode
+
+    def record_load(bucket):
+        load_bytecode(bucket)
+        loaded.append(bucket.code is not None)
+
+    bytecode_cache.load_bytecode = record_load
+    assert await env.get_template("page.html").render_async(title="Заголовок") == "<h1>Заголовок</h1>"
+    assert loaded == [True]
+    # синхронный шаблон не подменяется асинхронным байткодом
+    assert render_to_string("page.html", {"title": "sync"}) == "<h1>sync</h1>"
+
+
+async def test_render_to_string_async(templates_dir):
+    async def items():
+        for item in ("a", "b"):
+            yield item
+
+    async def get_title():
+        return "Заголовок"
+
+    assert await render_to_string_async("call.html", {"get_title": get_title}) == "<h1>Заголовок</h1>"
+    assert await render_to_string_async("list.html", {"items": items()}) == "<ul><li>a</li><li>b</li></ul>"
+
+
+async def test_render_to_string_async_cache_key(templates_dir):
+    first = await render_to_string_async("page.html", {"title": "first"}, cache_key=("page", 1))
+    second = await render_to_string_async("page.html", {"title": "second"}, cache_key=("page", 1))
+    assert first == second == "<h1>first</h1>"
+    # закэшированный результат общий с синхронным render_to_string
+    assert render_to_string("page.html", {"title": "third"}, cache_key=("page", 1)) == "<h1>first</h1>"
+    assert await render_to_string_async("page.html", {"title": "other"}, cache_key=("page", 2)) == "<h1>other</h1>"
+
+
+async def test_streaming_template_response(templates_dir):
+    request = Request({"type": "http", "method": "GET", "path": "/items", "headers": []})
+    response = StreamingTemplateResponse(request, "list.html", {"items": ["a", "b", "c"]})
+    assert response.media_type == "text/html"
+    chunks = [chunk async for chunk in response.body_iterator]
+    # шаблон отдается по частям по мере рендеринга
+    assert len(chunks) > 1
+    assert "".join(chunks) == "<ul><li>a</li><li>b</li><li>c</li></ul>"
+
+
+async def test_streaming_template_response_context(templates_dir):
+    template.templates.context_processors.append(lambda request: {"user": "admin"})
+    request = Request({"type": "http", "method": "GET", "path": "/items", "headers": []})
+    response = StreamingTemplateResponse(request, "request.html", status_code=201)
+    assert response.status_code == 201
+    assert "".join([chunk async for chunk in response.body_iterator]) == "/items admin"
+
+
+def test_compiletemplates(templates_dir):
+    result = CliRunner().invoke(cli, ["compiletemplates"])
+    assert result.exit_code == 0, result.output
+    assert "Скомпилировано шаблонов: 4, с ошибками: 0" in result.output
+    # байткод синхронных и асинхронных шаблонов
+    assert len(template.templates.env.bytecode_cache._cache) == 8
+
+
+def test_compiletemplates_broken_template(templates_dir):
+    (templates_dir / "broken.html").write_text("{% if %}")
+    result = CliRunner().invoke(cli, ["compiletemplates"])
+    assert result.exit_code == 1
+    assert "broken.html:" in result.output
+    assert "Скомпилировано шаблонов: 4, с ошибками: 1" in result.output
+
+
+def test_compiletemplates_requires_bytecode_cache(templates_dir, monkeypatch):
+    with override_settings(TEMPLATES_ENV_OPTIONS={}):
+        monkeypatch.setattr(template, "templates", template.get_templates())
+        result = CliRunner().invoke(cli, ["compiletemplates"])
+    assert isinstance(result.exception, ImproperlyConfigured)
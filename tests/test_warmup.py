@@ -0,0 +1,95 @@
+import asyncio
+import threading
+
+import httpx
+import pytest
+
+from fastapi_django.app import get_default_app
+from fastapi_django.conf import override_settings
+from fastapi_django.exceptions import ImproperlyConfigured
+from fastapi_django.warmup import WarmUp
+
+calls = []
+
+
+async def async_step(app):
+    calls.append(("async", threading.current_thread() is threading.main_thread()))
+
+
+def sync_step(app):
+    calls.append(("sync", threading.current_thread() is threading.main_thread()))
+
+
+async def slow_step(app):
+    try:
+        await asyncio.sleep(10)
+    except asyncio.CancelledError:
+        calls.append(("slow", "cancelled"))
+        raise
+
+
+async def failing_step(app):
+    raise RuntimeError("warm-up failed")
+
+
+@pytest.fixture(autouse=True)
+def clear_calls():
+    calls.clear()
+
+
+async def test_run():
+    warmup = WarmUp(["tests.test_warmup.async_step", "tests.test_warmup.sync_step"])
+    assert not warmup.ready
+    await warmup.run(None)
+    # асинхронные шаги выполняются в цикле событий, синхронные - в отдельных потоках
+    assert sorted(calls) == [("async", True), ("sync", False)]
+    stats = warmup.stats()
+    assert stats["ready"] is True
+    assert stats["duration"] >= 0
+    assert set(stats["steps"]) == {"tests.test_warmup.async_step", "tests.test_warmup.sync_step"}
+
+
+def test_invalid_step():
+    with pytest.raises(ImproperlyConfigured):
+        WarmUp(["tests.test_warmup.unknown_step"])
+
+
+async def test_failed_step_cancels_other_steps():
+    warmup = WarmUp(["tests.test_warmup.slow_step", "tests.test_warmup.failing_step"])
+    with pytest.raises(ExceptionGroup) as exc_info:
+        await warmup.run(None)
+    assert exc_info.group_contains(RuntimeError, match="warm-up failed")
+    assert calls == [("slow", "cancelled")]
+    assert not warmup.ready
+
+
+@override_settings(WARMUP_STEPS=["tests.test_warmup.async_step"], WARMUP_READINESS_URL="/ready")
+async def test_readiness():
+    app = get_default_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        # до прогрева
+        response = await client.get("/ready")
+        assert response.status_code == 503
+        assert response.json() == {"ready": False}
+        async with app.router.lifespan_context(app):
+            response = await client.get("/ready")
+            assert response.status_code == 200
+            assert response.json()["ready"] is True
+            assert list(response.json()["steps"]) == ["tests.test_warmup.async_step"]
+
+
+@override_settings(WARMUP_STEPS=["tests.test_warmup.failing_step"], WARMUP_READINESS_URL="/ready")
+async def test_failed_warmup_does_not_start_app():
+    app = get_default_app()
+    with pytest.raises(ExceptionGroup):
+        async with app.router.lifespan_context(app):
+            pass
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        assert (await client.get("/ready")).status_code == 503
+
+
+@override_settings(WARMUP_STEPS=[], WARMUP_READINESS_URL=None)
+async def test_readiness_disabled():
+    app = get_default_app()
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app), base_url="http://testserver") as client:
+        assert (await client.get("/ready")).status_code == 404